@@ -0,0 +1,39 @@
+"""
+Shared helpers for the benchmark scripts in this directory.
+
+Run a benchmark from the repository root, e.g.:
+
+    python benchmarks/bench_insert.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# Make the package importable without installing it
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def best_of(func, repeat=3):
+    """
+    Run func several times and return the fastest wall-clock time in seconds.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def print_table(headers, rows):
+    """
+    Print rows as a simple aligned text table.
+    """
+    rows = [[str(cell) for cell in row] for row in rows]
+    widths = [max(len(str(header)), *(len(row[i]) for row in rows))
+              for i, header in enumerate(headers)]
+    print("  ".join(str(header).ljust(width) for header, width in zip(headers, widths)))
+    print("  ".join("-" * width for width in widths))
+    for row in rows:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)))
@@ -0,0 +1,52 @@
+"""
+Synthetic tree shapes for the benchmark suite.
+
+Every generator returns a list of equal-length fibers (keys followed by a
+leaf value) and is deterministic for a given count and seed:
+
+    wide    two levels with many children per node (e.g. id -> attribute)
+    deep    long paths with few branches per level (e.g. nested configs)
+    skewed  four levels whose keys follow a Zipf distribution, so a few hot
+            subtrees receive most of the rows (e.g. real traffic by customer)
+"""
+
+import random
+
+
+def wide_fibers(count, fanout=1000, seed=0):
+    rng = random.Random(seed)
+    return [[f"item{i // fanout}", f"attr{i % fanout}", rng.randint(1, 100)]
+            for i in range(count)]
+
+
+def deep_fibers(count, depth=16, branching=2, seed=0):
+    rng = random.Random(seed)
+    return [[f"level{level}-{rng.randrange(branching)}" for level in range(depth)]
+            + [rng.randint(1, 100)] for _ in range(count)]
+
+
+def skewed_fibers(count, depth=4, keys=1000, exponent=1.2, seed=0):
+    rng = random.Random(seed)
+    weights = [1 / rank ** exponent for rank in range(1, keys + 1)]
+    columns = [rng.choices(range(keys), weights, k=count) for _ in range(depth)]
+    return [[f"k{key}" for key in path] + [rng.randint(1, 100)] for path in zip(*columns)]
+
+
+SHAPES = {
+    'wide': wide_fibers,
+    'deep': deep_fibers,
+    'skewed': skewed_fibers,
+}
+
+
+def count_nodes(tree):
+    """
+    Return the number of nodes of a tree, including its root.
+    """
+    nodes = 0
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        nodes += 1
+        stack.extend(value for value in dict.values(node) if isinstance(value, dict))
+    return nodes
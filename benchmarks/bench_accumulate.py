@@ -0,0 +1,91 @@
+"""
+Appending 1M values to a single leaf.
+
+Compares a merge callable that concatenates lists (the custom_merge of the
+README) and the 'append' behavior with tuples, which copy the whole leaf on
+every collision, with a LeafAccumulator and 'append' inside an accumulating
+block, and insert_many, which accumulates on its own. The quadratic cases
+are measured with fewer values and extrapolated to 1M values.
+"""
+
+import time
+from contextlib import nullcontext
+
+import _common  # noqa: F401  (sets up sys.path)
+from _common import print_table
+
+from cswtools import LeafAccumulator, Yggdrasil
+
+TARGET = 1_000_000
+QUADRATIC_COUNT = 30_000
+
+
+def custom_merge(existing, new):
+    if isinstance(existing, list):
+        return existing + [new]
+    return [existing, new]
+
+
+class Collect(LeafAccumulator):
+    def init(self, value):
+        return list(value) if isinstance(value, list) else [value]
+
+    def accumulate(self, state, value):
+        state.append(value)
+        return state
+
+
+def assign(leaf_behavior, make_value, block):
+    def run(count):
+        tree = Yggdrasil(leaf_behavior=leaf_behavior)
+        node = tree['events']
+        started = time.perf_counter()
+        with tree.accumulating() if block else nullcontext():
+            for i in range(count):
+                node['log'] = make_value(i)
+        seconds = time.perf_counter() - started
+        assert len(tree['events']['log']) == count
+        return seconds
+    return run
+
+
+def bulk(count):
+    tree = Yggdrasil(leaf_behavior='append')
+    fibers = [('events', 'log', (i,)) for i in range(count)]
+    started = time.perf_counter()
+    tree.insert_many(fibers)
+    seconds = time.perf_counter() - started
+    assert len(tree['events']['log']) == count
+    return seconds
+
+
+CASES = [
+    ("merge callable (list + [new])", assign(custom_merge, lambda i: i, False), True),
+    ("'append' with tuples", assign('append', lambda i: (i,), False), True),
+    ("LeafAccumulator, accumulating()", assign(Collect(), lambda i: i, True), False),
+    ("'append' with tuples, accumulating()", assign('append', lambda i: (i,), True), False),
+    ("'append' with tuples, insert_many", bulk, False),
+]
+
+
+def main():
+    rows = []
+    for name, run, quadratic in CASES:
+        if quadratic:
+            count = QUADRATIC_COUNT
+            seconds = run(count)
+            # Every collision copies the leaf, so the time grows with count²
+            estimate = seconds * (TARGET / count) ** 2
+            rows.append([name, f"{count:,}", f"{seconds:.2f} s", f"{count / seconds:,.0f}",
+                         f"~{estimate / 60:,.0f} min (est.)"])
+        else:
+            seconds = run(TARGET)
+            rows.append([name, f"{TARGET:,}", f"{seconds:.2f} s", f"{TARGET / seconds:,.0f}",
+                         f"{seconds:.2f} s"])
+
+    print(f"Appending to one leaf, {TARGET:,} values")
+    print_table(["approach", "values", "time", "values/s", "time for 1M"], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Batched numeric leaf updates with add_many against one insert per update.
+
+Every run rolls up UPDATES values into LEAVES counters three levels deep
+with leaf_behavior='add'. add_many is timed with the paths given as a list
+of tuples and as a 2-D NumPy array; the scalar loop calls insert per update.
+"""
+
+import numpy as np
+
+import _common  # noqa: F401  (sets up sys.path)
+from _common import best_of, print_table
+
+from cswtools import Yggdrasil
+
+SIZES = (1_000_000, 10_000_000)
+LEAVES = 10_000
+
+
+def make_updates(count):
+    rng = np.random.default_rng(0)
+    leaf_ids = rng.integers(0, LEAVES, count)
+    # Three key levels: 10 x 10 x 100 leaves
+    key_array = np.stack([leaf_ids // 1000, leaf_ids // 100 % 10, leaf_ids % 100], axis=1)
+    values = rng.random(count)
+    return key_array, values
+
+
+def main():
+    rows = []
+    for count in SIZES:
+        key_array, values = make_updates(count)
+        paths = list(map(tuple, key_array.tolist()))
+        value_list = values.tolist()
+        repeat = 3 if count <= 1_000_000 else 1
+
+        def scalar():
+            tree = Yggdrasil(leaf_behavior='add')
+            insert = tree.insert
+            for path, value in zip(paths, value_list):
+                insert(path, value)
+            return tree
+
+        def batched_tuples():
+            Yggdrasil(leaf_behavior='add').add_many(paths, values)
+
+        def batched_array():
+            Yggdrasil(leaf_behavior='add').add_many(key_array, values)
+
+        expected = scalar()
+        check = Yggdrasil(leaf_behavior='add')
+        check.add_many(key_array, values)
+        assert check.keys() == expected.keys()
+        assert abs(check.aggregate('sum') - expected.aggregate('sum')) < 1e-6 * count
+
+        baseline = best_of(scalar, repeat)
+        rows.append([f"{count:,}", "insert per update", f"{baseline:.2f}", "1.0x"])
+        for name, func in (("add_many, tuple paths", batched_tuples),
+                           ("add_many, 2-D array", batched_array)):
+            seconds = best_of(func, repeat)
+            rows.append([f"{count:,}", name, f"{seconds:.2f}", f"{baseline / seconds:.1f}x"])
+
+    print_table(["updates", "method", "seconds", "speedup"], rows)
+
+
+if __name__ == '__main__':
+    main()
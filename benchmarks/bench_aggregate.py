@@ -0,0 +1,82 @@
+"""
+Subtree totals on a hierarchical counter (region -> store -> sku).
+
+A dashboard reads the total of every internal node after each batch of
+updates. Re-walking every subtree for each read is compared with the cached
+aggregates, which only recompute the nodes dirtied by the batch.
+"""
+
+import random
+
+import _common  # noqa: F401  (sets up sys.path)
+from _common import best_of, print_table
+
+from cswtools import Yggdrasil
+
+REGIONS = 20
+STORES = 50
+SKUS = 100
+BATCHES = 20
+BATCH_SIZE = 100
+
+
+def build():
+    tree = Yggdrasil(leaf_behavior='add')
+    for region in range(REGIONS):
+        for store in range(STORES):
+            for sku in range(SKUS):
+                tree.insert((region, store, sku), 1)
+    return tree
+
+
+def walk_sum(node):
+    total = 0
+    stack = [node]
+    while stack:
+        for value in dict.values(stack.pop()):
+            if isinstance(value, Yggdrasil):
+                stack.append(value)
+            else:
+                total += value
+    return total
+
+
+def internal_nodes(tree):
+    nodes = [tree]
+    for region in tree.values():
+        nodes.append(region)
+        nodes.extend(region.values())
+    return nodes
+
+
+def run(read):
+    tree = build()
+    nodes = internal_nodes(tree)
+    rng = random.Random(0)
+
+    def dashboard():
+        for _ in range(BATCHES):
+            for _ in range(BATCH_SIZE):
+                tree.insert((rng.randrange(REGIONS), rng.randrange(STORES),
+                             rng.randrange(SKUS)), 1)
+            for node in nodes:
+                read(node)
+
+    return best_of(dashboard, repeat=1), len(nodes)
+
+
+def main():
+    rows = []
+    for name, read in (('re-walk every subtree', walk_sum),
+                       ('aggregate("sum")', lambda node: node.aggregate('sum'))):
+        seconds, node_count = run(read)
+        reads = BATCHES * node_count
+        rows.append((name, f"{seconds:.3f} s", f"{reads / seconds:,.0f}"))
+
+    print(f"{REGIONS * STORES * SKUS:,} leaves, {BATCHES} batches of {BATCH_SIZE} "
+          f"updates, every internal node read after each batch")
+    print_table(('totals', 'time', 'reads/s'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Event-loop stalls while building a tree with afrom_rows.
+
+A ticker task measures the longest time the event loop was blocked. Smaller
+batches keep stalls short at some cost in throughput; the blocking
+insert_many is shown for comparison.
+"""
+
+import asyncio
+import time
+
+import _common  # noqa: F401  (sets up sys.path)
+from _common import print_table
+
+from cswtools import Yggdrasil
+
+ROWS = 500_000
+BATCH_SIZES = (100, 1000, 10_000)
+
+
+def make_rows():
+    return [(f"region{i % 10}", f"store{i % 1000}", i % 50, 1) for i in range(ROWS)]
+
+
+async def measure(build):
+    stalls = []
+    done = False
+
+    async def ticker():
+        last = time.perf_counter()
+        while not done:
+            await asyncio.sleep(0)
+            now = time.perf_counter()
+            stalls.append(now - last)
+            last = now
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    await build()
+    seconds = time.perf_counter() - started
+    done = True
+    await task
+    return seconds, max(stalls)
+
+
+def main():
+    rows = make_rows()
+
+    async def blocking():
+        Yggdrasil(leaf_behavior='add').insert_many(rows)
+
+    builds = [('insert_many (blocking)', blocking)]
+    for batch_size in BATCH_SIZES:
+        async def build(batch_size=batch_size):
+            await Yggdrasil.afrom_rows(rows, leaf_behavior='add', batch_size=batch_size)
+        builds.append((f"afrom_rows batch_size={batch_size}", build))
+
+    table = []
+    for name, build in builds:
+        seconds, stall = asyncio.run(measure(build))
+        table.append((name, f"{seconds:.2f} s", f"{ROWS / seconds:,.0f}",
+                      f"{stall * 1000:.1f} ms"))
+
+    print(f"{ROWS:,} rows")
+    print_table(('build', 'time', 'rows/s', 'longest stall'), table)
+
+
+if __name__ == '__main__':
+    main()
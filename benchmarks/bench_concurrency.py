@@ -0,0 +1,67 @@
+"""
+Concurrent writers on one thread-safe tree.
+
+Every thread inserts 'add' updates into its own branch. Striped locks
+(thread_safe=True) are compared with one global lock guarding the whole tree
+and with an unlocked tree, which loses updates under contention.
+
+Writers to disjoint branches only scale on a free-threaded Python build with
+several cores; with the GIL the timings show the cost of the locking itself.
+"""
+
+import os
+import sys
+import threading
+
+import _common  # noqa: F401  (sets up sys.path)
+from _common import best_of, print_table
+
+from cswtools import Yggdrasil
+from cswtools.yggdrasil import _LOCK_STRIPES
+
+THREADS = (1, 2, 4, 8)
+UPDATES = 200_000  # per run, split between the threads
+
+
+def make_tree(mode):
+    tree = Yggdrasil(leaf_behavior='add', thread_safe=mode != 'unlocked')
+    if mode == 'global lock':
+        # Every stripe is the same lock
+        tree._config.locks = [threading.Lock()] * _LOCK_STRIPES
+    return tree
+
+
+def run(mode, threads):
+    tree = make_tree(mode)
+    per_thread = UPDATES // threads
+
+    def writer(branch):
+        for i in range(per_thread):
+            tree.insert((branch, i % 50, i % 20), 1)
+
+    def start_all():
+        workers = [threading.Thread(target=writer, args=(branch,)) for branch in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    seconds = best_of(start_all, repeat=1)
+    lost = per_thread * threads - sum(fiber[-1] for fiber in tree.iter_fibers())
+    return seconds, lost
+
+
+def main():
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    rows = []
+    for threads in THREADS:
+        for mode in ('unlocked', 'global lock', 'striped locks'):
+            seconds, lost = run(mode, threads)
+            rows.append((threads, mode, f"{seconds:.2f} s", f"{UPDATES / seconds:,.0f}", lost))
+
+    print(f"{UPDATES:,} updates, {os.cpu_count()} CPUs, GIL {'enabled' if gil else 'disabled'}")
+    print_table(('threads', 'locking', 'time', 'updates/s', 'lost updates'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+DiskTree on trees of 1x, 5x and 20x the memory it may use.
+
+The memory budget is the node cache of the DiskTree (CACHE_NODES nodes);
+every tree below has 1, 5 or 20 times as many nodes. For each size the
+script measures a bulk load in key order, random path lookups and random
+leaf updates, next to an in-memory Yggdrasil holding the same tree, and
+reports the size of the file.
+
+The SQLite file itself is still cached by the operating system, so reads
+that miss the node cache usually cost a page-cache lookup and an unpickle
+rather than a disk seek. Drop the OS caches between runs (or use a machine
+with less memory than the file) to see cold-disk numbers.
+"""
+
+import os
+import random
+import tempfile
+import time
+
+import _common  # noqa: F401  (sets up sys.path)
+from _common import print_table
+
+from cswtools import Yggdrasil
+from cswtools.disk import DiskTree
+
+CACHE_NODES = 2_000
+FANOUT = 20  # leaves per bottom node
+RATIOS = (1, 5, 20)
+OPERATIONS = 20_000
+
+
+def fibers_for(nodes):
+    """
+    Generate three-level fibers for a tree of about nodes nodes, in key order.
+    """
+    groups = max(1, nodes // 50)
+    return [[f"g{i // (50 * FANOUT):05d}", f"n{i // FANOUT % 50:02d}", f"leaf{i % FANOUT:02d}", 1]
+            for i in range(groups * 50 * FANOUT)]
+
+
+def timed(func):
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def run(fibers, directory, ratio):
+    rng = random.Random(0)
+    paths = [fiber[:-1] for fiber in rng.choices(fibers, k=OPERATIONS)]
+
+    memory = Yggdrasil(leaf_behavior='add')
+    memory_load = timed(lambda: memory.insert_many(fibers))
+    memory_get = timed(lambda: [memory.get_path(path) for path in paths])
+    memory_set = timed(lambda: [memory.insert(path, 1) for path in paths])
+
+    path = os.path.join(directory, f"tree{ratio}.db")
+    with DiskTree(path, leaf_behavior='add', cache_nodes=CACHE_NODES) as tree:
+        disk_load = timed(lambda: (tree.insert_many(fibers), tree.flush()))
+        disk_get = timed(lambda: [tree.get_path(path) for path in paths])
+        disk_set = timed(lambda: (
+            [tree.insert(path, 1) for path in paths], tree.flush()))
+    size = os.path.getsize(path)
+
+    return [
+        [f"{ratio}x", "Yggdrasil", f"{len(fibers) / memory_load:,.0f}",
+         f"{OPERATIONS / memory_get:,.0f}", f"{OPERATIONS / memory_set:,.0f}", "-"],
+        ["", "DiskTree", f"{len(fibers) / disk_load:,.0f}",
+         f"{OPERATIONS / disk_get:,.0f}", f"{OPERATIONS / disk_set:,.0f}",
+         f"{size / 2 ** 20:.1f} MiB"],
+    ]
+
+
+def main():
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for ratio in RATIOS:
+            rows.extend(run(fibers_for(CACHE_NODES * ratio), directory, ratio))
+
+    print(f"Node cache of {CACHE_NODES:,} nodes, {FANOUT} leaves per bottom node, "
+          f"{OPERATIONS:,} random operations")
+    print_table(["tree/cache", "tree", "load rows/s", "lookups/s", "updates/s", "file"], rows)
+
+
+if __name__ == '__main__':
+    main()
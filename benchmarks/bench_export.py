@@ -0,0 +1,63 @@
+"""
+Flattening a tree back into columnar form.
+
+Builds a tree from a DataFrame with distinct paths and compares to_dataframe
+with the naive export (a list of fiber tuples handed to pandas) and with
+pandas' own cost of building the same DataFrame from ready-made columns.
+"""
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+import _common  # noqa: F401  (sets up sys.path)
+from _common import best_of, print_table
+
+from cswtools import Yggdrasil
+
+ROWS = 1_000_000
+
+
+def make_frame(rows, seed=0):
+    # Distinct paths, so the tree holds one leaf per row
+    rng = np.random.default_rng(seed)
+    ids = rng.permutation(rows)
+    return pd.DataFrame({
+        'region': [f"region{i}" for i in ids % 64],
+        'store': [f"store{i}" for i in (ids // 64) % 500],
+        'sku': ids // (64 * 500),
+        'amount': rng.integers(1, 10, rows),
+    })
+
+
+def main():
+    df = make_frame(ROWS)
+    tree = Yggdrasil.from_dataframe(df)
+    columns = list(df.columns)
+    lists = {column: df[column].tolist() for column in columns}
+
+    timings = [
+        ("from_dataframe", best_of(lambda: Yggdrasil.from_dataframe(df), repeat=1)),
+        ("pd.DataFrame(columns)", best_of(lambda: pd.DataFrame(lists, columns=columns))),
+        ("list(iter_fibers()) -> DataFrame",
+         best_of(lambda: pd.DataFrame(list(tree.iter_fibers()), columns=columns))),
+        ("to_dataframe", best_of(lambda: tree.to_dataframe(columns=columns))),
+    ]
+
+    def to_sql():
+        conn = sqlite3.connect(':memory:')
+        tree.to_sql('fibers', conn, columns=columns)
+        conn.close()
+
+    timings.append(("to_sql (sqlite, in memory)", best_of(to_sql, repeat=1)))
+
+    baseline = timings[1][1]
+    print(f"{ROWS:,} rows")
+    print_table(('export', 'time', 'rows/s', 'vs pandas'),
+                [(name, f"{seconds:.2f} s", f"{ROWS / seconds:,.0f}",
+                  f"{seconds / baseline:.1f}x") for name, seconds in timings])
+
+
+if __name__ == '__main__':
+    main()
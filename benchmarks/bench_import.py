@@ -0,0 +1,67 @@
+"""
+Import time of the package.
+
+Runs `python -X importtime -c "import cswtools"` in fresh interpreters and
+reports the cumulative import time of cswtools and of the optional heavy
+dependencies. The core tree must not import pandas, numpy or sqlite3; the
+script exits with status 1 if it does, so it can be used as a regression check.
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import _common  # noqa: F401  (sets up sys.path)
+from _common import print_table
+
+REPEAT = 5
+HEAVY_MODULES = ('pandas', 'numpy', 'sqlite3')
+
+
+def import_times(statement):
+    """
+    Run statement with -X importtime.
+
+    Returns:
+        tuple: (total microseconds, set of every imported module name)
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                            capture_output=True, text=True, check=True,
+                            cwd=Path(__file__).parent.parent)
+    total = 0
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        modules.add(name.strip())
+        # Nested imports are indented and already counted by their parent
+        if not name.startswith('  '):
+            total += int(cumulative)
+    return total, modules
+
+
+def main():
+    rows = []
+    loaded_heavy = set()
+    for statement in ("import cswtools", "import cswtools.frames"):
+        best = float('inf')
+        for _ in range(REPEAT):
+            total, modules = import_times(statement)
+            best = min(best, total)
+        heavy = [name for name in HEAVY_MODULES if name in modules]
+        if statement == "import cswtools":
+            loaded_heavy.update(heavy)
+        rows.append([statement, f"{best / 1000:.1f}", ", ".join(heavy) or "-"])
+
+    print_table(["statement", "ms (best of %d)" % REPEAT, "heavy modules"], rows)
+
+    if loaded_heavy:
+        print("\nRegression: 'import cswtools' loads " + ", ".join(sorted(loaded_heavy)))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
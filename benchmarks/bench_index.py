@@ -0,0 +1,69 @@
+"""
+Lookups by leaf value and by key on a 1M-leaf tree.
+
+Compares find_value and find_key with a full scan (no index) against the
+secondary indexes, and shows what keeping the indexes current costs writes.
+"""
+
+import time
+
+import _common  # noqa: F401  (sets up sys.path)
+from _common import best_of, print_table
+
+from cswtools import Yggdrasil
+
+LEVELS = 6
+FANOUT = 10  # FANOUT ** LEVELS leaves
+STATUSES = ('ok', 'warn', 'error', 'down')
+QUERIES = 100
+
+
+def build():
+    tree = Yggdrasil()
+    for i in range(FANOUT ** LEVELS):
+        path = tuple((i // FANOUT ** level) % FANOUT for level in range(LEVELS - 1, 0, -1))
+        # One rare value and one key that only exists at a few nodes
+        status = 'fatal' if i % 100_000 == 7 else STATUSES[i % len(STATUSES)]
+        key = 'error' if i % 50_000 == 3 else i % FANOUT
+        tree.insert(path + (key,), status)
+    return tree
+
+
+def updates(tree, count=100_000):
+    for i in range(count):
+        path = tuple((i // FANOUT ** level) % FANOUT for level in range(LEVELS - 1, 0, -1))
+        tree.insert(path + (i % FANOUT,), STATUSES[(i + 1) % len(STATUSES)])
+
+
+def main():
+    tree = build()
+    rows = []
+
+    scan_value = best_of(lambda: tree.find_value('fatal'), repeat=1)
+    scan_key = best_of(lambda: tree.find_key('error'), repeat=1)
+    scan_updates = best_of(lambda: updates(tree), repeat=1)
+
+    started = time.perf_counter()
+    tree.create_index('value')
+    tree.create_index('key')
+    build_seconds = time.perf_counter() - started
+
+    index_value = best_of(lambda: [tree.find_value('fatal') for _ in range(QUERIES)]) / QUERIES
+    index_key = best_of(lambda: [tree.find_key('error') for _ in range(QUERIES)]) / QUERIES
+    index_updates = best_of(lambda: updates(tree), repeat=1)
+
+    rows.append(("find_value('fatal')", f"{scan_value * 1000:,.1f} ms",
+                 f"{index_value * 1000:,.3f} ms", f"{scan_value / index_value:,.0f}x"))
+    rows.append(("find_key('error')", f"{scan_key * 1000:,.1f} ms",
+                 f"{index_key * 1000:,.3f} ms", f"{scan_key / index_key:,.0f}x"))
+    rows.append(("100k leaf updates", f"{scan_updates:.2f} s", f"{index_updates:.2f} s",
+                 f"{scan_updates / index_updates:.2f}x"))
+
+    print(f"{FANOUT ** LEVELS:,} leaves, both indexes built in {build_seconds:.2f} s")
+    print(f"find_value returns {len(tree.find_value('fatal'))} paths, "
+          f"find_key returns {len(tree.find_key('error'))} nodes")
+    print_table(('operation', 'scan', 'index', 'speedup'), rows)
+
+
+if __name__ == '__main__':
+    main()
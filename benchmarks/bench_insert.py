@@ -0,0 +1,57 @@
+"""
+Path insertion throughput at different tree depths.
+
+Compares insert, insert_many, add_fiber and list assignment
+(tree[key] = [...]) for paths of depth 3, 10 and 100.
+"""
+
+import _common  # noqa: F401  (sets up sys.path)
+from _common import best_of, print_table
+
+from cswtools import Yggdrasil
+
+DEPTHS = (3, 10, 100)
+TOTAL_KEYS = 300_000
+
+
+def make_fibers(depth, count):
+    # Paths share their upper levels, like real hierarchical data
+    return [tuple(f"k{(i >> level) % 8}" for level in range(depth)) + (i,)
+            for i in range(count)]
+
+
+def main():
+    rows = []
+    for depth in DEPTHS:
+        count = TOTAL_KEYS // depth
+        fibers = make_fibers(depth, count)
+
+        def run_insert():
+            tree = Yggdrasil(leaf_behavior='add')
+            for fiber in fibers:
+                tree.insert(fiber[:-1], fiber[-1])
+
+        def run_insert_many():
+            Yggdrasil(leaf_behavior='add').insert_many(fibers)
+
+        def run_add_fiber():
+            tree = Yggdrasil(leaf_behavior='add')
+            for fiber in fibers:
+                tree.add_fiber(fiber)
+
+        def run_list_assignment():
+            tree = Yggdrasil(leaf_behavior='add')
+            for fiber in fibers:
+                tree[fiber[0]] = list(fiber[1:])
+
+        for name, func in (('insert', run_insert), ('insert_many', run_insert_many),
+                           ('add_fiber', run_add_fiber),
+                           ('tree[k] = [...]', run_list_assignment)):
+            seconds = best_of(func)
+            rows.append((depth, name, count, f"{count / seconds:,.0f}"))
+
+    print_table(('depth', 'method', 'paths', 'paths/s'), rows)
+
+
+if __name__ == '__main__':
+    main()
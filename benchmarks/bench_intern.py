@@ -0,0 +1,94 @@
+"""
+Memory and lookup latency of a tree with interned keys.
+
+The dataset is a table of daily metrics, region / date / product / status
+-> count, read from SQLite. The driver returns a new string object for every
+cell, so without interning each node holds its own copies of the repeated
+keys. (pandas.read_csv already shares equal strings within a column.) The
+tree is measured with plain keys, built with intern_keys=True and interned
+after the build.
+"""
+
+import random
+import sqlite3
+import tracemalloc
+
+import _common  # noqa: F401  (sets up sys.path)
+from _common import best_of, print_table
+
+from cswtools import Yggdrasil
+
+REGIONS = [f"region-{i}" for i in range(8)]
+DATES = [f"2026-{month:02d}-{day:02d}" for month in range(1, 13) for day in range(1, 29)]
+PRODUCTS = [f"product-{i:03d}" for i in range(60)]
+STATUSES = ['delivered', 'pending', 'cancelled', 'returned']
+ROWS = 600_000
+LOOKUPS = 200_000
+
+
+def make_database():
+    rng = random.Random(0)
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE metrics (region TEXT, date TEXT, product TEXT, status TEXT, "
+                 "count INTEGER)")
+    conn.executemany("INSERT INTO metrics VALUES (?, ?, ?, ?, ?)",
+                     [(rng.choice(REGIONS), rng.choice(DATES), rng.choice(PRODUCTS),
+                       rng.choice(STATUSES), rng.randint(1, 9)) for _ in range(ROWS)])
+    return conn
+
+
+def build(conn, intern_keys=False, intern_after=False):
+    tracemalloc.start()
+    if intern_keys:
+        tree = Yggdrasil(leaf_behavior='add', intern_keys=True)
+        tree.insert_many(conn.execute("SELECT * FROM metrics"))
+    else:
+        tree = Yggdrasil.from_sql("SELECT * FROM metrics", conn, leaf_behavior='add',
+                                  chunksize=50_000)
+    if intern_after:
+        tree.intern_keys = True
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return tree, size
+
+
+def main():
+    conn = make_database()
+    rng = random.Random(1)
+    # Probe with fresh key objects, as a caller parsing requests would
+    probes = [tuple(''.join(list(key)) for key in (rng.choice(REGIONS), rng.choice(DATES),
+                                                   rng.choice(PRODUCTS), rng.choice(STATUSES)))
+              for _ in range(LOOKUPS)]
+
+    rows = []
+    for name, options in (("plain keys", {}),
+                          ("intern_keys=True", {'intern_keys': True}),
+                          ("interned after build", {'intern_after': True})):
+        tree, size = build(conn, **options)
+
+        def get_path():
+            lookup = tree.get_path
+            for path in probes:
+                lookup(path)
+
+        def chained():
+            for region, date, product, status in probes:
+                node = tree.get(region)
+                if node is not None:
+                    node = node.get(date)
+                    if node is not None:
+                        node = node.get(product)
+                        if node is not None:
+                            node.get(status)
+
+        rows.append([name, f"{size / 2 ** 20:.1f}",
+                     f"{best_of(get_path) / LOOKUPS * 1e9:.0f}",
+                     f"{best_of(chained) / LOOKUPS * 1e9:.0f}"])
+        del tree
+
+    print(f"{ROWS:,} rows, {LOOKUPS:,} lookups")
+    print_table(["keys", "tree MiB", "get_path ns", "chained get ns"], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Syncing a replica with journal deltas against reshipping the whole tree.
+
+For trees of growing size, a replica is brought up to date after CHANGES
+leaf updates, either by pickling and loading the whole tree (what a
+rebuild or reship costs at least) or by pickling the journal entries and
+replaying them with apply_delta. The last table shows what journaling
+adds to every write.
+"""
+
+import pickle
+import time
+
+import numpy as np
+
+import _common  # noqa: F401  (sets up sys.path)
+from _common import best_of, print_table
+
+from cswtools import Yggdrasil
+
+FANOUT = 10
+LEVELS = (5, 6, 7)  # FANOUT ** levels leaves
+CHANGES = 100
+WRITES = 500_000
+
+
+def build(levels):
+    leaves = np.arange(FANOUT ** levels)
+    paths = np.stack([leaves // FANOUT ** level % FANOUT for level in reversed(range(levels))],
+                     axis=1)
+    tree = Yggdrasil(leaf_behavior='add')
+    tree.add_many(paths, np.ones(len(leaves), dtype=np.int64))
+    return tree
+
+
+def main():
+    rng = np.random.default_rng(0)
+    rows = []
+    for levels in LEVELS:
+        tree = build(levels)
+        tree.start_journal()
+        replica = Yggdrasil.from_checkpoint(tree.compact_journal())
+
+        started = time.perf_counter()
+        payload = pickle.dumps(tree, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.loads(payload)
+        full = time.perf_counter() - started
+
+        def delta_sync():
+            for leaf in rng.integers(0, FANOUT ** levels, CHANGES).tolist():
+                tree.insert([leaf // FANOUT ** level % FANOUT
+                             for level in reversed(range(levels))], 1)
+            delta = pickle.dumps(tree.changes(replica.version), protocol=pickle.HIGHEST_PROTOCOL)
+            replica.apply_delta(pickle.loads(delta))
+            return len(delta)
+
+        delta_seconds = best_of(delta_sync)
+        delta_bytes = delta_sync()
+        assert replica == tree
+
+        rows.append([f"{FANOUT ** levels:,}", f"{full:.2f} s", f"{len(payload) / 2 ** 20:.1f} MiB",
+                     f"{delta_seconds * 1000:.2f} ms", f"{delta_bytes / 1024:.1f} KiB"])
+        del tree, replica, payload
+
+    print(f"Sync after {CHANGES} leaf updates")
+    print_table(["leaves", "full pickle", "full size", "delta sync", "delta size"], rows)
+
+    overhead = []
+    keys = [(i % 100, i % 7) for i in range(WRITES)]
+    for journaled in (False, True):
+        def writes():
+            tree = Yggdrasil(leaf_behavior='add')
+            if journaled:
+                tree.start_journal()
+            for path in keys:
+                tree.insert(path, 1)
+
+        seconds = best_of(writes)
+        overhead.append(["journal" if journaled else "no journal", f"{WRITES / seconds:,.0f}"])
+    print()
+    print_table(["writes", "inserts/s"], overhead)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+Leaf collision throughput for every built-in leaf behavior.
+
+Each run repeatedly assigns to the same small set of leaves, so every
+assignment after the first goes through the leaf merge strategy.
+"""
+
+import _common  # noqa: F401  (sets up sys.path)
+from _common import best_of, print_table
+
+from cswtools import Yggdrasil
+
+UPDATES = 500_000
+LEAVES = 100
+
+
+def custom_merge(existing, new):
+    return max(existing, new)
+
+
+BEHAVIORS = ('overwrite', 'append', 'add', 'subtract', 'multiply', 'divide', custom_merge)
+
+
+def main():
+    keys = [f"leaf{i % LEAVES}" for i in range(UPDATES)]
+    values = [1 + i % 7 for i in range(UPDATES)]
+
+    rows = []
+    for behavior in BEHAVIORS:
+        def run():
+            node = Yggdrasil(leaf_behavior=behavior)
+            for key, value in zip(keys, values):
+                node[key] = value
+
+        seconds = best_of(run)
+        name = behavior if isinstance(behavior, str) else 'custom callable'
+        rows.append((name, f"{UPDATES / seconds:,.0f}"))
+
+    print_table(('behavior', 'updates/s'), rows)
+
+
+if __name__ == '__main__':
+    main()
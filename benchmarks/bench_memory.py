@@ -0,0 +1,75 @@
+"""
+Memory footprint of a tree with 1M leaves.
+
+Compares the compact node layout (shared tree config, __slots__ nodes)
+against nodes that carry their own attribute __dict__, which is how every
+node stored its leaf_behavior before, and against plain nested dicts.
+"""
+
+import tracemalloc
+from collections import defaultdict
+
+import _common  # noqa: F401  (sets up sys.path)
+from _common import print_table
+
+from cswtools import Yggdrasil
+
+LEVELS = 6
+FANOUT = 10  # FANOUT ** LEVELS leaves
+
+
+class PerNodeAttributes(dict):
+    """Node layout with a per-instance __dict__ holding the leaf behavior."""
+
+    def __init__(self, leaf_behavior='overwrite'):
+        super().__init__()
+        self.leaf_behavior = leaf_behavior
+
+    def __missing__(self, key):
+        node = self[key] = self.__class__(leaf_behavior=self.leaf_behavior)
+        return node
+
+
+def nested_defaultdict():
+    return defaultdict(nested_defaultdict)
+
+
+def paths():
+    for i in range(FANOUT ** LEVELS):
+        yield tuple((i // FANOUT ** level) % FANOUT for level in reversed(range(LEVELS)))
+
+
+def build(factory):
+    tree = factory()
+    for path in paths():
+        node = tree
+        for key in path[:-1]:
+            node = node[key]
+        node[path[-1]] = 1
+    return tree
+
+
+def measure(factory):
+    tracemalloc.start()
+    tree = build(factory)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del tree
+    return size
+
+
+def main():
+    rows = []
+    for name, factory in (('Yggdrasil (compact)', Yggdrasil),
+                          ('per-node __dict__', PerNodeAttributes),
+                          ('nested defaultdict', nested_defaultdict)):
+        size = measure(factory)
+        rows.append((name, f"{size / 2 ** 20:,.1f} MiB"))
+
+    internal = sum(FANOUT ** level for level in range(LEVELS))
+    print(f"{FANOUT ** LEVELS:,} leaves, {internal:,} internal nodes")
+    print_table(('layout', 'traced memory'), rows)
+
+
+if __name__ == '__main__':
+    main()
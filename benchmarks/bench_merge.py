@@ -0,0 +1,69 @@
+"""
+Combining many partial trees into one.
+
+Compares Yggdrasil.merge (with and without consume) against flattening
+each partial tree and re-inserting every leaf.
+"""
+
+import _common  # noqa: F401  (sets up sys.path)
+from _common import best_of, print_table
+
+from cswtools import Yggdrasil
+
+PARTIALS = 24
+LEAVES_PER_PARTIAL = 50_000
+
+
+def make_partials():
+    partials = []
+    for hour in range(PARTIALS):
+        tree = Yggdrasil(leaf_behavior='add')
+        for i in range(LEAVES_PER_PARTIAL):
+            # Half of the leaves are shared between hours, half are new
+            tree.insert((f"region{i % 20}", f"store{i % 1000}", f"sku{i + hour * (i % 2)}"), 1)
+        partials.append(tree)
+    return partials
+
+
+def flatten(tree):
+    stack = [((), tree)]
+    while stack:
+        prefix, node = stack.pop()
+        for key, value in node.items():
+            if isinstance(value, Yggdrasil):
+                stack.append((prefix + (key,), value))
+            else:
+                yield prefix + (key,), value
+
+
+def main():
+    def run_reinsert():
+        total = Yggdrasil(leaf_behavior='add')
+        for partial in make_partials():
+            for path, value in flatten(partial):
+                total.insert(path, value)
+
+    def run_merge():
+        total = Yggdrasil(leaf_behavior='add')
+        for partial in make_partials():
+            total.merge(partial)
+
+    def run_merge_consume():
+        total = Yggdrasil(leaf_behavior='add')
+        for partial in make_partials():
+            total.merge(partial, consume=True)
+
+    # Building the partials is part of every run, measure it separately
+    build = best_of(make_partials, repeat=1)
+    rows = []
+    for name, func in (('flatten + insert', run_reinsert), ('merge', run_merge),
+                       ('merge(consume=True)', run_merge_consume)):
+        seconds = best_of(func, repeat=1) - build
+        rows.append((name, f"{seconds:.2f} s"))
+
+    print(f"{PARTIALS} partial trees with {LEAVES_PER_PARTIAL:,} leaves each")
+    print_table(('method', 'combine time'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Scaling of the sharded from_dataframe build with the number of workers.
+
+Speedups depend on the number of available cores; pickling the shards and
+the finished subtrees between processes is included in the timings.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+import _common  # noqa: F401  (sets up sys.path)
+from _common import best_of, print_table
+
+from cswtools import Yggdrasil
+
+ROWS = 1_000_000
+WORKERS = (1, 2, 4, 8, 16)
+
+
+def make_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'region': rng.choice([f"region{i}" for i in range(64)], rows),
+        'store': rng.choice([f"store{i}" for i in range(500)], rows),
+        'sku': rng.integers(0, 100, rows),
+        'amount': rng.integers(1, 10, rows),
+    })
+
+
+def main():
+    df = make_frame(ROWS)
+
+    rows = []
+    serial = None
+    for workers in WORKERS:
+        seconds = best_of(lambda: Yggdrasil.from_dataframe(df, leaf_behavior='add',
+                                                           workers=workers), repeat=1)
+        serial = serial or seconds
+        rows.append((workers, f"{seconds:.2f} s", f"{ROWS / seconds:,.0f}",
+                     f"{serial / seconds:.2f}x"))
+
+    print(f"{ROWS:,} rows, {os.cpu_count()} CPUs")
+    print_table(('workers', 'time', 'rows/s', 'speedup'), rows)
+
+
+if __name__ == '__main__':
+    main()
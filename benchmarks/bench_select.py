@@ -0,0 +1,65 @@
+"""
+Path pattern queries on a deep tree.
+
+Selective patterns (exact keys, narrow globs) only enter the branches that
+can match; broad patterns ('**') have to visit every node. Each pattern is
+compared with a full walk that tests every fiber against the same pattern.
+"""
+
+from fnmatch import fnmatchcase
+
+import _common  # noqa: F401  (sets up sys.path)
+from _common import best_of, print_table
+
+from cswtools import Yggdrasil
+
+LEVELS = 6
+FANOUT = 10  # FANOUT ** LEVELS leaves
+
+
+def build():
+    tree = Yggdrasil()
+    names = [f"k{i}" for i in range(FANOUT)]
+    for i in range(FANOUT ** LEVELS):
+        path = tuple(names[(i // FANOUT ** level) % FANOUT] for level in reversed(range(LEVELS)))
+        tree.insert(path, i)
+    return tree
+
+
+def walk_matches(tree, segments):
+    """Test every fiber with fnmatch, a stand-in for the ad-hoc loops select replaces"""
+    found = []
+    for fiber in tree.iter_fibers():
+        keys = fiber[:-1]
+        if len(keys) == len(segments) and all(map(fnmatchcase, keys, segments)):
+            found.append((keys, fiber[-1]))
+    return found
+
+
+PATTERNS = [
+    ('exact leaf', 'k1/k2/k3/k4/k5/k6'),
+    ('one wildcard level', 'k1/k2/*/k4/k5/k6'),
+    ('narrow glob', 'k1/k[23]/*/k4/k5/k?'),
+    ('broad: all leaves', '*/*/*/*/*/*'),
+    ('broad: **/k7', '**/k7'),
+]
+
+
+def main():
+    tree = build()
+    rows = []
+    for name, pattern in PATTERNS:
+        matches = len(list(tree.select(pattern)))
+        seconds = best_of(lambda: list(tree.select(pattern)))
+        walk = ""
+        if '**' not in pattern:
+            walk_seconds = best_of(lambda: walk_matches(tree, pattern.split('/')), repeat=1)
+            walk = f"{walk_seconds * 1000:,.1f} ms"
+        rows.append((name, pattern, f"{matches:,}", f"{seconds * 1000:,.3f} ms", walk))
+
+    print(f"{FANOUT ** LEVELS:,} leaves, depth {LEVELS}")
+    print_table(('query', 'pattern', 'matches', 'select', 'full walk'), rows)
+
+
+if __name__ == '__main__':
+    main()
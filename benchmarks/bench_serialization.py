@@ -0,0 +1,75 @@
+"""
+Cold-start cost of a persisted tree.
+
+Compares Yggdrasil.load (eager and memory-mapped) against pickle and
+against rebuilding the tree with from_sql.
+"""
+
+import os
+import pickle
+import sqlite3
+import tempfile
+import time
+
+import _common  # noqa: F401  (sets up sys.path)
+from _common import best_of, print_table
+
+from cswtools import Yggdrasil
+
+ROWS = 500_000
+
+
+def make_database(path):
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE config (section TEXT, service TEXT, setting TEXT, value REAL)')
+    conn.executemany('INSERT INTO config VALUES (?, ?, ?, ?)', (
+        (f"section{i % 50}", f"service{i % 2000}", f"setting{i}", i * 0.5)
+        for i in range(ROWS)))
+    conn.commit()
+    conn.close()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, 'config.db')
+        binary = os.path.join(directory, 'tree.ygg')
+        pickled = os.path.join(directory, 'tree.pickle')
+        make_database(database)
+
+        query = "SELECT * FROM config"
+        tree = Yggdrasil.from_sql(query, database)
+
+        started = time.perf_counter()
+        tree.save(binary)
+        save_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        with open(pickled, 'wb') as fh:
+            pickle.dump(tree, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle_seconds = time.perf_counter() - started
+
+        def load_pickle():
+            with open(pickled, 'rb') as fh:
+                pickle.load(fh)
+
+        def load_mmap():
+            mapped = Yggdrasil.load(binary, mmap=True)
+            # A service typically touches a handful of paths at startup
+            for i in range(10):
+                mapped.get_path((f"section{i}", f"service{i}", f"setting{i}"))
+
+        rows = [
+            ('from_sql', '-', '-', f"{best_of(lambda: Yggdrasil.from_sql(query, database), 1):.3f} s"),
+            ('pickle', f"{pickle_seconds:.3f} s", f"{os.path.getsize(pickled) / 2 ** 20:.1f} MiB",
+             f"{best_of(load_pickle):.3f} s"),
+            ('save/load', f"{save_seconds:.3f} s", f"{os.path.getsize(binary) / 2 ** 20:.1f} MiB",
+             f"{best_of(lambda: Yggdrasil.load(binary)):.3f} s"),
+            ('load(mmap=True) + 10 lookups', '-', '-', f"{best_of(load_mmap):.4f} s"),
+        ]
+
+    print(f"{ROWS:,} leaves")
+    print_table(('method', 'write', 'size', 'load'), rows)
+
+
+if __name__ == '__main__':
+    main()
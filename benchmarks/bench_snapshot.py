@@ -0,0 +1,79 @@
+"""
+Cost of copy-on-write snapshots against deep copies.
+
+Takes a snapshot of a tree with 1M leaves and compares it with
+copy.deepcopy, then measures random leaf updates without a snapshot, in a
+first pass after a snapshot (each touched node is copied once) and in a
+second pass over the same leaves (nothing left to copy), together with the
+memory the node copies take.
+"""
+
+import copy
+import sys
+import time
+
+import numpy as np
+
+import _common  # noqa: F401  (sets up sys.path)
+from _common import best_of, print_table
+
+from cswtools import Yggdrasil
+
+FANOUT = 10
+LEVELS = 6  # FANOUT ** LEVELS leaves
+UPDATES = 100_000
+
+
+def build():
+    leaves = np.arange(FANOUT ** LEVELS)
+    paths = np.stack([leaves // FANOUT ** level % FANOUT for level in reversed(range(LEVELS))],
+                     axis=1)
+    tree = Yggdrasil(leaf_behavior='add')
+    tree.add_many(paths, np.ones(len(leaves), dtype=np.int64))
+    return tree
+
+
+def main():
+    tree = build()
+    rng = np.random.default_rng(0)
+    leaves = rng.integers(0, FANOUT ** LEVELS, UPDATES)
+    updates = [tuple(leaf // FANOUT ** level % FANOUT for level in reversed(range(LEVELS)))
+               for leaf in leaves.tolist()]
+
+    def write_all():
+        started = time.perf_counter()
+        insert = tree.insert
+        for path in updates:
+            insert(path, 1)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    copy.deepcopy(tree)
+    deepcopy_seconds = time.perf_counter() - started
+    snapshot_seconds = best_of(lambda: tree.snapshot(), repeat=5)
+
+    print(f"{FANOUT ** LEVELS:,} leaves")
+    print_table(["operation", "time"], [
+        ["copy.deepcopy", f"{deepcopy_seconds * 1000:,.0f} ms"],
+        ["snapshot()", f"{snapshot_seconds * 1e6:.1f} us"],
+    ])
+
+    baseline = min(write_all() for _ in range(3))
+    snapshot = tree.snapshot()
+    first = write_all()
+    second = write_all()
+    preserved = snapshot._state.preserved
+    kept = sys.getsizeof(preserved) + sum(sys.getsizeof(entry) + sys.getsizeof(entry[1])
+                                          for entry in preserved.values())
+
+    print()
+    print_table(["writes", "updates/s", "nodes copied", "memory kept"], [
+        ["no snapshot", f"{UPDATES / baseline:,.0f}", "-", "-"],
+        ["first pass after snapshot", f"{UPDATES / first:,.0f}", f"{len(preserved):,}",
+         f"{kept / 2 ** 20:.1f} MiB"],
+        ["second pass", f"{UPDATES / second:,.0f}", f"{len(preserved):,}", ""],
+    ])
+
+
+if __name__ == '__main__':
+    main()
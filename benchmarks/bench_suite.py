@@ -0,0 +1,218 @@
+"""
+Regression suite for the hot paths of Yggdrasil.
+
+Runs item assignment, item access, add_fiber, from_dataframe, from_sql and
+print_tree on wide, deep and skewed trees (see _generators), and every leaf
+behavior on the skewed shape, where leaves collide most. For every case it
+reports operations per second (fibers, or lines for print_tree), the peak
+memory allocated by one run and the number of nodes of the resulting tree.
+
+Results can be saved as JSON and compared with a previous run; the script
+exits with status 1 if a case got slower than the tolerance allows:
+
+    python benchmarks/bench_suite.py --json before.json
+    python benchmarks/bench_suite.py --compare before.json
+"""
+
+import argparse
+import io
+import json
+import platform
+import sqlite3
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+import pandas as pd
+
+import _common  # noqa: F401  (sets up sys.path)
+from _common import print_table
+from _generators import SHAPES, count_nodes
+
+from cswtools import Yggdrasil
+
+BEHAVIORS = ('overwrite', 'append', 'add', 'subtract', 'multiply', 'divide', max)
+
+
+def behavior_name(behavior):
+    return behavior if isinstance(behavior, str) else behavior.__name__
+
+
+def build(fibers, leaf_behavior='add'):
+    tree = Yggdrasil(leaf_behavior=leaf_behavior)
+    tree.insert_many(fibers)
+    return tree
+
+
+def setitem_case(fibers, leaf_behavior='add'):
+    def run():
+        tree = Yggdrasil(leaf_behavior=leaf_behavior)
+        for fiber in fibers:
+            node = tree
+            for key in fiber[:-2]:
+                node = node[key]
+            node[fiber[-2]] = fiber[-1]
+        return tree, len(fibers)
+    return run
+
+
+def getitem_case(fibers):
+    tree = build(fibers)
+
+    def run():
+        for fiber in fibers:
+            node = tree
+            for key in fiber[:-1]:
+                node = node[key]
+        return tree, len(fibers)
+    return run
+
+
+def add_fiber_case(fibers):
+    def run():
+        tree = Yggdrasil(leaf_behavior='add')
+        for fiber in fibers:
+            tree.add_fiber(fiber)
+        return tree, len(fibers)
+    return run
+
+
+def columns_for(fibers):
+    return [f"c{i}" for i in range(len(fibers[0]) - 1)] + ['value']
+
+
+def from_dataframe_case(fibers):
+    df = pd.DataFrame(fibers, columns=columns_for(fibers))
+
+    def run():
+        return Yggdrasil.from_dataframe(df, leaf_behavior='add'), len(fibers)
+    return run
+
+
+def from_sql_case(fibers):
+    columns = columns_for(fibers)
+    conn = sqlite3.connect(':memory:')
+    conn.execute(f"CREATE TABLE fibers ({', '.join(columns)})")
+    conn.executemany(f"INSERT INTO fibers VALUES ({', '.join('?' * len(columns))})", fibers)
+
+    def run():
+        return Yggdrasil.from_sql("SELECT * FROM fibers", conn, leaf_behavior='add'), len(fibers)
+    return run
+
+
+def print_tree_case(fibers):
+    tree = build(fibers)
+
+    def run():
+        output = io.StringIO()
+        with redirect_stdout(output):
+            tree.print_tree()
+        return tree, output.getvalue().count('\n')
+    return run
+
+
+def cases(size):
+    """
+    Generate (name, shape, run) for every benchmark case.
+    """
+    for shape, generate in SHAPES.items():
+        fibers = generate(size)
+        for name, factory in (('setitem', setitem_case), ('getitem', getitem_case),
+                              ('add_fiber', add_fiber_case),
+                              ('from_dataframe', from_dataframe_case),
+                              ('from_sql', from_sql_case), ('print_tree', print_tree_case)):
+            yield name, shape, factory(fibers)
+
+    fibers = SHAPES['skewed'](size)
+    for behavior in BEHAVIORS:
+        yield f"leaf_merge[{behavior_name(behavior)}]", 'skewed', setitem_case(fibers, behavior)
+
+
+def measure(run, repeat):
+    """
+    Time run and measure the peak memory of one extra run.
+
+    Returns:
+        dict: ops_per_second, peak_bytes and nodes
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        tree, ops = run()
+        best = min(best, time.perf_counter() - started)
+        del tree
+
+    tracemalloc.start()
+    tree, ops = run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'ops_per_second': ops / best, 'peak_bytes': peak, 'nodes': count_nodes(tree)}
+
+
+def compare(results, baseline, tolerance):
+    """
+    Print the speed of every case relative to a baseline run.
+
+    Returns:
+        list: The names of the cases that got slower than the tolerance allows
+    """
+    rows = []
+    slower = []
+    for key, result in results.items():
+        before = baseline['results'].get(key)
+        if before is None:
+            rows.append([key, "-", f"{result['ops_per_second']:,.0f}", "new"])
+            continue
+        ratio = result['ops_per_second'] / before['ops_per_second']
+        flag = ""
+        if ratio < 1 / (1 + tolerance):
+            flag = "SLOWER"
+            slower.append(key)
+        rows.append([key, f"{before['ops_per_second']:,.0f}", f"{result['ops_per_second']:,.0f}",
+                     f"{ratio:.2f}x {flag}".strip()])
+    print()
+    print_table(["case", "baseline ops/s", "ops/s", "change"], rows)
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--size', type=int, default=100_000, help="fibers per shape")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per case")
+    parser.add_argument('--filter', default='', help="only run cases containing this text")
+    parser.add_argument('--json', help="write the results to this file")
+    parser.add_argument('--compare', help="compare with results written by --json")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="allowed slowdown before a case fails the comparison")
+    args = parser.parse_args()
+
+    results = {}
+    rows = []
+    for name, shape, run in cases(args.size):
+        key = f"{name}/{shape}"
+        if args.filter not in key:
+            continue
+        result = results[key] = measure(run, args.repeat)
+        rows.append([name, shape, f"{result['ops_per_second']:,.0f}",
+                     f"{result['peak_bytes'] / 2 ** 20:.1f}", f"{result['nodes']:,}"])
+
+    print(f"{args.size:,} fibers per shape, best of {args.repeat}")
+    print_table(["case", "shape", "ops/s", "peak MiB", "nodes"], rows)
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump({'size': args.size, 'python': platform.python_version(),
+                       'results': results}, handle, indent=2)
+
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)
+        if baseline['size'] != args.size:
+            print(f"\nWarning: the baseline used {baseline['size']:,} fibers per shape")
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,7 +6,8 @@ to create a tree-like data structure with automatic creation of nested dictionar
 and customizable leaf node behaviors.
 """
 
-from .yggdrasil import Yggdrasil
+from .yggdrasil import LeafAccumulator, Yggdrasil
+from .serialization import MappedTree
 
 __version__ = '0.1.0'
-__all__ = ['Yggdrasil']
\ No newline at end of file
+__all__ = ['Yggdrasil', 'LeafAccumulator', 'MappedTree']
\ No newline at end of file
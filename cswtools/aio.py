@@ -0,0 +1,97 @@
+"""
+asyncio builders for Yggdrasil trees.
+
+Rows are inserted in small batches and control goes back to the event loop
+after every batch, so building a large tree never blocks other tasks for
+longer than one batch takes.
+"""
+
+import asyncio
+import inspect
+
+
+async def tree_from_rows(cls, rows, leaf_behavior='overwrite', batch_size=1000):
+    """
+    Create a new tree of type cls from an (async) iterable of rows (see Yggdrasil.afrom_rows).
+
+    Args:
+        cls (type): The Yggdrasil subclass to build
+        rows: An async iterable or a regular iterable of fibers
+        leaf_behavior (str or callable): How to handle duplicate leaf nodes
+        batch_size (int): Number of rows to insert between two yields to the event loop
+
+    Returns:
+        Yggdrasil: A new tree containing the rows
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be a positive integer")
+
+    tree = cls(leaf_behavior=leaf_behavior)
+    batch = []
+    if hasattr(rows, '__aiter__'):
+        async for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                tree.insert_many(batch)
+                batch = []
+                await asyncio.sleep(0)
+    else:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                tree.insert_many(batch)
+                batch = []
+                await asyncio.sleep(0)
+    if batch:
+        tree.insert_many(batch)
+
+    return tree
+
+
+async def tree_from_sql(cls, query, connection, leaf_behavior='overwrite', batch_size=1000,
+                        parameters=None):
+    """
+    Create a new tree of type cls from a query on an async connection (see Yggdrasil.afrom_sql).
+
+    Args:
+        cls (type): The Yggdrasil subclass to build
+        query (str): The SQL query to execute
+        connection: An async database connection (aiosqlite, aiomysql, psycopg, ...)
+        leaf_behavior (str or callable): How to handle duplicate leaf nodes
+        batch_size (int): Number of rows to fetch and insert at a time
+        parameters (sequence or dict, optional): Parameters for the query
+
+    Returns:
+        Yggdrasil: A new tree containing the data from the query result
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be a positive integer")
+
+    tree = cls(leaf_behavior=leaf_behavior)
+
+    # Some drivers return the cursor directly, others a coroutine
+    cursor = await _resolve(connection.cursor())
+    try:
+        if parameters is None:
+            await cursor.execute(query)
+        else:
+            await cursor.execute(query, parameters)
+        while True:
+            chunk = await cursor.fetchmany(batch_size)
+            if not chunk:
+                break
+            tree.insert_many(chunk)
+            await asyncio.sleep(0)
+    finally:
+        await _resolve(cursor.close())
+
+    return tree
+
+
+async def _resolve(value):
+    """
+    Await value if it is awaitable, otherwise return it unchanged.
+    """
+    if inspect.isawaitable(value):
+        return await value
+    return value
@@ -0,0 +1,533 @@
+"""
+Disk-backed Yggdrasil trees for data that does not fit in memory.
+
+A DiskTree keeps its nodes in a SQLite file, one row per node holding the
+node's pickled entries. Recently used nodes stay in an LRU cache. Changed
+nodes are written back when they leave the cache or on flush, many rows per
+transaction. Nodes are handles (node id and store), so only the cached nodes
+occupy memory however large the tree is.
+
+Leaf values and keys are pickled; only open files from trusted sources.
+"""
+
+import pickle
+import sqlite3
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from itertools import chain, islice
+
+from .yggdrasil import Yggdrasil, _MISSING, _iter_tree_lines, _resolve_merger
+
+_ROOT = 0
+
+
+class _NodeStore:
+    """
+    The node rows of one DiskTree behind an LRU cache with write-back.
+
+    The entries of a node map each key to (child node id, None) for a
+    subtree or (None, value) for a leaf, in insertion order.
+    """
+
+    def __init__(self, path, leaf_behavior, cache_nodes, batch_size):
+        if cache_nodes < 1 or batch_size < 1:
+            raise ValueError("cache_nodes and batch_size must be positive integers")
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS nodes (id INTEGER PRIMARY KEY, entries BLOB NOT NULL)")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value BLOB NOT NULL)")
+
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE name = 'leaf_behavior'").fetchone()
+        if leaf_behavior is None:
+            leaf_behavior = pickle.loads(row[0]) if row is not None else 'overwrite'
+        self.set_leaf_behavior(leaf_behavior)
+
+        self.cache_nodes = cache_nodes
+        self.batch_size = batch_size
+        self.cache = OrderedDict()
+        self.dirty = set()
+        # Changed nodes that left the cache and wait to be written
+        self.pending = {}
+        self.deleted = set()
+
+        self.next_id = self.connection.execute(
+            "SELECT COALESCE(MAX(id), -1) + 1 FROM nodes").fetchone()[0]
+        if self.next_id == _ROOT:
+            self.new_node()
+
+    def set_leaf_behavior(self, leaf_behavior):
+        self.merge = _resolve_merger(leaf_behavior)
+        self.leaf_behavior = leaf_behavior
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('leaf_behavior', ?)",
+                (pickle.dumps(leaf_behavior),))
+
+    def get(self, node_id):
+        """
+        Return the entries of a node, reading them from disk if they are not cached.
+        """
+        entries = self.cache.get(node_id)
+        if entries is not None:
+            self.cache.move_to_end(node_id)
+            return entries
+
+        entries = self.pending.pop(node_id, None)
+        if entries is not None:
+            self.dirty.add(node_id)
+        else:
+            row = self.connection.execute(
+                "SELECT entries FROM nodes WHERE id = ?", (node_id,)).fetchone()
+            entries = pickle.loads(row[0])
+        self._cache(node_id, entries)
+        return entries
+
+    def put(self, node_id, entries):
+        """
+        Mark the entries of a node as changed. Call this after every change.
+        """
+        # The node may have left the cache while its entries were changed
+        self.pending.pop(node_id, None)
+        self.dirty.add(node_id)
+        if node_id in self.cache:
+            self.cache[node_id] = entries
+            self.cache.move_to_end(node_id)
+        else:
+            self._cache(node_id, entries)
+
+    def new_node(self):
+        node_id = self.next_id
+        self.next_id += 1
+        self.put(node_id, {})
+        return node_id
+
+    def delete(self, node_id):
+        """
+        Delete a node and every node below it.
+        """
+        stack = [node_id]
+        while stack:
+            current = stack.pop()
+            stack.extend(child for child, _ in self.get(current).values() if child is not None)
+            self.cache.pop(current, None)
+            self.dirty.discard(current)
+            self.deleted.add(current)
+        if len(self.deleted) >= self.batch_size:
+            self.write_back()
+
+    def _cache(self, node_id, entries):
+        cache = self.cache
+        cache[node_id] = entries
+        while len(cache) > self.cache_nodes:
+            old_id, old_entries = cache.popitem(last=False)
+            if old_id in self.dirty:
+                self.dirty.discard(old_id)
+                self.pending[old_id] = old_entries
+        if len(self.pending) >= self.batch_size:
+            self.write_back()
+
+    def write_back(self):
+        """
+        Write the pending nodes and deletions in one transaction.
+        """
+        protocol = pickle.HIGHEST_PROTOCOL
+        with self.connection:
+            if self.pending:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO nodes VALUES (?, ?)",
+                    [(node_id, pickle.dumps(entries, protocol))
+                     for node_id, entries in self.pending.items()])
+                self.pending.clear()
+            if self.deleted:
+                self.connection.executemany(
+                    "DELETE FROM nodes WHERE id = ?", [(node_id,) for node_id in self.deleted])
+                self.deleted.clear()
+
+    def flush(self):
+        for node_id in self.dirty:
+            self.pending[node_id] = self.cache[node_id]
+        self.dirty.clear()
+        self.write_back()
+
+
+class DiskTree(MutableMapping):
+    """
+    A Yggdrasil tree whose nodes live in a SQLite file instead of memory.
+
+    DiskTree has the mapping behavior of Yggdrasil: reading a missing key
+    creates a node, assignments go through the leaf behavior, non-empty
+    lists are paths, and insert, add_fiber, get_path and print_tree work as
+    usual. Nodes are handles, so tree['a'] returns an equal but new object
+    each time. Changes are written to disk when nodes leave the cache and on
+    flush or close. A DiskTree is not thread-safe.
+    """
+
+    __slots__ = ('_store', '_id')
+
+    def __init__(self, path, leaf_behavior=None, cache_nodes=100_000, batch_size=1000):
+        """
+        Open or create a disk-backed tree.
+
+        Args:
+            path (str or os.PathLike): The SQLite file (':memory:' for a temporary tree)
+            leaf_behavior (str or callable, optional): How to handle duplicate leaf
+                nodes (see Yggdrasil). Defaults to the behavior stored in the file,
+                or 'overwrite' for a new file. A custom callable must be picklable.
+            cache_nodes (int): Number of nodes kept in memory
+            batch_size (int): Number of changed nodes written per transaction
+
+        Raises:
+            ValueError: If leaf_behavior is an unknown behavior name or a size is not positive
+            TypeError: If leaf_behavior is neither a string nor a callable
+        """
+        self._store = _NodeStore(path, leaf_behavior, cache_nodes, batch_size)
+        self._id = _ROOT
+
+    def _node(self, node_id):
+        node = object.__new__(self.__class__)
+        node._store = self._store
+        node._id = node_id
+        return node
+
+    @property
+    def leaf_behavior(self):
+        """The leaf behavior of the tree (str or callable)."""
+        return self._store.leaf_behavior
+
+    @leaf_behavior.setter
+    def leaf_behavior(self, leaf_behavior):
+        self._store.set_leaf_behavior(leaf_behavior)
+
+    def __getitem__(self, key):
+        store = self._store
+        entries = store.get(self._id)
+        entry = entries.get(key)
+        if entry is None:
+            # Missing keys create a node, like Yggdrasil.__missing__
+            child = store.new_node()
+            entries[key] = (child, None)
+            store.put(self._id, entries)
+            return self._node(child)
+        child, value = entry
+        return value if child is None else self._node(child)
+
+    def __setitem__(self, key, values=None):
+        if isinstance(values, list) and values:
+            # A non-empty list is a path below key whose last element is the leaf value
+            self.insert(chain((key,), islice(values, len(values) - 1)), values[-1])
+            return
+        self._set(key, values)
+
+    def _set(self, key, value):
+        store = self._store
+        entries = store.get(self._id)
+        entry = entries.get(key)
+        if isinstance(value, (Yggdrasil, DiskTree)):
+            child = self._copy_in(value)
+            if entry is not None and entry[0] is not None:
+                store.delete(entry[0])
+            # Copying may have evicted this node, fetch its entries again
+            entries = store.get(self._id)
+            entries[key] = (child, None)
+        elif entry is None:
+            entries[key] = (None, value)
+        elif entry[0] is None:
+            entries[key] = (None, store.merge(entry[1], value))
+        else:
+            # A leaf replaces a subtree, as in Yggdrasil
+            store.delete(entry[0])
+            entries = store.get(self._id)
+            entries[key] = (None, value)
+        store.put(self._id, entries)
+
+    def _copy_in(self, tree):
+        """
+        Copy a Yggdrasil or DiskTree into new nodes of this tree.
+
+        Returns:
+            int: The id of the copied root
+        """
+        store = self._store
+        root = store.new_node()
+        stack = [(root, tree)]
+        while stack:
+            target, source = stack.pop()
+            entries = {}
+            for key, value in source.items():
+                if isinstance(value, (Yggdrasil, DiskTree)):
+                    child = store.new_node()
+                    stack.append((child, value))
+                    entries[key] = (child, None)
+                else:
+                    entries[key] = (None, value)
+            store.put(target, entries)
+        return root
+
+    def __delitem__(self, key):
+        store = self._store
+        entries = store.get(self._id)
+        child, _ = entries.pop(key)
+        store.put(self._id, entries)
+        if child is not None:
+            store.delete(child)
+
+    # The MutableMapping versions go through __getitem__, which creates missing nodes
+
+    def get(self, key, default=None):
+        entry = self._store.get(self._id).get(key)
+        if entry is None:
+            return default
+        child, value = entry
+        return value if child is None else self._node(child)
+
+    def pop(self, key, default=_MISSING):
+        """
+        Remove a key and return its value.
+
+        A removed subtree is returned as an in-memory Yggdrasil, since its
+        nodes are deleted from the file.
+        """
+        store = self._store
+        entries = store.get(self._id)
+        entry = entries.pop(key, None)
+        if entry is None:
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        store.put(self._id, entries)
+        child, value = entry
+        if child is None:
+            return value
+        value = self._node(child).to_tree()
+        store.delete(child)
+        return value
+
+    def setdefault(self, key, default=None):
+        entry = self._store.get(self._id).get(key)
+        if entry is None:
+            # Stored as given, like dict.setdefault: lists are not paths here
+            self._set(key, default)
+            return self.get(key)
+        child, value = entry
+        return value if child is None else self._node(child)
+
+    def __iter__(self):
+        # Iterate over a copy, reading values may evict and reload the node
+        return iter(list(self._store.get(self._id)))
+
+    def __len__(self):
+        return len(self._store.get(self._id))
+
+    def __contains__(self, key):
+        return key in self._store.get(self._id)
+
+    def __repr__(self):
+        return f"<DiskTree node {self._id} with {len(self)} children>"
+
+    def _items(self):
+        """
+        Generate (key, value) pairs without looking up every key again.
+        """
+        for key, (child, value) in list(self._store.get(self._id).items()):
+            yield key, value if child is None else self._node(child)
+
+    def _child(self, key):
+        """
+        Return the child node at key, creating it if it does not exist yet.
+
+        Raises:
+            TypeError: If key holds a leaf value instead of a node
+        """
+        entry = self._store.get(self._id).get(key)
+        if entry is None:
+            return self[key]
+        if entry[0] is None:
+            raise TypeError(f"Cannot descend into leaf value at key {key!r}")
+        return self._node(entry[0])
+
+    def get_path(self, path, default=None):
+        """
+        Look up the value at the end of a path without creating any nodes.
+
+        Args:
+            path: An iterable of keys
+            default: The value to return if the path does not exist
+
+        Returns:
+            The DiskTree node or leaf value at the end of the path, or default
+        """
+        store = self._store
+        child, value = self._id, None
+        for key in path:
+            if child is None:
+                return default
+            entry = store.get(child).get(key)
+            if entry is None:
+                return default
+            child, value = entry
+        return value if child is None else self._node(child)
+
+    def contains_path(self, path):
+        """
+        Check whether a path exists without creating any nodes.
+
+        Args:
+            path: An iterable of keys
+
+        Returns:
+            bool: True if every key of the path exists
+        """
+        return self.get_path(path, _MISSING) is not _MISSING
+
+    def insert(self, path, value):
+        """
+        Set the leaf at the end of a path, creating intermediate nodes as needed.
+
+        Args:
+            path: A non-empty iterable of keys
+            value: The leaf value to store at the end of the path
+        """
+        if hasattr(path, 'tolist'):
+            path = path.tolist()
+
+        keys = iter(path)
+        try:
+            key = next(keys)
+        except StopIteration:
+            raise ValueError("Cannot insert an empty path") from None
+
+        node = self
+        for next_key in keys:
+            node = node._child(key)
+            key = next_key
+        node[key] = value
+
+    def add_fiber(self, fiber):
+        """
+        Add a fiber, a path whose last element is the leaf value (see Yggdrasil.add_fiber).
+
+        Args:
+            fiber: A non-empty list-like object or pandas Series
+        """
+        if hasattr(fiber, 'tolist'):
+            fiber = fiber.tolist()
+
+        elements = iter(fiber)
+        try:
+            key = next(elements)
+        except StopIteration:
+            raise ValueError("Cannot insert an empty fiber") from None
+        try:
+            value = next(elements)
+        except StopIteration:
+            # A lone sprout becomes a leaf holding an empty path
+            self[key] = []
+            return
+
+        # Stay one element behind so the last element becomes the leaf value
+        node = self
+        for element in elements:
+            node = node._child(key)
+            key, value = value, element
+        node[key] = value
+
+    def insert_many(self, fibers):
+        """
+        Add many fibers to the tree.
+
+        Args:
+            fibers: An iterable of fibers, as accepted by add_fiber
+        """
+        for fiber in fibers:
+            self.add_fiber(fiber)
+
+    @classmethod
+    def from_sql(cls, query, connection, path, leaf_behavior=None, chunksize=10000, **options):
+        """
+        Stream the rows of a SQL query into a disk-backed tree.
+
+        Rows are fetched chunksize at a time, so neither the query result
+        nor the tree has to fit in memory.
+
+        Args:
+            query (str): The SQL query to execute
+            connection: A database connection object or a SQLite connection string
+            path (str or os.PathLike): The SQLite file of the tree
+            leaf_behavior (str or callable, optional): How to handle duplicate leaf nodes
+            chunksize (int): Number of rows to fetch at a time
+            **options: cache_nodes and batch_size (see DiskTree)
+
+        Returns:
+            DiskTree: The tree, flushed to disk
+        """
+        tree = cls(path, leaf_behavior=leaf_behavior, **options)
+        conn = sqlite3.connect(connection) if isinstance(connection, str) else connection
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(query)
+                while True:
+                    rows = cursor.fetchmany(chunksize)
+                    if not rows:
+                        break
+                    tree.insert_many(rows)
+            finally:
+                cursor.close()
+        finally:
+            if conn is not connection:
+                conn.close()
+        tree.flush()
+        return tree
+
+    def to_tree(self, cls=Yggdrasil):
+        """
+        Load this node and everything below it into a regular in-memory tree.
+
+        Args:
+            cls (type): The Yggdrasil class to build
+
+        Returns:
+            Yggdrasil: The loaded tree
+        """
+        tree = cls(leaf_behavior=self.leaf_behavior)
+        stack = [(tree, self)]
+        while stack:
+            target, source = stack.pop()
+            for key, value in source._items():
+                if isinstance(value, DiskTree):
+                    child = tree._new_node(target, key)
+                    stack.append((child, value))
+                    value = child
+                dict.__setitem__(target, key, value)
+        return tree
+
+    def flush(self):
+        """
+        Write every changed node to disk.
+        """
+        self._store.flush()
+
+    def close(self):
+        """
+        Flush the tree and close its file.
+        """
+        self._store.flush()
+        self._store.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _iter_lines(self, prefix, max_depth, max_children):
+        return _iter_tree_lines(self, prefix, max_depth, max_children, DiskTree, DiskTree._items)
+
+    iter_lines = Yggdrasil.iter_lines
+    render = Yggdrasil.render
+    print_tree = Yggdrasil.print_tree
@@ -0,0 +1,478 @@
+"""
+DataFrame and SQL adapters for Yggdrasil trees.
+
+This module holds everything that needs numpy, pandas or a database driver, so
+that importing cswtools stays cheap. The Yggdrasil methods from_dataframe,
+from_sql and to_dataframe import it on first use.
+"""
+
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .yggdrasil import Yggdrasil, _gc_paused
+
+# Leaf behaviors whose batches scatter_leaves reduces with a NumPy ufunc, as
+# (ufunc, identity). A batch [v1, v2, ..., vn] is folded into the leaf as
+# [v1, rest] where rest reduces v2..vn: subtracting v2, ..., vn one after
+# another is the same as subtracting their sum.
+_SCATTER_REDUCERS = {
+    'add': (np.add, 0),
+    'subtract': (np.add, 0),
+    'multiply': (np.multiply, 1),
+}
+
+
+def tree_from_dataframe(cls, df, leaf_behavior='overwrite', workers=None):
+    """
+    Create a new tree of type cls from a pandas DataFrame (see Yggdrasil.from_dataframe).
+
+    Args:
+        cls (type): The Yggdrasil subclass to build
+        df (pandas.DataFrame): The DataFrame to convert to a tree
+        leaf_behavior (str or callable): How to handle duplicate leaf nodes
+        workers (int, optional): Number of worker processes for a parallel build
+
+    Returns:
+        Yggdrasil: A new tree containing the data from the DataFrame
+    """
+    if workers is not None and workers > 1:
+        return _from_dataframe_parallel(cls, df, leaf_behavior, workers)
+
+    tree = cls(leaf_behavior=leaf_behavior)
+
+    # Work on whole columns instead of boxing every row into a Series.
+    # df.values keeps missing values of nullable extension dtypes (Int64,
+    # string, ...) as pd.NA, where iterrows() may turn them into nan.
+    rows = df.values
+    if rows.shape[1] < 2:
+        # Fibers without a leaf key keep the row-by-row semantics
+        for row in rows.tolist():
+            tree.add_fiber(row)
+        return tree
+
+    key_columns = [rows[:, i] for i in range(rows.shape[1] - 1)]
+    bulk_load(tree, key_columns, rows[:, -1].tolist())
+
+    return tree
+
+
+def tree_to_dataframe(tree, columns=None, fill_value=None):
+    """
+    Flatten a tree into a DataFrame with one row per leaf (see Yggdrasil.to_dataframe).
+
+    Args:
+        tree (Yggdrasil): The tree to flatten
+        columns (list, optional): Column names, key columns followed by the value column
+        fill_value: The key used to pad leaves that are not at the deepest level
+
+    Returns:
+        pandas.DataFrame: The fibers of the tree
+    """
+    columns = tree._column_names(columns)
+    width = len(columns) - 1
+
+    key_columns = [[] for _ in range(width)]
+    leaf_values = []
+    for path, keys, values in tree._iter_leaf_runs():
+        count = len(keys)
+        # The shared path is repeated once per run instead of once per leaf
+        for level, key in enumerate(path):
+            key_columns[level].extend([key] * count)
+        key_columns[len(path)].extend(keys)
+        for level in range(len(path) + 1, width):
+            key_columns[level].extend([fill_value] * count)
+        leaf_values.extend(values)
+
+    data = dict(zip(columns, key_columns))
+    data[columns[-1]] = leaf_values
+    return pd.DataFrame(data, columns=columns)
+
+
+def _from_dataframe_parallel(cls, df, leaf_behavior, workers):
+    """
+    Build a tree from a DataFrame with one process per shard of root keys.
+
+    Args:
+        cls (type): The Yggdrasil subclass to build
+        df (pandas.DataFrame): The DataFrame to convert to a tree
+        leaf_behavior (str or callable): How to handle duplicate leaf nodes
+        workers (int): Number of worker processes
+
+    Returns:
+        Yggdrasil: A new tree containing the data from the DataFrame
+    """
+    # Validate the behavior before starting any process
+    tree = cls(leaf_behavior=leaf_behavior)
+
+    if df.shape[1] < 2:
+        return tree_from_dataframe(cls, df, leaf_behavior=leaf_behavior)
+
+    roots, uniques = pd.factorize(df.iloc[:, 0].to_numpy())
+    if len(uniques) < 2 or (roots < 0).any():
+        # Nothing to split, or missing root keys whose identity semantics
+        # cannot be preserved across processes: build serially
+        return tree_from_dataframe(cls, df, leaf_behavior=leaf_behavior)
+
+    # Assign root keys to shards, largest first, always to the lightest shard
+    counts = np.bincount(roots)
+    shard_count = min(workers, len(uniques))
+    shard_of_root = np.empty(len(uniques), dtype=np.intp)
+    loads = [0] * shard_count
+    for root in np.argsort(-counts, kind='stable').tolist():
+        shard = loads.index(min(loads))
+        shard_of_root[root] = shard
+        loads[shard] += counts[root]
+
+    shard_of_row = shard_of_root[roots]
+    parts = [df[shard_of_row == shard] for shard in range(shard_count)]
+
+    with ProcessPoolExecutor(max_workers=shard_count) as executor:
+        shards = list(executor.map(_build_shard, [cls] * shard_count, parts,
+                                   [leaf_behavior] * shard_count))
+
+    # Shards hold disjoint root keys, each in order of first appearance.
+    # Interleave them back into the global first-appearance order.
+    shard_items = [iter(dict.items(shard)) for shard in shards]
+    for shard in shard_of_root.tolist():
+        key, value = next(shard_items[shard])
+        if isinstance(value, Yggdrasil):
+            tree._adopt(value)
+            value._parent = tree
+            value._key = key
+        dict.__setitem__(tree, key, value)
+
+    return tree
+
+
+def _build_shard(cls, df, leaf_behavior):
+    """
+    Build the subtree of one shard in a worker process (see from_dataframe).
+    """
+    return tree_from_dataframe(cls, df, leaf_behavior=leaf_behavior)
+
+
+def tree_from_sql(cls, query, connection, leaf_behavior='overwrite', chunksize=None,
+                  stats=None, workers=None):
+    """
+    Create a new tree of type cls from a SQL query (see Yggdrasil.from_sql).
+
+    Args:
+        cls (type): The Yggdrasil subclass to build
+        query (str): The SQL query to execute
+        connection: A database connection object or a SQLite connection string
+        leaf_behavior (str or callable): How to handle duplicate leaf nodes
+        chunksize (int, optional): Number of rows to fetch and insert at a time
+        stats (dict, optional): If given, filled with load statistics
+        workers (int, optional): Number of worker processes for a parallel build
+
+    Returns:
+        Yggdrasil: A new tree containing the data from the query result
+    """
+    if chunksize is not None and chunksize < 1:
+        raise ValueError("chunksize must be a positive integer")
+    if chunksize is not None and workers is not None and workers > 1:
+        raise ValueError("chunksize and workers cannot be combined")
+
+    started = time.perf_counter()
+
+    # Handle different types of connections
+    if isinstance(connection, str):
+        # Assume it's a SQLite connection string
+        conn = sqlite3.connect(connection)
+    else:
+        # Assume it's an existing connection object
+        conn = connection
+
+    try:
+        if chunksize is None:
+            df = pd.read_sql_query(query, conn)
+            rows, chunks = len(df), 1
+            # Create a tree from the DataFrame
+            tree = tree_from_dataframe(cls, df, leaf_behavior=leaf_behavior, workers=workers)
+        else:
+            tree = cls(leaf_behavior=leaf_behavior)
+            rows = chunks = 0
+            cursor = conn.cursor()
+            try:
+                cursor.execute(query)
+                while True:
+                    chunk = cursor.fetchmany(chunksize)
+                    if not chunk:
+                        break
+                    load_rows(tree, chunk)
+                    rows += len(chunk)
+                    chunks += 1
+            finally:
+                cursor.close()
+    finally:
+        if conn is not connection:
+            conn.close()
+
+    if stats is not None:
+        seconds = time.perf_counter() - started
+        stats.update(
+            rows=rows,
+            chunks=chunks,
+            seconds=seconds,
+            rows_per_second=rows / seconds if seconds > 0 else float('inf'),
+            peak_rss=_peak_rss(),
+        )
+
+    return tree
+
+
+def load_rows(tree, rows):
+    """
+    Insert a batch of equal-length fibers, e.g. rows fetched from a cursor.
+
+    Args:
+        tree (Yggdrasil): The tree to insert into
+        rows (list): A list of row sequences
+    """
+    width = len(rows[0])
+    if width < 2:
+        # Fibers without a leaf key keep the row-by-row semantics
+        for row in rows:
+            tree.add_fiber(list(row))
+        return
+
+    key_columns = [np.fromiter((row[i] for row in rows), dtype=object, count=len(rows))
+                   for i in range(width - 1)]
+    bulk_load(tree, key_columns, [row[-1] for row in rows])
+
+
+def bulk_load(tree, key_columns, leaf_values):
+    """
+    Insert many equal-length fibers at once, grouped by their full path.
+
+    Every internal node is resolved once per distinct parent path and every
+    leaf receives all of its values as a single batch. The resulting tree is
+    the same as adding the fibers one by one with add_fiber.
+
+    Args:
+        tree (Yggdrasil): The tree to insert into
+        key_columns (list): One 1-D numpy array per path level
+        leaf_values (list): The leaf value of every fiber
+    """
+    tree._check_writable()
+
+    if any(isinstance(value, list) and value for value in leaf_values):
+        # Non-empty lists are paths themselves, insert row by row
+        key_lists = [column.tolist() for column in key_columns]
+        for *path, value in zip(*key_lists, leaf_values):
+            tree._descend(path[:-1])[path[-1]] = value
+        return
+
+    with _gc_paused():
+        parents = {}
+        for path, batch in _group_fibers(key_columns, leaf_values):
+            prefix = path[:-1]
+            parent = parents.get(prefix)
+            if parent is None:
+                parent = parents[prefix] = tree._descend(prefix)
+            parent._merge_batch(path[-1], batch)
+
+
+def scatter_leaves(tree, paths, values):
+    """
+    Apply one leaf update per (path, value) pair (see Yggdrasil.add_many).
+
+    Updates are grouped by path with NumPy. For the 'add', 'subtract' and
+    'multiply' leaf behaviors and numeric values, the updates of every leaf are
+    reduced with a single ufunc scatter and each leaf is written once. That
+    needs a numeric array or a sequence of only int and float values; other
+    values and behaviors are folded as given with the leaf behavior, also
+    writing each leaf once.
+
+    Args:
+        tree (Yggdrasil): The tree to update
+        paths: A sequence of non-empty key sequences, or a 2-D array with one path per row
+        values: One leaf value per path (sequence or 1-D array)
+
+    Raises:
+        ValueError: If paths and values differ in length or a path is empty
+    """
+    tree._check_writable()
+
+    if isinstance(values, np.ndarray):
+        if values.ndim != 1:
+            raise ValueError("paths and values must have the same length")
+    else:
+        # Keep the caller's objects, converting them to an array would turn
+        # mixed values into strings or floats and tuples into rows
+        values = list(values)
+    if len(values) != len(paths):
+        raise ValueError("paths and values must have the same length")
+    if not len(values):
+        return
+
+    codes, unique_paths = _path_codes(paths)
+    if not all(unique_paths):
+        raise ValueError("Cannot insert an empty path")
+    count = len(unique_paths)
+
+    reducer = (_SCATTER_REDUCERS.get(tree.leaf_behavior)
+               if isinstance(tree.leaf_behavior, str) else None)
+    numeric = None
+    if reducer is not None:
+        if isinstance(values, np.ndarray):
+            if values.dtype.kind in 'iuf':
+                numeric = values
+        elif all(type(value) is int or type(value) is float for value in values):
+            # bool and NumPy scalars are folded by the leaf behavior instead
+            try:
+                numeric = np.asarray(values)
+            except OverflowError:
+                pass
+            else:
+                if numeric.dtype.kind not in 'iuf':
+                    numeric = None
+    if numeric is not None:
+        ufunc, identity = reducer
+        first_rows = np.full(count, len(codes), dtype=np.intp)
+        np.minimum.at(first_rows, codes, np.arange(len(codes)))
+        other_rows = np.ones(len(codes), dtype=bool)
+        other_rows[first_rows] = False
+        rest = np.full(count, identity, dtype=numeric.dtype)
+        ufunc.at(rest, codes[other_rows], numeric[other_rows])
+        sizes = np.bincount(codes, minlength=count).tolist()
+        # The first value of each leaf is the caller's own, not the array's
+        # (an int stays an int when other values are floats)
+        firsts = (numeric[first_rows].tolist() if numeric is values
+                  else [values[row] for row in first_rows.tolist()])
+        batches = [[first, rest] if size > 1 else [first]
+                   for first, rest, size in zip(firsts, rest.tolist(), sizes)]
+    else:
+        # Keep every value, in order, and let the leaf behavior fold them
+        order = np.argsort(codes, kind='stable')
+        bounds = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=count)))).tolist()
+        if isinstance(values, np.ndarray):
+            ordered = values[order].tolist()
+        else:
+            ordered = [values[row] for row in order.tolist()]
+        batches = [ordered[bounds[i]:bounds[i + 1]] for i in range(count)]
+
+    with _gc_paused():
+        parents = {}
+        for path, batch in zip(unique_paths, batches):
+            prefix = path[:-1]
+            parent = parents.get(prefix)
+            if parent is None:
+                parent = parents[prefix] = tree._descend(prefix)
+            parent._merge_batch(path[-1], batch)
+
+
+def _path_codes(paths):
+    """
+    Number the distinct paths in order of first appearance.
+
+    Args:
+        paths: A sequence of key sequences, or a 2-D array with one path per row
+
+    Returns:
+        tuple: (codes, unique_paths) where codes holds the number of every
+        path and unique_paths lists each distinct path as a tuple
+    """
+    if isinstance(paths, np.ndarray) and paths.ndim == 2 and paths.shape[1]:
+        key_columns = [paths[:, i] for i in range(paths.shape[1])]
+        codes = _factorize_paths(key_columns)
+        if codes is not None:
+            first_rows = np.full(codes.max() + 1, len(codes), dtype=np.intp)
+            np.minimum.at(first_rows, codes, np.arange(len(codes)))
+            unique_paths = list(zip(*(column[first_rows].tolist() for column in key_columns)))
+            return codes, unique_paths
+    if hasattr(paths, 'tolist'):
+        paths = paths.tolist()
+
+    numbers = {}
+    codes = np.fromiter((numbers.setdefault(path, len(numbers)) for path in map(tuple, paths)),
+                        dtype=np.intp, count=len(paths))
+    return codes, list(numbers)
+
+
+def _peak_rss():
+    """
+    Return the peak resident set size of this process in bytes.
+
+    Returns:
+        int or None: The peak RSS, or None where the resource module is unavailable
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _group_fibers(key_columns, leaf_values):
+    """
+    Group fibers by their path, keeping the order of first appearance.
+
+    Args:
+        key_columns (list): One 1-D numpy array per path level
+        leaf_values (list): The leaf value of every fiber
+
+    Returns:
+        list: (path, values) pairs, one per distinct path, where values keeps
+        the original row order
+    """
+    codes = _factorize_paths(key_columns)
+    if codes is None:
+        return _group_fibers_by_key(key_columns, leaf_values)
+
+    # Codes are numbered by first appearance; a stable sort keeps row order
+    order = np.argsort(codes, kind='stable')
+    bounds = np.concatenate(([0], np.cumsum(np.bincount(codes)))).tolist()
+    first_rows = order[bounds[:-1]]
+    paths = zip(*(column[first_rows].tolist() for column in key_columns))
+    values = [leaf_values[i] for i in order.tolist()]
+
+    return [(path, values[bounds[i]:bounds[i + 1]]) for i, path in enumerate(paths)]
+
+
+def _factorize_paths(key_columns):
+    """
+    Number the distinct rows of the key columns in order of first appearance.
+
+    Args:
+        key_columns (list): One 1-D numpy array per path level
+
+    Returns:
+        numpy.ndarray or None: The code of every row, or None if a key is
+        missing (factorize treats all missing keys as equal while a dict keeps
+        distinct NaN objects apart, so callers must group by the key tuples)
+    """
+    codes = None
+    for column in key_columns:
+        column_codes, uniques = pd.factorize(column)
+        if (column_codes < 0).any():
+            return None
+        if codes is None:
+            codes = column_codes
+        else:
+            # Both factors are bounded by the row count, so this cannot overflow
+            codes, _ = pd.factorize(codes * len(uniques) + column_codes)
+    return codes
+
+
+def _group_fibers_by_key(key_columns, leaf_values):
+    """
+    Group fibers by their key tuples (see _group_fibers).
+    """
+    groups = {}
+    key_lists = [column.tolist() for column in key_columns]
+    for path, value in zip(zip(*key_lists), leaf_values):
+        batch = groups.get(path)
+        if batch is None:
+            groups[path] = [value]
+        else:
+            batch.append(value)
+    return list(groups.items())
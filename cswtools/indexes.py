@@ -0,0 +1,145 @@
+"""
+Secondary indexes over the leaf values and keys of a Yggdrasil tree.
+
+A tree keeps one TreeIndexes object in its shared config once an index has
+been created. Every write to a node reports the old and new value at a key,
+so both indexes are updated incrementally instead of rescanning the tree.
+"""
+
+from .yggdrasil import Yggdrasil, _MISSING
+
+INDEX_KINDS = ('value', 'key')
+
+
+class TreeIndexes:
+    """
+    The secondary indexes of one tree.
+
+    values maps a leaf value to {(id(node), key): node} for every node that
+    holds the value at key, keys maps a key to {id(node): node} for every node
+    that contains the key. Unhashable leaf values are not indexed.
+    """
+
+    __slots__ = ('values', 'keys')
+
+    def __init__(self):
+        self.values = None
+        self.keys = None
+
+    def __bool__(self):
+        return self.values is not None or self.keys is not None
+
+    def create(self, kind, root):
+        """
+        Create an index and fill it from the whole tree.
+
+        Args:
+            kind (str): 'value' or 'key'
+            root (Yggdrasil): The root of the tree
+        """
+        if kind == 'value':
+            self.values = {}
+        else:
+            self.keys = {}
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            for key, value in dict.items(node):
+                if kind == 'key':
+                    self._add_key(node, key)
+                if isinstance(value, Yggdrasil):
+                    stack.append(value)
+                elif kind == 'value':
+                    self._add_value(node, key, value)
+
+    def drop(self, kind):
+        if kind == 'value':
+            self.values = None
+        else:
+            self.keys = None
+
+    def set(self, node, key, old, new):
+        """
+        Record that node[key] changed from old (_MISSING if absent) to new.
+        """
+        if old is _MISSING:
+            if self.keys is not None:
+                self._add_key(node, key)
+        elif isinstance(old, Yggdrasil):
+            if old is new:
+                return
+            self._remove_subtree(old)
+        elif self.values is not None:
+            self._remove_value(node, key, old)
+
+        if isinstance(new, Yggdrasil):
+            self._add_subtree(new)
+        elif self.values is not None:
+            self._add_value(node, key, new)
+
+    def remove(self, node, key, old):
+        """
+        Record that key, holding old, was removed from node.
+        """
+        if self.keys is not None:
+            self._remove_key(node, key)
+        if isinstance(old, Yggdrasil):
+            self._remove_subtree(old)
+        elif self.values is not None:
+            self._remove_value(node, key, old)
+
+    def _add_value(self, node, key, value):
+        try:
+            entries = self.values.get(value)
+        except TypeError:
+            return  # Unhashable values are not indexed
+        if entries is None:
+            entries = self.values[value] = {}
+        entries[id(node), key] = node
+
+    def _remove_value(self, node, key, value):
+        try:
+            entries = self.values.get(value)
+        except TypeError:
+            return
+        if entries is not None:
+            entries.pop((id(node), key), None)
+            if not entries:
+                del self.values[value]
+
+    def _add_key(self, node, key):
+        entries = self.keys.get(key)
+        if entries is None:
+            entries = self.keys[key] = {}
+        entries[id(node)] = node
+
+    def _remove_key(self, node, key):
+        entries = self.keys.get(key)
+        if entries is not None:
+            entries.pop(id(node), None)
+            if not entries:
+                del self.keys[key]
+
+    def _add_subtree(self, root):
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            for key, value in dict.items(node):
+                if self.keys is not None:
+                    self._add_key(node, key)
+                if isinstance(value, Yggdrasil):
+                    stack.append(value)
+                elif self.values is not None:
+                    self._add_value(node, key, value)
+
+    def _remove_subtree(self, root):
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            for key, value in dict.items(node):
+                if self.keys is not None:
+                    self._remove_key(node, key)
+                if isinstance(value, Yggdrasil):
+                    stack.append(value)
+                elif self.values is not None:
+                    self._remove_value(node, key, value)
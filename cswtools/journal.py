@@ -0,0 +1,203 @@
+"""
+Change journal for keeping replicas of a Yggdrasil tree in sync.
+
+A journaled tree records every write as an entry (path, op, value, version):
+
+    ('set', value)   path now holds value. Leaf values are recorded after the
+                     leaf behavior was applied; subtrees as a detached copy.
+    ('node', None)   path now holds a new, empty node
+    ('delete', None) the key at the end of path was removed
+    ('clear', None)  the node at path was emptied
+    ('resync', None) a write to a node that could not be traced to the root
+                     (path is ()); replicas must be restored from a new
+                     checkpoint instead of replaying past this entry
+
+Versions count up by one per entry. Replaying entries stores the recorded
+values as they are, so a replica ends up equal to the source whatever its
+own leaf behavior is, and syncing costs time proportional to the number of
+changes, not to the size of the tree.
+"""
+
+import pickle
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+
+from .yggdrasil import Yggdrasil, _MISSING
+
+# Returned by TreeJournal._path for nodes whose parent links do not lead to the root
+_UNPLACED = object()
+
+# A pickled copy of a journaled tree at a version (see Yggdrasil.compact_journal)
+Checkpoint = namedtuple('Checkpoint', ['version', 'data'])
+
+
+class TreeJournal:
+    """
+    The change journal of one tree.
+
+    entries holds the entries after base_version; older ones were dropped
+    by compaction and are covered by checkpoint.
+    """
+
+    __slots__ = ('root', 'version', 'base_version', 'entries', 'checkpoint',
+                 'replaying', '_lock')
+
+    def __init__(self, root, version=0):
+        self.root = root
+        self.version = self.base_version = version
+        self.entries = []
+        self.checkpoint = None
+        # Set while apply_delta replays entries, which are recorded as given
+        self.replaying = False
+        self._lock = threading.Lock()
+
+    def set(self, node, key, value):
+        """
+        Record that node[key] now holds value.
+        """
+        if self.replaying:
+            return
+        path = self._place(node)
+        if path is None:
+            return
+        if isinstance(value, Yggdrasil):
+            if not dict.__len__(value):
+                self._append(path + (key,), 'node', None)
+                return
+            # Later writes to the subtree are recorded on their own
+            value = Yggdrasil()._copy_structure(value)
+        self._append(path + (key,), 'set', value)
+
+    def delete(self, node, key):
+        """
+        Record that key was removed from node.
+        """
+        if not self.replaying:
+            path = self._place(node)
+            if path is not None:
+                self._append(path + (key,), 'delete', None)
+
+    def clear(self, node):
+        """
+        Record that node was emptied.
+        """
+        if not self.replaying:
+            path = self._place(node)
+            if path is not None:
+                self._append(path, 'clear', None)
+
+    def _append(self, path, op, value):
+        with self._lock:
+            self.version += 1
+            self.entries.append((path, op, value, self.version))
+
+    def _place(self, node):
+        """
+        Return the path to record a write to node at, None if it is not recorded.
+
+        Writes to removed subtrees are not part of the tree and are skipped.
+        A write that cannot be traced to the root any other way cannot be
+        replayed either, so a 'resync' entry is recorded instead of dropping it.
+        """
+        path = self._path(node)
+        if path is _UNPLACED:
+            self._append((), 'resync', None)
+            return None
+        return path
+
+    def _path(self, node):
+        """
+        Return the path of node below the journaled root.
+
+        Returns None if node was removed from the tree, and _UNPLACED if its
+        parent links end at a node other than the root.
+        """
+        keys = []
+        while node is not self.root:
+            parent = node._parent
+            if parent is None:
+                return _UNPLACED
+            # Removed subtrees keep their parent link but are no longer found there
+            if dict.get(parent, node._key, _MISSING) is not node:
+                return None
+            keys.append(node._key)
+            node = parent
+        return tuple(reversed(keys))
+
+    def changes(self, since):
+        """
+        Return the entries after version since (see Yggdrasil.changes).
+        """
+        if since < self.base_version:
+            raise ValueError(
+                f"Changes up to version {self.base_version} were compacted, "
+                f"restore the replica from the checkpoint instead")
+        with self._lock:
+            # Versions are consecutive, so the entry after since is at a known position
+            return self.entries[since - self.base_version:]
+
+    def apply(self, entries):
+        """
+        Replay entries from another journal onto root (see Yggdrasil.apply_delta).
+        """
+        root = self.root
+        for entry in entries:
+            path, op, value, version = entry
+            if version <= self.version:
+                continue  # Already applied
+            if version != self.version + 1:
+                raise ValueError(
+                    f"Missing changes between version {self.version} and {version}")
+
+            if op == 'resync':
+                raise ValueError(
+                    f"Change {version} could not be recorded by the source, restore "
+                    f"the replica from a checkpoint taken after it (compact_journal)")
+
+            with self._replaying():
+                if op == 'clear':
+                    root._descend(path).clear()
+                else:
+                    parent = root._descend(path[:-1])
+                    key = path[-1]
+                    if op == 'set':
+                        if isinstance(value, Yggdrasil):
+                            value = root._copy_structure(value)
+                        parent._check_writable()
+                        with parent._lock():
+                            parent._replace(key, value)
+                            parent._invalidate()
+                    elif op == 'node':
+                        parent._check_writable()
+                        with parent._lock():
+                            parent._replace(key, parent._new_node())
+                            parent._invalidate()
+                    elif op == 'delete':
+                        parent.pop(key, None)
+                    else:
+                        raise ValueError(f"Unknown journal operation {op!r}")
+
+            with self._lock:
+                self.version = version
+                self.entries.append(entry)
+
+    @contextmanager
+    def _replaying(self):
+        self.replaying = True
+        try:
+            yield
+        finally:
+            self.replaying = False
+
+    def compact(self):
+        """
+        Replace the entries by a checkpoint of the tree (see Yggdrasil.compact_journal).
+        """
+        with self._lock:
+            if self.checkpoint is None or self.checkpoint.version != self.version:
+                data = pickle.dumps(self.root, protocol=pickle.HIGHEST_PROTOCOL)
+                self.checkpoint = Checkpoint(self.version, data)
+            self.base_version = self.version
+            self.entries = []
+        return self.checkpoint
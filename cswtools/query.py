@@ -0,0 +1,203 @@
+"""
+Path patterns for selecting parts of a Yggdrasil tree.
+
+A pattern is either a string of segments separated by '/' or a sequence of
+segments. Each segment matches one key:
+
+    'name'          exactly this key
+    '*'             any key
+    '**'            any number of keys, including none
+    '2026-*'        a glob (fnmatch syntax: *, ?, [...]) on string keys
+    {'a', 'b'}      any key in the set (in sequence patterns)
+    callable        any key for which callable(key) is true (in sequence patterns)
+
+A pattern is compiled into a small automaton whose states are positions in
+the segment list. Matching walks the tree once, follows only branches that
+can still match and looks up exact keys directly instead of iterating over
+all children.
+"""
+
+import fnmatch
+import re
+from functools import lru_cache
+
+from .yggdrasil import Yggdrasil, _MISSING
+
+# Segment kinds
+_EXACT = 0
+_ANY = 1
+_DEEP = 2
+_GLOB = 3
+_SET = 4
+_PREDICATE = 5
+
+_GLOB_CHARS = re.compile(r'[*?\[]')
+
+
+class PathPattern:
+    """
+    A compiled path pattern (see compile_pattern).
+    """
+
+    __slots__ = ('segments', 'end', 'start', '_steps')
+
+    def __init__(self, segments):
+        self.segments = segments
+        self.end = len(segments)
+        self.start = self._closure((0,))
+        # Transition tables per state set, built on first use
+        self._steps = {}
+
+    def _closure(self, states):
+        """
+        Add the states reachable by letting '**' match no key at all.
+        """
+        result = set(states)
+        for state in sorted(result):
+            while state < self.end and self.segments[state][0] == _DEEP:
+                state += 1
+                result.add(state)
+        return frozenset(result)
+
+    def _step(self, states):
+        """
+        Return how to advance from a set of states.
+
+        Returns:
+            tuple: (exact, every, matchers). exact maps a key to the next state
+            set if every active segment is an exact key. every is the next
+            state set if all active segments match any key. Otherwise both are
+            None and matchers lists (segment, state) pairs to test per key.
+        """
+        step = self._steps.get(states)
+        if step is None:
+            active = [state for state in states if state < self.end]
+            kinds = {self.segments[state][0] for state in active}
+            if kinds <= {_EXACT}:
+                exact = {}
+                for state in active:
+                    key = self.segments[state][1]
+                    exact[key] = self._closure(exact.get(key, frozenset()) | {state + 1})
+                step = (exact, None, None)
+            elif kinds <= {_ANY, _DEEP}:
+                # The next states do not depend on the key
+                step = (None, self._closure(state if self.segments[state][0] == _DEEP
+                                            else state + 1 for state in active), None)
+            else:
+                step = (None, None, [(self.segments[state], state) for state in active])
+            self._steps[states] = step
+        return step
+
+    def advance(self, states, key):
+        """
+        Return the state set after matching key, empty if key cannot match.
+        """
+        exact, every, matchers = self._step(states)
+        if exact is not None:
+            return exact.get(key, frozenset())
+        if every is not None:
+            return every
+
+        following = []
+        for (kind, argument), state in matchers:
+            if kind == _DEEP:
+                following.append(state)
+            elif (kind == _ANY
+                  or (kind == _EXACT and key == argument)
+                  or (kind == _GLOB and isinstance(key, str) and argument(key))
+                  or (kind == _SET and key in argument)
+                  or (kind == _PREDICATE and argument(key))):
+                following.append(state + 1)
+        return self._closure(following) if following else frozenset()
+
+    def select(self, node, path=()):
+        """
+        Generate the (path, value) pairs below node that match the pattern.
+        """
+        end = self.end
+        stack = [(self._candidates(node, self.start), path)]
+        while stack:
+            items, path = stack[-1]
+            for key, value, states in items:
+                child_path = path + (key,)
+                if end in states:
+                    yield child_path, value
+                if isinstance(value, Yggdrasil) and (len(states) > 1 or end not in states):
+                    stack.append((self._candidates(value, states), child_path))
+                    break
+            else:
+                stack.pop()
+
+    def _candidates(self, node, states):
+        """
+        Generate (key, value, next states) for the children of node that can match.
+        """
+        exact, every, _ = self._step(states)
+        if exact is not None:
+            # Only exact keys are possible: look them up instead of iterating
+            for key, following in exact.items():
+                value = dict.get(node, key, _MISSING)
+                if value is not _MISSING:
+                    yield key, value, following
+            return
+        if every is not None:
+            for key, value in dict.items(node):
+                yield key, value, every
+            return
+
+        advance = self.advance
+        for key, value in dict.items(node):
+            following = advance(states, key)
+            if following:
+                yield key, value, following
+
+
+def compile_pattern(pattern):
+    """
+    Compile a path pattern.
+
+    Args:
+        pattern (str, sequence or PathPattern): The pattern (see the module docstring)
+
+    Returns:
+        PathPattern: The compiled pattern
+
+    Raises:
+        TypeError: If pattern is neither a string nor a sequence of segments
+    """
+    if isinstance(pattern, PathPattern):
+        return pattern
+    if isinstance(pattern, str):
+        return _compile_string(pattern)
+    if isinstance(pattern, (list, tuple)):
+        return PathPattern(_compile_segments(pattern))
+    raise TypeError(f"pattern must be a string or a sequence of segments, "
+                    f"not {type(pattern).__name__}")
+
+
+@lru_cache(maxsize=256)
+def _compile_string(pattern):
+    return PathPattern(_compile_segments(pattern.split('/')))
+
+
+def _compile_segments(segments):
+    compiled = []
+    for segment in segments:
+        if isinstance(segment, str):
+            if segment == '**':
+                if compiled and compiled[-1][0] == _DEEP:
+                    continue  # '**/**' is the same as '**'
+                compiled.append((_DEEP, None))
+            elif segment == '*':
+                compiled.append((_ANY, None))
+            elif _GLOB_CHARS.search(segment):
+                compiled.append((_GLOB, re.compile(fnmatch.translate(segment)).match))
+            else:
+                compiled.append((_EXACT, segment))
+        elif isinstance(segment, (set, frozenset)):
+            compiled.append((_SET, frozenset(segment)))
+        elif callable(segment):
+            compiled.append((_PREDICATE, segment))
+        else:
+            compiled.append((_EXACT, segment))
+    return tuple(compiled)
@@ -0,0 +1,460 @@
+"""
+Binary file format for Yggdrasil trees.
+
+A file stores the tree in breadth-first order as flat arrays, so it can be
+written and read without recursion and served lazily from a memory map:
+
+    magic           b'YGGDRSL1'
+    flags           uint64 (bit 0: the file contains pickled values)
+    section table   (offset, length) as uint64 pairs for every section below
+    sections        each one starts at an 8-byte boundary
+
+The sections are:
+
+    node_start      int64[nodes + 1]  children of node i are entries
+                                      node_start[i] to node_start[i + 1]
+    child_key       int64[children]   index into the key table
+    child_ref       int64[children]   node index if >= 0, otherwise the leaf
+                                      index encoded as -1 - index
+    3 value tables  keys (interned), leaves and metadata (leaf_behavior)
+
+A value table has four sections: one type tag byte per value, an 8-byte slot
+per value (int64 or float64, or a blob index for str, bytes and pickled
+values), the blob offsets (int64[blobs + 1]) and the blob data.
+"""
+
+import mmap as _mmap
+import pickle
+import struct
+from array import array
+from collections.abc import Mapping
+
+from .yggdrasil import Yggdrasil, _MISSING, _gc_paused
+
+MAGIC = b'YGGDRSL1'
+
+_FLAG_PICKLE = 1
+
+# Value type tags
+_NONE, _FALSE, _TRUE, _INT, _FLOAT, _STR, _BYTES, _PICKLE = range(8)
+
+_INT64_MIN = -2 ** 63
+_INT64_MAX = 2 ** 63 - 1
+
+_SECTIONS = 3 + 3 * 4
+_HEADER = struct.Struct('<8sQ')
+_TABLE_ENTRY = struct.Struct('<QQ')
+
+
+class _ValueTableWriter:
+    """
+    Collects values into typed columns.
+    """
+
+    def __init__(self, intern=False):
+        self.tags = bytearray()
+        self.slots = array('q')
+        self.floats = []
+        self.blob_offsets = array('q', [0])
+        self.blobs = bytearray()
+        self.has_pickles = False
+        # Interned values, keyed by type as well so that 1, 1.0 and True stay apart
+        self.index = {} if intern else None
+
+    def add(self, value):
+        """
+        Append a value and return its index in the table.
+        """
+        if self.index is not None:
+            token = (type(value), value)
+            try:
+                return self.index[token]
+            except KeyError:
+                position = self.index[token] = self._append(value)
+                return position
+            except TypeError:
+                # Unhashable values cannot be interned (and are not valid keys)
+                pass
+        return self._append(value)
+
+    def _append(self, value):
+        position = len(self.tags)
+        kind = type(value)
+        if kind is str:
+            self.tags.append(_STR)
+            self.slots.append(len(self.blob_offsets) - 1)
+            self.blobs += value.encode('utf-8', 'surrogatepass')
+            self.blob_offsets.append(len(self.blobs))
+        elif kind is int and _INT64_MIN <= value <= _INT64_MAX:
+            self.tags.append(_INT)
+            self.slots.append(value)
+        elif kind is float:
+            self.tags.append(_FLOAT)
+            self.slots.append(0)
+            self.floats.append((position, value))
+        elif value is None:
+            self.tags.append(_NONE)
+            self.slots.append(0)
+        elif kind is bool:
+            self.tags.append(_TRUE if value else _FALSE)
+            self.slots.append(0)
+        else:
+            if kind is bytes:
+                self.tags.append(_BYTES)
+            else:
+                self.has_pickles = True
+                self.tags.append(_PICKLE)
+                value = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            self.slots.append(len(self.blob_offsets) - 1)
+            self.blobs += value
+            self.blob_offsets.append(len(self.blobs))
+        return position
+
+    def sections(self):
+        """
+        Return the four sections of the table as bytes-like objects.
+        """
+        slots = memoryview(self.slots).cast('B')
+        if self.floats:
+            # Floats share the 8-byte slots with ints, write their raw bits
+            as_float = slots.cast('d')
+            for position, value in self.floats:
+                as_float[position] = value
+        return [self.tags, slots, self.blob_offsets, self.blobs]
+
+
+class _ValueTableReader:
+    """
+    Decodes values from the four sections of a value table.
+    """
+
+    def __init__(self, tags, slots, blob_offsets, blobs, allow_pickle):
+        self.tags = tags
+        self.ints = slots.cast('q')
+        self.floats = slots.cast('d')
+        self.blob_offsets = blob_offsets.cast('q')
+        self.blobs = blobs
+        self.allow_pickle = allow_pickle
+
+    def __len__(self):
+        return len(self.tags)
+
+    def __getitem__(self, position):
+        tag = self.tags[position]
+        if tag == _INT:
+            return self.ints[position]
+        if tag == _FLOAT:
+            return self.floats[position]
+        if tag == _NONE:
+            return None
+        if tag == _FALSE:
+            return False
+        if tag == _TRUE:
+            return True
+
+        blob = self.ints[position]
+        data = self.blobs[self.blob_offsets[blob]:self.blob_offsets[blob + 1]]
+        if tag == _STR:
+            return str(data, 'utf-8', 'surrogatepass')
+        if tag == _BYTES:
+            return bytes(data)
+        if not self.allow_pickle:
+            raise ValueError("The file contains pickled values, load it with allow_pickle=True "
+                             "if it comes from a trusted source")
+        return pickle.loads(data)
+
+    def decode_all(self):
+        """
+        Decode every value of the table.
+
+        Returns:
+            list: The values in table order
+        """
+        tags = bytes(self.tags)
+        ints = self.ints.tolist()
+        floats = self.floats.tolist()
+        offsets = self.blob_offsets.tolist()
+
+        # If the blob data is plain ASCII, byte offsets are character offsets
+        # and all strings can be sliced out of one decoded string
+        text = None
+        if _STR in tags:
+            data = bytes(self.blobs)
+            if data.isascii():
+                text = data.decode('ascii')
+
+        values = []
+        append = values.append
+        for position, tag in enumerate(tags):
+            if tag == _STR and text is not None:
+                blob = ints[position]
+                append(text[offsets[blob]:offsets[blob + 1]])
+            elif tag == _INT:
+                append(ints[position])
+            elif tag == _FLOAT:
+                append(floats[position])
+            else:
+                append(self[position])
+        return values
+
+
+def save_tree(tree, path):
+    """
+    Write a tree to a file in the binary format.
+
+    Args:
+        tree (Yggdrasil): The tree to write
+        path (str or os.PathLike): The file to write
+    """
+    keys = _ValueTableWriter(intern=True)
+    leaves = _ValueTableWriter()
+    meta = _ValueTableWriter()
+    meta.add(tree.leaf_behavior)
+
+    node_start = array('q', [0])
+    child_key = array('q')
+    child_ref = array('q')
+
+    # Breadth-first, so the children of every node are stored contiguously
+    nodes = [tree]
+    position = 0
+    while position < len(nodes):
+        node = nodes[position]
+        position += 1
+        for key, value in dict.items(node):
+            child_key.append(keys.add(key))
+            if isinstance(value, Yggdrasil):
+                child_ref.append(len(nodes))
+                nodes.append(value)
+            else:
+                child_ref.append(-1 - leaves.add(value))
+        node_start.append(len(child_key))
+
+    sections = [node_start, child_key, child_ref]
+    for table in (keys, leaves, meta):
+        sections.extend(table.sections())
+    flags = _FLAG_PICKLE if (keys.has_pickles or leaves.has_pickles or meta.has_pickles) else 0
+
+    offset = _HEADER.size + _TABLE_ENTRY.size * _SECTIONS
+    table = []
+    for section in sections:
+        offset = _align(offset)
+        length = memoryview(section).nbytes
+        table.append((offset, length))
+        offset += length
+
+    with open(path, 'wb') as fh:
+        fh.write(_HEADER.pack(MAGIC, flags))
+        for entry in table:
+            fh.write(_TABLE_ENTRY.pack(*entry))
+        for (offset, _), section in zip(table, sections):
+            fh.write(b'\0' * (offset - fh.tell()))
+            fh.write(section)
+
+
+def load_tree(path, cls=Yggdrasil, mmap=False, allow_pickle=False):
+    """
+    Read a tree from a file written by save_tree.
+
+    Args:
+        path (str or os.PathLike): The file to read
+        cls (type): The Yggdrasil class to build
+        mmap (bool): If True, memory-map the file and return a read-only
+                     MappedTree that decodes nodes only when they are accessed
+        allow_pickle (bool): Allow loading values that were stored with pickle.
+                             Only enable this for trusted files.
+
+    Returns:
+        Yggdrasil or MappedTree: The loaded tree
+    """
+    with open(path, 'rb') as fh:
+        if mmap:
+            buffer = _mmap.mmap(fh.fileno(), 0, access=_mmap.ACCESS_READ)
+        else:
+            buffer = fh.read()
+
+    reader = _FileReader(memoryview(buffer), allow_pickle)
+    if mmap:
+        return MappedTree(reader, 0)
+    return reader.build(cls)
+
+
+class _FileReader:
+    """
+    Gives access to the sections of a file.
+    """
+
+    def __init__(self, buffer, allow_pickle):
+        if len(buffer) < _HEADER.size or bytes(buffer[:len(MAGIC)]) != MAGIC:
+            raise ValueError("Not a Yggdrasil file")
+        _, flags = _HEADER.unpack_from(buffer)
+        if flags & _FLAG_PICKLE and not allow_pickle:
+            raise ValueError("The file contains pickled values, load it with allow_pickle=True "
+                             "if it comes from a trusted source")
+
+        sections = []
+        for i in range(_SECTIONS):
+            offset, length = _TABLE_ENTRY.unpack_from(buffer, _HEADER.size + i * _TABLE_ENTRY.size)
+            sections.append(buffer[offset:offset + length])
+
+        self.node_start = sections[0].cast('q')
+        self.child_key = sections[1].cast('q')
+        self.child_ref = sections[2].cast('q')
+        self.keys = _ValueTableReader(*sections[3:7], allow_pickle)
+        self.leaves = _ValueTableReader(*sections[7:11], allow_pickle)
+        self.leaf_behavior = _ValueTableReader(*sections[11:15], allow_pickle)[0]
+        # Decoded keys and per-node {key: ref} tables for lazy access
+        self._key_cache = {}
+        self._children = {}
+
+    def key(self, position):
+        key = self._key_cache.get(position, _MISSING)
+        if key is _MISSING:
+            key = self._key_cache[position] = self.keys[position]
+        return key
+
+    def iter_children(self, node):
+        """
+        Yield (key, ref) for the children of one node.
+        """
+        child_key, child_ref = self.child_key, self.child_ref
+        for i in range(self.node_start[node], self.node_start[node + 1]):
+            yield self.key(child_key[i]), child_ref[i]
+
+    def children(self, node):
+        """
+        Return {key: ref} for one node, decoding it on first access.
+        """
+        children = self._children.get(node)
+        if children is None:
+            children = self._children[node] = dict(self.iter_children(node))
+        return children
+
+    def build(self, cls):
+        """
+        Decode the whole tree into Yggdrasil nodes.
+        """
+        tree = cls(leaf_behavior=self.leaf_behavior)
+        keys = self.keys.decode_all()
+        leaves = self.leaves.decode_all()
+        node_start = self.node_start.tolist()
+        child_key = self.child_key.tolist()
+        child_ref = self.child_ref.tolist()
+
+        with _gc_paused():
+            stack = [(tree, 0)]
+            while stack:
+                target, index = stack.pop()
+                for i in range(node_start[index], node_start[index + 1]):
+                    ref = child_ref[i]
+                    if ref >= 0:
+                        value = tree._new_node(target, keys[child_key[i]])
+                        stack.append((value, ref))
+                    else:
+                        value = leaves[-1 - ref]
+                    dict.__setitem__(target, keys[child_key[i]], value)
+        return tree
+
+
+class MappedTree(Mapping):
+    """
+    Read-only view of a memory-mapped Yggdrasil file (see Yggdrasil.load).
+
+    Nodes are decoded only when they are accessed. Missing keys raise KeyError
+    instead of creating nodes. Use to_tree to turn a (sub)tree into a regular
+    Yggdrasil.
+    """
+
+    __slots__ = ('_reader', '_node')
+
+    def __init__(self, reader, node):
+        self._reader = reader
+        self._node = node
+
+    @property
+    def leaf_behavior(self):
+        """The leaf behavior the tree was saved with."""
+        return self._reader.leaf_behavior
+
+    def _value(self, ref):
+        if ref >= 0:
+            return MappedTree(self._reader, ref)
+        return self._reader.leaves[-1 - ref]
+
+    def __getitem__(self, key):
+        return self._value(self._reader.children(self._node)[key])
+
+    def __iter__(self):
+        return iter(self._reader.children(self._node))
+
+    def __len__(self):
+        node_start = self._reader.node_start
+        return node_start[self._node + 1] - node_start[self._node]
+
+    def __contains__(self, key):
+        return key in self._reader.children(self._node)
+
+    def __repr__(self):
+        return f"<MappedTree node {self._node} with {len(self)} children>"
+
+    def get_path(self, path, default=None):
+        """
+        Look up the value at the end of a path.
+
+        Args:
+            path: An iterable of keys
+            default: The value to return if the path does not exist
+
+        Returns:
+            The MappedTree node or leaf value at the end of the path, or default
+        """
+        reader = self._reader
+        ref = self._node
+        for key in path:
+            if ref < 0:
+                return default
+            ref = reader.children(ref).get(key, _MISSING)
+            if ref is _MISSING:
+                return default
+        return self._value(ref)
+
+    def contains_path(self, path):
+        """
+        Check whether a path exists.
+
+        Args:
+            path: An iterable of keys
+
+        Returns:
+            bool: True if every key of the path exists
+        """
+        return self.get_path(path, _MISSING) is not _MISSING
+
+    def to_tree(self, cls=Yggdrasil):
+        """
+        Decode this node and everything below it into a regular tree.
+
+        Args:
+            cls (type): The Yggdrasil class to build
+
+        Returns:
+            Yggdrasil: The decoded tree
+        """
+        reader = self._reader
+        tree = cls(leaf_behavior=reader.leaf_behavior)
+        with _gc_paused():
+            stack = [(tree, self._node)]
+            while stack:
+                target, node = stack.pop()
+                for key, ref in reader.iter_children(node):
+                    if ref >= 0:
+                        value = tree._new_node(target, key)
+                        stack.append((value, ref))
+                    else:
+                        value = reader.leaves[-1 - ref]
+                    dict.__setitem__(target, key, value)
+        return tree
+
+
+def _align(offset):
+    return (offset + 7) & ~7
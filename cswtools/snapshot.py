@@ -0,0 +1,167 @@
+"""
+Copy-on-write snapshots of Yggdrasil trees.
+
+Taking a snapshot copies nothing. Instead, the first write to a node after
+the newest snapshot keeps a shallow copy of the node's items for that
+snapshot, so each changed node is copied once per snapshot, whatever the
+size of the tree. A snapshot reads a node from the copy kept for it, or from
+the copy kept for a newer snapshot (the node did not change in between), or
+from the live node if it has not been written to since.
+"""
+
+from collections.abc import Mapping
+
+from .yggdrasil import Yggdrasil, _MISSING, _gc_paused
+
+
+class _SnapshotState:
+    """
+    The node copies kept for one snapshot of a tree.
+
+    preserved maps id(node) to (node, items), holding on to node so that its
+    id cannot be reused. newer links to the next snapshot of the same tree.
+    """
+
+    __slots__ = ('preserved', 'newer', 'leaf_behavior', '__weakref__')
+
+    def __init__(self, leaf_behavior):
+        self.preserved = {}
+        self.newer = None
+        self.leaf_behavior = leaf_behavior
+
+    def items(self, node):
+        """
+        Return the items node had when the snapshot was taken: a copy, or node itself.
+        """
+        key = id(node)
+        state = self
+        while state is not None:
+            entry = state.preserved.get(key)
+            if entry is not None:
+                return entry[1]
+            state = state.newer
+        return node
+
+
+class TreeSnapshot(Mapping):
+    """
+    Read-only view of a tree as it was when Yggdrasil.snapshot was called.
+
+    Missing keys raise KeyError instead of creating nodes. Use to_tree to
+    turn a (sub)tree into a regular Yggdrasil.
+    """
+
+    __slots__ = ('_state', '_node')
+
+    def __init__(self, state, node):
+        self._state = state
+        self._node = node
+
+    @property
+    def leaf_behavior(self):
+        """The leaf behavior of the tree when the snapshot was taken."""
+        return self._state.leaf_behavior
+
+    def _items(self):
+        """
+        Return the items of this node at snapshot time as a dict that writers do not touch.
+        """
+        node = self._node
+        items = self._state.items(node)
+        if items is node:
+            copy = dict.copy(node)
+            # Writers keep the old items before changing a node, so if the
+            # node is still unpreserved, the copy predates any later write
+            items = self._state.items(node)
+            if items is node:
+                return copy
+        return items
+
+    def _get(self, key):
+        node = self._node
+        items = self._state.items(node)
+        if items is node:
+            value = dict.get(node, key, _MISSING)
+            items = self._state.items(node)
+            if items is node:
+                return value
+        return items.get(key, _MISSING)
+
+    def _value(self, value):
+        if isinstance(value, Yggdrasil):
+            return TreeSnapshot(self._state, value)
+        return value
+
+    def __getitem__(self, key):
+        value = self._get(key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return self._value(value)
+
+    def __iter__(self):
+        return iter(self._items())
+
+    def __len__(self):
+        return len(self._items())
+
+    def __contains__(self, key):
+        return self._get(key) is not _MISSING
+
+    def __repr__(self):
+        return f"<TreeSnapshot with {len(self)} children>"
+
+    def get_path(self, path, default=None):
+        """
+        Look up the value at the end of a path.
+
+        Args:
+            path: An iterable of keys
+            default: The value to return if the path does not exist
+
+        Returns:
+            The TreeSnapshot node or leaf value at the end of the path, or default
+        """
+        node = self
+        for key in path:
+            if not isinstance(node, TreeSnapshot):
+                return default
+            node = node._get(key)
+            if node is _MISSING:
+                return default
+            node = self._value(node)
+        return node
+
+    def contains_path(self, path):
+        """
+        Check whether a path exists.
+
+        Args:
+            path: An iterable of keys
+
+        Returns:
+            bool: True if every key of the path exists
+        """
+        return self.get_path(path, _MISSING) is not _MISSING
+
+    def to_tree(self, cls=Yggdrasil):
+        """
+        Copy this node and everything below it into a regular tree.
+
+        Args:
+            cls (type): The Yggdrasil class to build
+
+        Returns:
+            Yggdrasil: The copied tree
+        """
+        tree = cls(leaf_behavior=self.leaf_behavior)
+        with _gc_paused():
+            stack = [(tree, self)]
+            while stack:
+                target, source = stack.pop()
+                for key, value in source._items().items():
+                    if isinstance(value, Yggdrasil):
+                        child = tree._new_node(target, key)
+                        stack.append((child, TreeSnapshot(self._state, value)))
+                        value = child
+                    dict.__setitem__(target, key, value)
+        return tree
@@ -1,117 +1,1764 @@
-import pandas as pd
-import sqlite3
+import gc
+import sys
+import threading
+import weakref
+from contextlib import contextmanager, nullcontext
+from itertools import chain, islice
+
+# Marker for keys that are not present in a node (None is a valid leaf value)
+_MISSING = object()
+
+# Number of locks shared by the nodes of a thread-safe tree (a power of two)
+_LOCK_STRIPES = 64
+
+# Stands in for a stripe lock in trees that are not thread-safe
+_NO_LOCK = nullcontext()
+
+
+class LeafAccumulator:
+    """
+    Base class for leaf behaviors that build a leaf value from the values stored at it.
+
+    Pass an instance as leaf_behavior. When a value is stored at an existing
+    leaf, the tree calls init(existing_value) to get a state, accumulate(state,
+    new_value) to add the new value and finalize(state) to get the value to
+    store. Inside Yggdrasil.accumulating and during insert_many, the state
+    stored at a leaf is kept for its next collision, and batched writes
+    (add_many, from_dataframe) fold all values of a leaf into one state, so
+    accumulate can change the state in place and each value costs amortized
+    O(1) instead of a copy of everything accumulated so far.
+
+    Unlike plain callables, accumulators do not fall back to overwrite:
+    exceptions they raise propagate, and the leaf is not replaced.
+    """
+
+    #: Store the raw state at the leaf while accumulating and only finalize it
+    #: when the outermost accumulating block ends (for costly finalize steps)
+    deferred = False
+
+    def init(self, value):
+        """
+        Return a new state holding an existing leaf value.
+
+        States are told apart from other leaf values by identity, so this must
+        return a new object that the tree owns (e.g. a copy of a list), not
+        value itself if it is mutable.
+        """
+        return value
+
+    def accumulate(self, state, value):
+        """
+        Add a new value to a state and return the state (the same object or a new one).
+        """
+        raise NotImplementedError
+
+    def finalize(self, state):
+        """
+        Return the leaf value for a state. The default stores the state itself.
+        """
+        return state
+
+
+class _AppendParts(list):
+    """
+    The parts of a string or tuple leaf while 'append' accumulates into it.
+    """
+
+    __slots__ = ('kind',)
+
+
+class _AppendAccumulator(LeafAccumulator):
+    """
+    The 'append' leaf behavior: existing_value + new_value, falling back to overwrite.
+
+    Lists are extended in place and strings and tuples are collected in parts
+    that are joined once, so that appends in accumulating blocks cost
+    amortized O(1) per value.
+    """
+
+    deferred = True
+
+    def init(self, value):
+        kind = type(value)
+        if kind is list:
+            # Own a copy, so lists passed in by callers are never changed
+            return list(value)
+        if kind is str or kind is tuple:
+            parts = _AppendParts((value,) if kind is str else value)
+            parts.kind = kind
+            return parts
+        return value
+
+    def accumulate(self, state, value):
+        kind = type(state)
+        if kind is list and type(value) is list:
+            state += value
+            return state
+        if kind is _AppendParts and type(value) is state.kind:
+            if state.kind is str:
+                state.append(value)
+            else:
+                state += value
+            return state
+        try:
+            return self.init(self.finalize(state) + value)
+        except (TypeError, ValueError):
+            return self.init(value)
+
+    def finalize(self, state):
+        if type(state) is _AppendParts:
+            return ''.join(state) if state.kind is str else tuple(state)
+        return state
+
+
+# Leaf merge strategies. Each one takes (existing_value, new_value) and returns
+# the value to store; incompatible values fall back to overwriting.
+
+def _merge_overwrite(existing_value, new_value):
+    return new_value
+
+
+def _merge_append(existing_value, new_value):
+    try:
+        return existing_value + new_value
+    except (TypeError, ValueError):
+        return new_value
+
+
+def _merge_add(existing_value, new_value):
+    if isinstance(existing_value, (int, float)) and isinstance(new_value, (int, float)):
+        return existing_value + new_value
+    return new_value
+
+
+def _merge_subtract(existing_value, new_value):
+    if isinstance(existing_value, (int, float)) and isinstance(new_value, (int, float)):
+        return existing_value - new_value
+    return new_value
+
+
+def _merge_multiply(existing_value, new_value):
+    if isinstance(existing_value, (int, float)) and isinstance(new_value, (int, float)):
+        return existing_value * new_value
+    return new_value
+
+
+def _merge_divide(existing_value, new_value):
+    # Division by zero falls back to overwrite as well
+    if (isinstance(existing_value, (int, float)) and isinstance(new_value, (int, float))
+            and new_value != 0):
+        return existing_value / new_value
+    return new_value
+
+
+_LEAF_MERGERS = {
+    'overwrite': _merge_overwrite,
+    'append': _merge_append,
+    'add': _merge_add,
+    'subtract': _merge_subtract,
+    'multiply': _merge_multiply,
+    'divide': _merge_divide,
+}
+
+# Strategies that accumulate in place inside accumulating blocks
+_LEAF_ACCUMULATORS = {
+    'append': _AppendAccumulator(),
+}
+
+
+# When the numeric strategies apply instead of falling back to overwrite
+# (only consulted while a tree counts its merges, see _counting_merger)
+
+def _numeric_pair(existing_value, new_value):
+    return isinstance(existing_value, (int, float)) and isinstance(new_value, (int, float))
+
+
+def _divisible_pair(existing_value, new_value):
+    return _numeric_pair(existing_value, new_value) and new_value != 0
+
+
+_MERGE_APPLIES = {
+    'add': _numeric_pair,
+    'subtract': _numeric_pair,
+    'multiply': _numeric_pair,
+    'divide': _divisible_pair,
+}
+
+
+# Subtree aggregates. Each one is (identity, lift, combine): lift turns a leaf
+# value into an aggregate and combine joins two aggregates.
+
+def _combine_min(first, second):
+    if first is None:
+        return second
+    if second is None:
+        return first
+    return second if second < first else first
+
+
+def _combine_max(first, second):
+    if first is None:
+        return second
+    if second is None:
+        return first
+    return second if second > first else first
+
+
+def _identity(value):
+    return value
+
+
+def _one(value):
+    return 1
+
+
+def _add(first, second):
+    return first + second
+
+
+_AGGREGATES = {
+    'sum': (0, _identity, _add),
+    'count': (0, _one, _add),
+    'min': (None, _identity, _combine_min),
+    'max': (None, _identity, _combine_max),
+}
+
+
+def _resolve_aggregate(how):
+    """
+    Turn an aggregate setting into (identity, lift, combine).
+
+    Args:
+        how (str or tuple): The aggregate (see Yggdrasil.aggregate)
+
+    Returns:
+        tuple: (identity, lift, combine)
+
+    Raises:
+        ValueError: If how is an unknown aggregate name
+        TypeError: If how is neither a string nor an (identity, combine) pair
+    """
+    if isinstance(how, tuple):
+        if len(how) != 2 or not callable(how[1]):
+            raise TypeError("A custom aggregate must be an (identity, combine) pair")
+        return how[0], _identity, how[1]
+
+    if not isinstance(how, str):
+        raise TypeError(
+            f"how must be a string or an (identity, combine) pair, not {type(how).__name__}")
+    try:
+        return _AGGREGATES[how]
+    except KeyError:
+        raise ValueError(
+            f"Unknown aggregate {how!r}, expected one of "
+            f"{', '.join(map(repr, _AGGREGATES))} or an (identity, combine) pair") from None
+
+
+def _resolve_merger(leaf_behavior):
+    """
+    Turn a leaf_behavior setting into a merge function.
+
+    Args:
+        leaf_behavior (str, callable or LeafAccumulator): The leaf behavior
+            (see Yggdrasil.__init__)
+
+    Returns:
+        callable: A function (existing_value, new_value) -> value to store
+
+    Raises:
+        ValueError: If leaf_behavior is an unknown behavior name
+        TypeError: If leaf_behavior is not a string, a callable or a LeafAccumulator
+    """
+    if isinstance(leaf_behavior, LeafAccumulator):
+        return _AccumulatorMerge(leaf_behavior)
+
+    if callable(leaf_behavior):
+        def merge(existing_value, new_value):
+            try:
+                # Call the custom function with existing and new values
+                return leaf_behavior(existing_value, new_value)
+            except Exception:
+                # If the custom function fails, fall back to overwrite
+                return new_value
+        return merge
+
+    if not isinstance(leaf_behavior, str):
+        raise TypeError(
+            "leaf_behavior must be a string, a callable or a LeafAccumulator, "
+            f"not {type(leaf_behavior).__name__}")
+    try:
+        merger = _LEAF_MERGERS[leaf_behavior]
+    except KeyError:
+        raise ValueError(
+            f"Unknown leaf_behavior {leaf_behavior!r}, expected one of "
+            f"{', '.join(map(repr, _LEAF_MERGERS))}, a callable or a LeafAccumulator") from None
+    if leaf_behavior in _LEAF_ACCUMULATORS:
+        return _AccumulatorMerge(_LEAF_ACCUMULATORS[leaf_behavior], merger)
+    return merger
+
+
+class _BlockState(threading.local):
+    """
+    The accumulating blocks a thread has open on one tree.
+
+    states maps id(state) to (state, node, key) while a block is open, None otherwise.
+    """
+
+    states = None
+    # Number of open accumulating blocks
+    depth = 0
+
+
+class _AccumulatorMerge:
+    """
+    The merge function of a LeafAccumulator leaf behavior.
+
+    Outside of accumulating blocks every collision runs init, accumulate and
+    finalize. Inside, the states of the thread's block (see _BlockState) are
+    the states that are stored as leaf values, so the next collision at such
+    a leaf continues from the stored state. node and key locate the leaves of
+    deferred states, which are finalized when the block ends; they are None
+    for states that are stored finalized already. Blocks are per thread, so
+    one thread's block never changes how other threads' writes are merged.
+    States are not reused while the tree has snapshots, a journal or
+    indexes, which keep references to the old leaf values, and they are not
+    deferred on thread-safe trees, where other threads could read them.
+    """
+
+    __slots__ = ('accumulator', 'single', 'config', 'block')
+
+    def __init__(self, accumulator, single=None):
+        self.accumulator = accumulator
+        # Equivalent merge function for single collisions outside of blocks
+        self.single = single
+        # The tree config, set by _TreeConfig.set_leaf_behavior
+        self.config = None
+        self.block = _BlockState()
+
+    def __call__(self, existing_value, new_value):
+        if self.block.states is None and self.single is not None:
+            return self.single(existing_value, new_value)
+        return self.fold(existing_value, (new_value,))
+
+    def merge_at(self, node, key, existing_value, new_value):
+        """
+        Merge a new value into the leaf at node[key] (see __call__).
+        """
+        if self.block.states is None and self.single is not None:
+            return self.single(existing_value, new_value)
+        return self.fold(existing_value, (new_value,), node, key)
+
+    def fold(self, existing_value, values, node=None, key=None):
+        """
+        Accumulate several new values into an existing leaf value.
+
+        Args:
+            existing_value: The value stored at the leaf
+            values: An iterable of new values, in insertion order
+            node (Yggdrasil, optional): The node holding the leaf, needed to
+                defer finalization until the end of the block
+            key: The key of the leaf in node
+
+        Returns:
+            The value to store at the leaf
+        """
+        values = iter(values)
+        value = next(values, _MISSING)
+        if value is _MISSING:
+            return existing_value
+
+        accumulator = self.accumulator
+        states = self.block.states
+        config = self.config
+        if states is not None and (config.snapshot is not None or config.journal is not None
+                                   or config.indexes is not None):
+            states = None
+        entry = None if states is None else states.pop(id(existing_value), None)
+        if entry is not None:
+            state = entry[0]
+        else:
+            state = accumulator.init(existing_value)
+
+        state = accumulator.accumulate(state, value)
+        for value in values:
+            state = accumulator.accumulate(state, value)
+
+        if (states is not None and accumulator.deferred and node is not None
+                and config.locks is None):
+            states[id(state)] = (state, node, key)
+            return state
+        result = accumulator.finalize(state)
+        if states is not None and result is state:
+            states[id(state)] = (state, None, None)
+        return result
+
+
+def _counting_merger(leaf_behavior, counters, accumulator=None):
+    """
+    Build a merge function for leaf_behavior that also counts merges and fallbacks.
+
+    Args:
+        leaf_behavior (str, callable or LeafAccumulator): A valid leaf behavior
+        counters (_TreeCounters): The counters to update
+        accumulator (_AccumulatorMerge, optional): The tree's merge function of
+            a LeafAccumulator leaf_behavior
+
+    Returns:
+        callable: A function (existing_value, new_value) -> value to store
+    """
+    if isinstance(leaf_behavior, str):
+        name = leaf_behavior
+    elif isinstance(leaf_behavior, LeafAccumulator):
+        name = type(leaf_behavior).__name__
+    else:
+        name = getattr(leaf_behavior, '__name__', repr(leaf_behavior))
+    merges = counters.leaf_merges
+    fallbacks = counters.fallbacks
+    merges.setdefault(name, 0)
+    fallbacks.setdefault(name, 0)
+
+    if isinstance(leaf_behavior, LeafAccumulator):
+        # Accumulators raise instead of falling back, only merges are counted
+        def merge(existing_value, new_value):
+            merges[name] += 1
+            return accumulator(existing_value, new_value)
+        return merge
+
+    if callable(leaf_behavior) or leaf_behavior == 'append':
+        combine = leaf_behavior if callable(leaf_behavior) else _add
+        errors = Exception if callable(leaf_behavior) else (TypeError, ValueError)
+
+        def merge(existing_value, new_value):
+            merges[name] += 1
+            try:
+                return combine(existing_value, new_value)
+            except errors:
+                fallbacks[name] += 1
+                return new_value
+        return merge
+
+    strategy = _LEAF_MERGERS[leaf_behavior]
+    applies = _MERGE_APPLIES.get(leaf_behavior)
+
+    def merge(existing_value, new_value):
+        merges[name] += 1
+        if applies is not None and not applies(existing_value, new_value):
+            fallbacks[name] += 1
+            return new_value
+        return strategy(existing_value, new_value)
+    return merge
+
+
+class _TreeCounters:
+    """
+    Instrumentation counters of one tree (see Yggdrasil.start_counters).
+    """
+
+    __slots__ = ('nodes_created', 'auto_created', 'leaf_merges', 'fallbacks')
+
+    def __init__(self):
+        self.nodes_created = 0
+        self.auto_created = 0
+        # Per leaf behavior name
+        self.leaf_merges = {}
+        self.fallbacks = {}
+
+    def as_dict(self):
+        return {
+            'nodes_created': self.nodes_created,
+            'auto_created': self.auto_created,
+            'leaf_merges': dict(self.leaf_merges),
+            'fallbacks': dict(self.fallbacks),
+        }
+
+
+class _TreeConfig:
+    """
+    Settings shared by all nodes of one tree.
+    """
+
+    __slots__ = ('leaf_behavior', 'merge', 'accumulator', 'frozen', 'locks', 'indexes', 'symbols',
+                 'journal', 'counters', 'snapshot')
+
+    def __init__(self, leaf_behavior='overwrite', thread_safe=False, intern_keys=False):
+        # Instrumentation counters (see Yggdrasil.start_counters), None if off
+        self.counters = None
+        self.set_leaf_behavior(leaf_behavior)
+        self.frozen = False
+        # Secondary indexes (see Yggdrasil.create_index), None if there are none
+        self.indexes = None
+        # Change journal (see Yggdrasil.start_journal), None if not journaled
+        self.journal = None
+        # Weak reference to the state of the newest snapshot (see Yggdrasil.snapshot)
+        self.snapshot = None
+        self.locks = None
+        self.set_thread_safe(thread_safe)
+        # Canonical copy of every string key (see Yggdrasil.intern_keys)
+        self.symbols = {} if intern_keys else None
+
+    def set_leaf_behavior(self, leaf_behavior):
+        # Resolve the behavior once instead of on every leaf collision
+        self.merge = _resolve_merger(leaf_behavior)
+        self.leaf_behavior = leaf_behavior
+        # The merge function of a LeafAccumulator, which keeps the accumulating state
+        self.accumulator = None
+        if isinstance(self.merge, _AccumulatorMerge):
+            self.accumulator = self.merge
+            self.accumulator.config = self
+        if self.counters is not None:
+            self.merge = _counting_merger(leaf_behavior, self.counters, self.accumulator)
+
+    def set_counters(self, enabled):
+        self.counters = _TreeCounters() if enabled else None
+        self.set_leaf_behavior(self.leaf_behavior)
+
+    def set_thread_safe(self, thread_safe):
+        if not thread_safe:
+            self.locks = None
+        elif self.locks is None:
+            self.locks = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+
+    def __reduce__(self):
+        # The resolved merge function may be a closure and locks cannot be
+        # pickled, rebuild both instead
+        return (self.__class__, (self.leaf_behavior, self.locks is not None,
+                                 self.symbols is not None))
+
+
+def _restore_node(cls, config, items):
+    """
+    Rebuild a pickled or copied node (see Yggdrasil.__reduce__).
+    """
+    node = dict.__new__(cls)
+    node._config = config
+    node._parent = node._key = None
+    node._aggregates = None
+    symbols = config.symbols
+    if symbols is not None:
+        # Pickle only shares identical key objects, not equal ones
+        items = {symbols.setdefault(key, key) if type(key) is str else key: value
+                 for key, value in items.items()}
+    dict.update(node, items)
+    for key, value in items.items():
+        if isinstance(value, Yggdrasil):
+            value._parent = node
+            value._key = key
+    return node
+
 
 class Yggdrasil(dict):
-    def __init__(self, leaf_behavior='overwrite'):
+    # Nodes have no instance __dict__; all settings live in the shared config.
+    # _parent and _key link every node to the node holding it and _aggregates
+    # caches subtree aggregates (None while dirty, see aggregate). Child nodes
+    # of subclasses with their own __init__ are built by calling
+    # cls(leaf_behavior=...), which __init__ must accept.
+    __slots__ = ('_config', '_parent', '_key', '_aggregates')
+
+    def __init__(self, leaf_behavior='overwrite', thread_safe=False, intern_keys=False):
+        """
+        Initialize a new Yggdrasil tree.
+
+        Args:
+            leaf_behavior (str or callable): How to handle duplicate leaf nodes.
+                If str, must be one of:
+                    'overwrite': Replace existing value (default)
+                    'append': Append to existing value if possible
+                    'add': Add to existing value if both are numeric
+                    'subtract': Subtract new value from existing value if both are numeric
+                    'multiply': Multiply with existing value if both are numeric
+                    'divide': Divide existing value by new value if both are numeric
+                If callable, must be a function that takes two arguments (existing_value, new_value)
+                and returns the value to be stored.
+                If a LeafAccumulator, colliding values are accumulated into a state
+                (see LeafAccumulator and accumulating).
+
+            thread_safe (bool): Make writes safe for concurrent threads (see thread_safe)
+            intern_keys (bool): Share one object per distinct string key (see intern_keys)
+
+        Raises:
+            ValueError: If leaf_behavior is not one of the names above
+            TypeError: If leaf_behavior is not a string, a callable or a LeafAccumulator
+        """
+        super().__init__()
+        self._config = _TreeConfig(leaf_behavior, thread_safe, intern_keys)
+        self._parent = self._key = None
+        self._aggregates = None
+
+    @property
+    def leaf_behavior(self):
+        """The leaf behavior of the tree (str, callable or LeafAccumulator)."""
+        return self._config.leaf_behavior
+
+    @leaf_behavior.setter
+    def leaf_behavior(self, leaf_behavior):
+        # Every node of a tree shares one config, so this applies tree-wide
+        self._config.set_leaf_behavior(leaf_behavior)
+
+    @contextmanager
+    def accumulating(self):
+        """
+        Accumulate colliding leaf values in place until the block ends.
+
+        With the 'append' behavior or a LeafAccumulator, a leaf normally
+        starts from a fresh state at every collision, e.g. 'append' copies a
+        list before extending it, so n appends to one leaf cost O(n²).
+        Inside the block the tree keeps the state it stored at each leaf and
+        later collisions extend it in place, in amortized O(1). Leaf lists
+        that were stored by the tree can therefore change after they have
+        been read; values passed in by callers are never changed.
+
+        Deferred accumulators (LeafAccumulator.deferred) store their raw
+        state at the leaves during the block; every such leaf is finalized
+        when the thread's outermost block ends. insert_many accumulates like
+        this on its own. Blocks only apply to the thread that opened them.
+        Other leaf behaviors are not affected. States are not reused while
+        the tree has snapshots, a journal or indexes, and on thread-safe
+        trees every leaf is finalized at once, so other threads never read
+        a raw state.
+
+        Example:
+            tree = Yggdrasil(leaf_behavior='append')
+            with tree.accumulating():
+                for event in events:
+                    tree['log'][event.day] = (event,)   # one tuple of events per day
+        """
+        merge = self._config.accumulator
+        if merge is None:
+            yield
+            return
+
+        block = merge.block
+        block.depth += 1
+        if block.states is None:
+            block.states = {}
+        try:
+            yield
+        finally:
+            block.depth -= 1
+            states = None
+            if not block.depth:
+                states, block.states = block.states, None
+            if states and merge.accumulator.deferred:
+                _finalize_states(merge.accumulator, states)
+
+    def _new_node(self, parent=None, key=None):
+        """
+        Create an empty child node that belongs to the same tree.
+
+        Child nodes skip __init__ and reference the tree config of their parent,
+        so each one costs little more than its key table. Subclasses that
+        define their own __init__ get it called with the tree's leaf_behavior,
+        so the attributes it sets exist on every node.
+
+        Args:
+            parent (Yggdrasil, optional): The node the new node will be stored in
+            key: The key of the new node in parent
+
+        Returns:
+            Yggdrasil: The new node
+        """
+        cls = self.__class__
+        if cls.__init__ is Yggdrasil.__init__:
+            node = dict.__new__(cls)
+        else:
+            node = cls(leaf_behavior=self._config.leaf_behavior)
+        node._config = self._config
+        node._parent = parent
+        node._key = key
+        node._aggregates = None
+        return node
+
+    def __missing__(self, key):
+        # Called by dict.__getitem__ for absent keys: create the child node
+        if self._config.frozen:
+            raise KeyError(key)
+        with self._lock():
+            # Another thread may have created the node in the meantime
+            node = dict.get(self, key, _MISSING)
+            if node is _MISSING:
+                if self._config.symbols is not None:
+                    key = self._symbol(key)
+                node = self._new_node(self, key)
+                if self._config.snapshot is not None:
+                    self._preserve()
+                dict.__setitem__(self, key, node)
+                if self._config.counters is not None:
+                    self._config.counters.nodes_created += 1
+                    self._config.counters.auto_created += 1
+                if self._aggregates is not None:
+                    self._invalidate()
+                if self._config.indexes is not None:
+                    self._config.indexes.set(self, key, _MISSING, node)
+                if self._config.journal is not None:
+                    self._config.journal.set(self, key, node)
+        return node
+
+    @property
+    def thread_safe(self):
+        """
+        Whether writes are safe for concurrent threads (bool, applies tree-wide).
+
+        A thread-safe tree guards every node with one of a fixed set of striped
+        locks. Node creation and the read-merge-write of a leaf collision are
+        atomic, so concurrent 'add' updates are never lost and two threads
+        never create the same node twice. Writers to different nodes mostly
+        take different locks and do not wait for each other. Read-modify-write
+        sequences outside the tree (tree[k] += 1) are not atomic; write
+        through the leaf behavior instead (e.g. tree.insert(path, 1) with 'add').
+        """
+        return self._config.locks is not None
+
+    @thread_safe.setter
+    def thread_safe(self, thread_safe):
+        self._config.set_thread_safe(thread_safe)
+
+    def _lock(self):
+        """
+        Return the stripe lock that guards this node (a no-op if not thread-safe).
+        """
+        locks = self._config.locks
+        if locks is None:
+            return _NO_LOCK
+        # Object addresses are 16-byte aligned, the low bits carry no information
+        return locks[(id(self) >> 4) & (_LOCK_STRIPES - 1)]
+
+    def start_counters(self):
+        """
+        Count what the tree does, to profile a workload.
+
+        The counters cover the whole tree: nodes created, the part of them
+        created by item access on a missing key (tree[key], which includes
+        chained assignments like tree['a']['b'] = 1), and leaf merges and
+        fallbacks to overwrite per leaf behavior (e.g. 'add' meeting a
+        string). Batched writes count the merges they perform, which can be
+        fewer than the values they store. Counting slows down writes a
+        little; the counters are not exact under concurrent writers.
+        Calling this again resets the counters.
+        """
+        self._config.set_counters(True)
+
+    def stop_counters(self):
+        """
+        Stop counting and drop the counters.
+        """
+        self._config.set_counters(False)
+
+    @property
+    def counters(self):
+        """
+        A snapshot of the instrumentation counters (dict, None if not counting).
+
+        The keys are 'nodes_created', 'auto_created', and 'leaf_merges' and
+        'fallbacks', which map leaf behavior names to counts.
+        """
+        counters = self._config.counters
+        return counters.as_dict() if counters is not None else None
+
+    @property
+    def intern_keys(self):
+        """
+        Whether string keys are interned in a tree-wide symbol table (bool).
+
+        Trees built from tables repeat the same keys (statuses, dates,
+        categories) in many sibling subtrees, and every node would otherwise
+        hold its own copy of each string. With interning, a new string key
+        is replaced by the first equal key the tree has seen, so each
+        distinct key is stored once. Keys of other types are left alone,
+        since e.g. 1, 1.0 and True are equal keys of different types.
+        Lookups and the mapping behavior do not change.
+
+        Enabling interning on an existing tree interns its current keys.
+        """
+        return self._config.symbols is not None
+
+    @intern_keys.setter
+    def intern_keys(self, intern_keys):
+        config = self._config
+        if not intern_keys:
+            config.symbols = None
+        elif config.symbols is None:
+            config.symbols = {}
+            root = self._root()
+            root._intern_subtree(root)
+
+    def _symbol(self, key):
+        """
+        Return the interned copy of a key (only called while interning is on).
+        """
+        if type(key) is str:
+            return self._config.symbols.setdefault(key, key)
+        return key
+
+    def _intern_subtree(self, root, locked=True):
+        """
+        Replace the string keys of root and every node below it by their interned copies.
+
+        Args:
+            root (Yggdrasil): The subtree to intern
+            locked (bool): Take the stripe lock of each node. Pass False for
+                           subtrees that other threads cannot reach yet, e.g.
+                           while the caller holds a stripe lock itself.
+        """
+        symbols = self._config.symbols
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            with node._lock() if locked else _NO_LOCK:
+                rebuild = False
+                for key, value in dict.items(node):
+                    if type(key) is str and symbols.setdefault(key, key) is not key:
+                        rebuild = True
+                    if isinstance(value, Yggdrasil):
+                        stack.append(value)
+                if rebuild:
+                    # Keys cannot be swapped in place, re-insert them in order
+                    items = list(dict.items(node))
+                    if node._config.snapshot is not None:
+                        node._preserve()
+                    dict.clear(node)
+                    for key, value in items:
+                        if type(key) is str:
+                            key = symbols[key]
+                            if isinstance(value, Yggdrasil):
+                                value._key = key
+                        dict.__setitem__(node, key, value)
+
+    def snapshot(self):
+        """
+        Return a read-only view of this node and everything below it as it is now.
+
+        Taking a snapshot is O(1) and copies nothing. Afterwards, the first
+        write to each node keeps a shallow copy of that node's items for the
+        snapshot, so later writes never show up in it and a write costs at
+        most one extra node copy per snapshot. Any number of snapshots can be
+        alive at once; once they are garbage collected, writes stop copying.
+        Snapshots can be read from other threads while a thread-safe tree is
+        written. They share leaf values, so mutable leaves changed in place
+        show up in them.
+
+        Returns:
+            TreeSnapshot: The read-only view
+        """
+        from .snapshot import TreeSnapshot, _SnapshotState
+
+        config = self._config
+        state = _SnapshotState(config.leaf_behavior)
+        previous = config.snapshot() if config.snapshot is not None else None
+        if previous is not None:
+            # Nodes left unchanged until the next snapshot are looked up there
+            previous.newer = state
+        config.snapshot = weakref.ref(state)
+        return TreeSnapshot(state, self)
+
+    def _preserve(self):
+        """
+        Keep the items of this node for the newest snapshot before its first write after it.
+        """
+        config = self._config
+        state = config.snapshot()
+        if state is None:
+            # Every snapshot has been dropped
+            config.snapshot = None
+        elif id(self) not in state.preserved:
+            state.preserved[id(self)] = (self, dict.copy(self))
+
+    @property
+    def frozen(self):
+        """Whether the tree is read-only (see freeze)."""
+        return self._config.frozen
+
+    def freeze(self):
+        """
+        Make the whole tree read-only.
+
+        While frozen, missing keys raise KeyError instead of creating nodes and
+        every modification raises TypeError. Use unfreeze to allow writes again.
+        """
+        self._config.frozen = True
+
+    def unfreeze(self):
+        """
+        Allow modifications of a frozen tree again.
+        """
+        self._config.frozen = False
+
+    def _check_writable(self):
+        if self._config.frozen:
+            raise TypeError("Cannot modify a frozen Yggdrasil tree")
+
+    def _invalidate(self):
+        """
+        Mark the cached aggregates of this node and its ancestors as dirty.
+
+        A dirty node only has dirty ancestors, so the walk stops at the first
+        node that is already dirty.
+        """
+        node = self
+        while node is not None and node._aggregates is not None:
+            node._aggregates = None
+            node = node._parent
+
+    def __delitem__(self, key):
+        self._check_writable()
+        with self._lock():
+            if self._config.snapshot is not None:
+                self._preserve()
+            value = dict.pop(self, key)
+            self._invalidate()
+            if self._config.indexes is not None:
+                self._config.indexes.remove(self, key, value)
+            if self._config.journal is not None:
+                self._config.journal.delete(self, key)
+
+    def pop(self, key, *default):
+        self._check_writable()
+        with self._lock():
+            if self._config.snapshot is not None:
+                self._preserve()
+            value = dict.pop(self, key, _MISSING)
+            if value is _MISSING:
+                if default:
+                    return default[0]
+                raise KeyError(key)
+            self._invalidate()
+            if self._config.indexes is not None:
+                self._config.indexes.remove(self, key, value)
+            if self._config.journal is not None:
+                self._config.journal.delete(self, key)
+            return value
+
+    def popitem(self):
+        self._check_writable()
+        with self._lock():
+            if self._config.snapshot is not None:
+                self._preserve()
+            key, value = dict.popitem(self)
+            self._invalidate()
+            if self._config.indexes is not None:
+                self._config.indexes.remove(self, key, value)
+            if self._config.journal is not None:
+                self._config.journal.delete(self, key)
+            return key, value
+
+    def clear(self):
+        self._check_writable()
+        with self._lock():
+            self._invalidate()
+            indexes = self._config.indexes
+            if indexes is not None:
+                for key, value in dict.items(self):
+                    indexes.remove(self, key, value)
+            if self._config.snapshot is not None:
+                self._preserve()
+            dict.clear(self)
+            if self._config.journal is not None:
+                self._config.journal.clear(self)
+
+    def update(self, *args, **kwargs):
+        self._check_writable()
+        with self._lock():
+            for key, value in dict(*args, **kwargs).items():
+                if isinstance(value, Yggdrasil):
+                    value = self._claim(value)
+                self._replace(key, value)
+            self._invalidate()
+
+    def setdefault(self, key, default=None):
+        self._check_writable()
+        with self._lock():
+            if key in self:
+                return dict.__getitem__(self, key)
+            if isinstance(default, Yggdrasil):
+                default = self._claim(default)
+            self._replace(key, default)
+            self._invalidate()
+            return default
+
+    def _replace(self, key, value, existing_value=_MISSING):
+        """
+        Store value at key as-is, without the leaf behavior, keeping links and indexes current.
+
+        Args:
+            key: The key in this node
+            value: The value or node to store
+            existing_value: The value currently stored at key, if the caller knows it
+        """
+        if existing_value is _MISSING:
+            existing_value = dict.get(self, key, _MISSING)
+        if existing_value is _MISSING and self._config.symbols is not None:
+            key = self._symbol(key)
+        if isinstance(value, Yggdrasil):
+            value._parent = self
+            value._key = key
+        if self._config.snapshot is not None:
+            self._preserve()
+        dict.__setitem__(self, key, value)
+        if self._config.indexes is not None:
+            self._config.indexes.set(self, key, existing_value, value)
+        if self._config.journal is not None:
+            self._config.journal.set(self, key, value)
+
+    def __ior__(self, other):
+        # tree |= other merges trees instead of replacing whole subtrees
+        self.merge(other)
+        return self
+
+    def __reduce__(self):
+        # Restore the config before the items, so pickle and deepcopy never
+        # see a node without one
+        state = getattr(self, '__dict__', None)
+        if state:
+            # Attributes of subclasses without __slots__
+            return (_restore_node, (self.__class__, self._config, dict(self)), state)
+        return (_restore_node, (self.__class__, self._config, dict(self)))
+
+    def __copy__(self):
+        # Reusing the child nodes would relink them to the copy (every node
+        # has one parent), so copy the node structure and share the leaves.
+        # Like deepcopy, the copy is a new tree with its own config: same
+        # leaf behavior, thread safety and interning, nothing else.
+        config = self._config
+        tree = self._new_node()
+        tree._config = _TreeConfig(config.leaf_behavior, config.locks is not None,
+                                   config.symbols is not None)
+        tree = tree._copy_structure(self)
+        state = getattr(self, '__dict__', None)
+        if state:
+            tree.__dict__.update(state)
+        return tree
+
+    def __setitem__(self, key, values=None):
+        if self._config.frozen:
+            raise TypeError("Cannot modify a frozen Yggdrasil tree")
+
+        if not isinstance(values, list) or not values:
+            if self._config.locks is None:
+                self._store(key, values)
+            else:
+                with self._lock():
+                    self._store(key, values)
+            return
+
+        # A non-empty list is a path below key whose last element is the leaf value.
+        # Walk it by index instead of consuming the caller's list.
+        self.insert(chain((key,), islice(values, len(values) - 1)), values[-1])
+
+    def _store(self, key, value):
+        """
+        Store a leaf value or node at key, applying the leaf behavior on collisions.
+
+        Args:
+            key: The key in this node
+            value: The value to store (not a path)
+        """
+        if isinstance(value, Yggdrasil):
+            value = self._claim(value)
+        # Handle leaf node behavior if the key already exists
+        existing_value = dict.get(self, key, _MISSING)
+        if existing_value is not _MISSING and not isinstance(existing_value, Yggdrasil):
+            merge = self._config.merge
+            if merge is self._config.accumulator:
+                value = merge.merge_at(self, key, existing_value, value)
+            else:
+                value = merge(existing_value, value)
+        elif existing_value is _MISSING and self._config.symbols is not None:
+            key = self._symbol(key)
+        # Otherwise the key doesn't exist or is a Yggdrasil instance, just set the value
+        if isinstance(value, Yggdrasil):
+            value._parent = self
+            value._key = key
+        if self._config.snapshot is not None:
+            self._preserve()
+        dict.__setitem__(self, key, value)
+        if self._aggregates is not None:
+            self._invalidate()
+        if self._config.indexes is not None:
+            self._config.indexes.set(self, key, existing_value, value)
+        if self._config.journal is not None:
+            self._config.journal.set(self, key, value)
+
+    def _child(self, key):
+        """
+        Return the child node at key, creating it if it does not exist yet.
+
+        Args:
+            key: The key of the child node
+
+        Returns:
+            Yggdrasil: The child node
+
+        Raises:
+            TypeError: If key holds a leaf value instead of a node
+        """
+        child = dict.get(self, key, _MISSING)
+        if child is _MISSING:
+            self._check_writable()
+            with self._lock():
+                # Another thread may have created the node in the meantime
+                child = dict.get(self, key, _MISSING)
+                if child is _MISSING:
+                    if self._config.symbols is not None:
+                        key = self._symbol(key)
+                    child = self._new_node(self, key)
+                    if self._config.snapshot is not None:
+                        self._preserve()
+                    dict.__setitem__(self, key, child)
+                    if self._config.counters is not None:
+                        self._config.counters.nodes_created += 1
+                    if self._aggregates is not None:
+                        self._invalidate()
+                    if self._config.indexes is not None:
+                        self._config.indexes.set(self, key, _MISSING, child)
+                    if self._config.journal is not None:
+                        self._config.journal.set(self, key, child)
+        if not isinstance(child, Yggdrasil):
+            raise TypeError(f"Cannot descend into leaf value at key {key!r}")
+        return child
+
+    def _descend(self, path):
+        """
+        Walk down a sequence of keys, creating missing nodes along the way.
+
+        Args:
+            path: An iterable of keys, starting below this node
+
+        Returns:
+            Yggdrasil: The node reached at the end of the path
+        """
+        node = self
+        for key in path:
+            node = node._child(key)
+        return node
+
+    def _merge_batch(self, key, batch):
+        """
+        Store several values at one leaf as if they had been set one after another.
+
+        The whole batch is folded with the leaf behavior and written once,
+        instead of going through __setitem__ for every value.
+
+        Args:
+            key: The leaf key in this node
+            batch (list): The incoming leaf values (no paths), in insertion order
+        """
+        with self._lock():
+            if self._aggregates is not None:
+                self._invalidate()
+
+            existing_value = dict.get(self, key, _MISSING)
+            if existing_value is _MISSING and self._config.symbols is not None:
+                key = self._symbol(key)
+            if existing_value is _MISSING or isinstance(existing_value, Yggdrasil):
+                result = batch[0]
+                pending = islice(batch, 1, None)
+            else:
+                result = existing_value
+                pending = batch
+
+            merge = self._config.merge
+            if merge is _merge_overwrite:
+                # Only the last value survives
+                result = batch[-1]
+            elif merge is self._config.accumulator:
+                # One state for the whole batch instead of one per value
+                result = merge.fold(result, pending, self, key)
+            else:
+                for value in pending:
+                    result = merge(result, value)
+            if self._config.snapshot is not None:
+                self._preserve()
+            dict.__setitem__(self, key, result)
+            if self._config.indexes is not None:
+                self._config.indexes.set(self, key, existing_value, result)
+            if self._config.journal is not None:
+                self._config.journal.set(self, key, result)
+
+    def merge(self, other, consume=False):
+        """
+        Merge another tree into this one.
+
+        Both trees are walked together. Subtrees that only exist in other are
+        attached as a whole, and this tree's leaf_behavior is applied only
+        where both trees hold a leaf at the same path. Where one side holds a
+        leaf and the other a subtree, the value from other replaces the
+        existing one, as with assignment.
+
+        Args:
+            other (Yggdrasil or dict): The tree to merge into this one
+            consume (bool): If True, subtrees that only exist in other are moved
+                            into this tree by reference instead of being copied.
+                            other must not be used afterwards.
+        """
+        self._check_writable()
+
+        merge = self._config.merge
+        accumulator = self._config.accumulator
+        stack = [(self, other)]
+        while stack:
+            target, source = stack.pop()
+            with target._lock():
+                target._invalidate()
+                for key, value in source.items():
+                    existing_value = dict.get(target, key, _MISSING)
+                    if isinstance(value, Yggdrasil):
+                        if isinstance(existing_value, Yggdrasil):
+                            stack.append((existing_value, value))
+                            continue
+                        if consume:
+                            self._adopt(value)
+                        else:
+                            value = self._copy_structure(value)
+                    elif existing_value is not _MISSING and not isinstance(existing_value, Yggdrasil):
+                        # A real leaf collision
+                        if merge is accumulator:
+                            value = merge.merge_at(target, key, existing_value, value)
+                        else:
+                            value = merge(existing_value, value)
+                    target._replace(key, value, existing_value)
+
+    def _copy_structure(self, node):
+        """
+        Copy the nodes of a subtree into new nodes of this tree.
+
+        Leaf values are shared, only the node structure is copied.
+
+        Args:
+            node (Yggdrasil): The root of the subtree to copy
+
+        Returns:
+            Yggdrasil: The copied subtree
+        """
+        root = self._new_node()
+        symbols = self._config.symbols
+        stack = [(root, node)]
+        while stack:
+            target, source = stack.pop()
+            for key, value in dict.items(source):
+                if symbols is not None and type(key) is str:
+                    key = symbols.setdefault(key, key)
+                if isinstance(value, Yggdrasil):
+                    child = self._new_node(target, key)
+                    stack.append((child, value))
+                    value = child
+                dict.__setitem__(target, key, value)
+        return root
+
+    def get_path(self, path, default=None):
+        """
+        Look up the value at the end of a path without creating any nodes.
+
+        Unlike chained indexing (tree['a']['b']), missing keys are not added
+        to the tree.
+
+        Args:
+            path: An iterable of keys
+            default: The value to return if the path does not exist
+
+        Returns:
+            The node or leaf value at the end of the path, or default
+        """
+        if hasattr(path, 'tolist'):
+            path = path.tolist()
+
+        node = self
+        for key in path:
+            if not isinstance(node, Yggdrasil):
+                # The path continues below a leaf value
+                return default
+            node = dict.get(node, key, _MISSING)
+            if node is _MISSING:
+                return default
+        return node
+
+    def contains_path(self, path):
+        """
+        Check whether a path exists in the tree without creating any nodes.
+
+        Args:
+            path: An iterable of keys
+
+        Returns:
+            bool: True if every key of the path exists
+        """
+        return self.get_path(path, _MISSING) is not _MISSING
+
+    def prune_empty(self):
+        """
+        Remove empty nodes, e.g. ones that were created by reading missing keys.
+
+        Nodes that only contain empty nodes are removed as well. The node this
+        is called on is kept even if it ends up empty.
+
+        Returns:
+            int: The number of removed nodes
+        """
+        self._check_writable()
+
+        # Collect (parent, key, node) for every node; each node is appended
+        # after its ancestors, so walking the list backwards visits children first
+        nodes = []
+        stack = [self]
+        while stack:
+            parent = stack.pop()
+            for key, value in dict.items(parent):
+                if isinstance(value, Yggdrasil):
+                    nodes.append((parent, key, value))
+                    stack.append(value)
+
+        removed = 0
+        for parent, key, node in reversed(nodes):
+            with parent._lock():
+                # Check under the lock, another thread may have written to node
+                if not node and dict.get(parent, key, _MISSING) is node:
+                    if parent._config.snapshot is not None:
+                        parent._preserve()
+                    dict.__delitem__(parent, key)
+                    parent._invalidate()
+                    if self._config.indexes is not None:
+                        self._config.indexes.remove(parent, key, node)
+                    if self._config.journal is not None:
+                        self._config.journal.delete(parent, key)
+                    removed += 1
+        return removed
+
+    def path(self):
+        """
+        Return the keys leading from the root of the tree to this node.
+
+        Returns:
+            tuple: The path of this node, () for the root
+        """
+        keys = []
+        node = self
+        while node._parent is not None:
+            keys.append(node._key)
+            node = node._parent
+        return tuple(reversed(keys))
+
+    def _root(self):
+        node = self
+        while node._parent is not None:
+            node = node._parent
+        return node
+
+    @property
+    def indexes(self):
+        """The kinds of secondary indexes of the tree (tuple, see create_index)."""
+        indexes = self._config.indexes
+        if indexes is None:
+            return ()
+        return tuple(kind for kind, index in (('value', indexes.values), ('key', indexes.keys))
+                     if index is not None)
+
+    def create_index(self, kind):
+        """
+        Create a secondary index for the whole tree.
+
+        A 'value' index maps every leaf value to the nodes holding it, a 'key'
+        index maps every key to the nodes containing it, at any depth. The
+        index is filled with one scan and from then on kept up to date by every
+        write (assignment, leaf merges, del, pop, merge, bulk loads), so
+        find_value and find_key no longer scan the tree. Unhashable leaf values
+        (e.g. lists collected with 'append') are not indexed. Indexes are not
+        copied with the tree and are not guarded by the locks of a thread-safe tree.
+
+        Args:
+            kind (str): 'value' or 'key'
+
+        Raises:
+            ValueError: If kind is not 'value' or 'key'
+        """
+        from .indexes import INDEX_KINDS, TreeIndexes
+        if kind not in INDEX_KINDS:
+            raise ValueError(f"Unknown index kind {kind!r}, expected 'value' or 'key'")
+        if kind in self.indexes:
+            return
+
+        config = self._config
+        indexes = config.indexes if config.indexes is not None else TreeIndexes()
+        indexes.create(kind, self._root())
+        config.indexes = indexes
+
+    def drop_index(self, kind):
+        """
+        Remove a secondary index created with create_index.
+
+        Args:
+            kind (str): 'value' or 'key'
+        """
+        indexes = self._config.indexes
+        if indexes is not None:
+            indexes.drop(kind)
+            if not indexes:
+                # Writes skip index maintenance entirely again
+                self._config.indexes = None
+
+    def find_value(self, value):
+        """
+        Find every leaf of the tree that holds value.
+
+        Uses the 'value' index if there is one, otherwise scans the whole tree.
+
+        Args:
+            value: The leaf value to look for (compared with ==)
+
+        Returns:
+            list: The paths (tuples of keys) of the matching leaves
+        """
+        indexes = self._config.indexes
+        if indexes is not None and indexes.values is not None:
+            try:
+                entries = indexes.values.get(value)
+            except TypeError:
+                entries = None  # Unhashable values are not indexed, scan instead
+            else:
+                if entries is None:
+                    return []
+                return [(*node.path(), key) for (_, key), node in entries.items()]
+
+        return [fiber[:-1] for fiber in self._root().iter_fibers() if fiber[-1] == value]
+
+    def find_key(self, key):
         """
-        Initialize a new Yggdrasil tree.
+        Find every node of the tree that contains key, at any depth.
+
+        Uses the 'key' index if there is one, otherwise scans the whole tree.
 
         Args:
-            leaf_behavior (str or callable): How to handle duplicate leaf nodes.
-                If str, must be one of:
-                    'overwrite': Replace existing value (default)
-                    'append': Append to existing value if possible
-                    'add': Add to existing value if both are numeric
-                    'subtract': Subtract new value from existing value if both are numeric
-                    'multiply': Multiply with existing value if both are numeric
-                    'divide': Divide existing value by new value if both are numeric
-                If callable, must be a function that takes two arguments (existing_value, new_value)
-                and returns the value to be stored.
+            key: The key to look for
+
+        Returns:
+            list: The nodes containing key; node.path() gives their location
         """
-        super().__init__()
-        self.leaf_behavior = leaf_behavior
+        indexes = self._config.indexes
+        if indexes is not None and indexes.keys is not None:
+            return list(indexes.keys.get(key, {}).values())
 
-    def __getitem__(self, key):
-        if key not in self:
-            self[key] = self.__class__(leaf_behavior=self.leaf_behavior)
-        return super().__getitem__(key)
+        found = []
+        stack = [self._root()]
+        while stack:
+            node = stack.pop()
+            if key in node:
+                found.append(node)
+            stack.extend(value for value in dict.values(node) if isinstance(value, Yggdrasil))
+        return found
 
-    def __setitem__(self, key, values=None):
-        if not isinstance(values, list) or not values:
-            # Handle leaf node behavior if the key already exists
-            if key in self and not isinstance(super().__getitem__(key), Yggdrasil):
-                existing_value = super().__getitem__(key)
-
-                # Check if leaf_behavior is a callable (custom function)
-                if callable(self.leaf_behavior):
-                    try:
-                        # Call the custom function with existing and new values
-                        new_value = self.leaf_behavior(existing_value, values)
-                        super().__setitem__(key, new_value)
-                    except Exception:
-                        # If the custom function fails, fall back to overwrite
-                        super().__setitem__(key, values)
-                # Apply the specified behavior
-                elif self.leaf_behavior == 'overwrite' or existing_value is None:
-                    # Default behavior - just overwrite
-                    super().__setitem__(key, values)
-                elif self.leaf_behavior == 'append':
-                    # Try to append values
-                    try:
-                        new_value = existing_value + values
-                        super().__setitem__(key, new_value)
-                    except (TypeError, ValueError):
-                        # If append fails, fall back to overwrite
-                        super().__setitem__(key, values)
-                elif self.leaf_behavior == 'add' and values is not None:
-                    # Try to add values numerically - only for numeric types
-                    if (isinstance(existing_value, (int, float)) and 
-                        isinstance(values, (int, float))):
-                        new_value = existing_value + values
-                        super().__setitem__(key, new_value)
-                    else:
-                        # For non-numeric types, fall back to overwrite
-                        super().__setitem__(key, values)
-                elif self.leaf_behavior == 'multiply' and values is not None:
-                    # Try to multiply values - only for numeric types
-                    if (isinstance(existing_value, (int, float)) and 
-                        isinstance(values, (int, float))):
-                        new_value = existing_value * values
-                        super().__setitem__(key, new_value)
-                    else:
-                        # For non-numeric types, fall back to overwrite
-                        super().__setitem__(key, values)
-                elif self.leaf_behavior == 'subtract' and values is not None:
-                    # Try to subtract values - only for numeric types
-                    if (isinstance(existing_value, (int, float)) and 
-                        isinstance(values, (int, float))):
-                        new_value = existing_value - values
-                        super().__setitem__(key, new_value)
-                    else:
-                        # For non-numeric types, fall back to overwrite
-                        super().__setitem__(key, values)
-                elif self.leaf_behavior == 'divide' and values is not None:
-                    # Try to divide values - only for numeric types
-                    if (isinstance(existing_value, (int, float)) and 
-                        isinstance(values, (int, float))):
-                        # Check for division by zero
-                        if values == 0:
-                            # For division by zero, fall back to overwrite
-                            super().__setitem__(key, values)
-                        else:
-                            new_value = existing_value / values
-                            super().__setitem__(key, new_value)
-                    else:
-                        # For non-numeric types, fall back to overwrite
-                        super().__setitem__(key, values)
+    def start_journal(self):
+        """
+        Record every change to the tree in a change journal.
+
+        Each write to any node of the tree (assignment, leaf merges, node
+        creation, del, pop, clear, merge, bulk loads) appends an entry
+        (path, op, value, version) with the next version number. Replicas
+        of the tree, e.g. in other processes, stay in sync by fetching the
+        entries they have not seen with changes and replaying them with
+        apply_delta, at a cost proportional to the changes instead of the
+        tree. compact_journal bounds the journal by replacing old entries
+        with a checkpoint. Calling this again on a journaled tree does nothing.
+        """
+        config = self._config
+        if config.journal is None:
+            from .journal import TreeJournal
+            config.journal = TreeJournal(self._root())
+
+    def stop_journal(self):
+        """
+        Stop recording changes and drop the journal.
+        """
+        self._config.journal = None
+
+    @property
+    def version(self):
+        """The version of the tree in its change journal (int, None if not journaled)."""
+        journal = self._config.journal
+        return journal.version if journal is not None else None
+
+    def changes(self, since=0):
+        """
+        Return the journal entries recorded after a version.
+
+        Args:
+            since (int): The version the caller already has
+
+        Returns:
+            list: (path, op, value, version) entries, oldest first (see cswtools.journal)
+
+        Raises:
+            ValueError: If the tree is not journaled or the entries after since
+                        were compacted; restore from the checkpoint instead
+        """
+        return self._journal().changes(since)
+
+    def apply_delta(self, entries):
+        """
+        Replay journal entries from another tree onto this replica.
+
+        Entries that are already applied are skipped, so the same delta can
+        be delivered twice. Recorded values are stored as they are, without
+        the leaf behavior. The replica records the entries in its own
+        journal (started if needed), so its version follows the source and
+        it can serve as the source for further replicas. A replica should
+        not be written to except through apply_delta.
+
+        Args:
+            entries: (path, op, value, version) entries, as returned by changes
+
+        Raises:
+            ValueError: If an entry is missing between the replica's version
+                        and the first new entry, or the source could not
+                        record a change ('resync'); restore from a new
+                        checkpoint instead
+        """
+        self.start_journal()
+        self._config.journal.apply(entries)
+
+    def compact_journal(self):
+        """
+        Drop the journal entries and keep a checkpoint of the tree instead.
+
+        The checkpoint is a pickled copy of the whole tree at the current
+        version; changes made after it are journaled as usual. Replicas that
+        are too far behind, or new ones, start from the checkpoint with
+        from_checkpoint and then apply the later changes. Call this while no
+        other thread writes to the tree.
+
+        Returns:
+            Checkpoint: A (version, data) named tuple
+
+        Raises:
+            ValueError: If the tree is not journaled
+        """
+        return self._journal().compact()
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint):
+        """
+        Restore a journaled replica from a checkpoint made by compact_journal.
+
+        The checkpoint data is a pickle; only load checkpoints from trusted sources.
+
+        Args:
+            checkpoint (Checkpoint): The checkpoint
+
+        Returns:
+            Yggdrasil: The tree at the checkpoint version, with a started journal
+        """
+        import pickle
+        from .journal import TreeJournal
+        tree = pickle.loads(checkpoint.data)
+        tree._config.journal = TreeJournal(tree, checkpoint.version)
+        return tree
+
+    def _journal(self):
+        journal = self._config.journal
+        if journal is None:
+            raise ValueError("The tree has no change journal, call start_journal first")
+        return journal
+
+    def select(self, pattern):
+        """
+        Generate the nodes and leaves below this node whose path matches a pattern.
+
+        The pattern is a string of segments separated by '/' or a sequence of
+        segments. A segment is an exact key, '*' (any key), '**' (any number
+        of keys, including none) or a glob such as '2026-*' on string keys.
+        Sequence patterns can also use non-string keys, sets of keys and
+        predicates (callables taking a key). Examples:
+
+            tree.select('*/2026-*/latency')
+            tree.select('**/errors')
+            tree.select(['sales', {2025, 2026}, lambda month: month >= 6])
+
+        Matches are produced lazily in insertion order. Branches that cannot
+        match are never entered, exact keys are looked up directly and no
+        nodes are created.
+
+        Args:
+            pattern (str, sequence or PathPattern): The path pattern; string
+                patterns are compiled once and cached, compile other patterns
+                with cswtools.query.compile_pattern to reuse them
+
+        Yields:
+            tuple: (path, value) for every match, where path is a tuple of keys
+            relative to this node and value is a node or a leaf value
+
+        Raises:
+            TypeError: If pattern is neither a string nor a sequence of segments
+        """
+        from .query import compile_pattern
+        return compile_pattern(pattern).select(self)
+
+    def aggregate(self, how='sum'):
+        """
+        Aggregate all leaf values below this node.
+
+        Results are cached on every node of the subtree. Each write marks the
+        written node and its ancestors as dirty, so reading an unchanged
+        subtree is O(1) and after a write only the dirty nodes along the
+        written paths are recomputed from their children's cached results.
+        This holds for every leaf behavior and for deletions. Leaf values that
+        are modified in place (e.g. a list appended to directly) are not noticed.
+
+        Args:
+            how (str or tuple): The aggregate to compute:
+                'sum': Sum of the leaf values (0 for a subtree without leaves)
+                'count': Number of leaves
+                'min': Smallest leaf value (None for a subtree without leaves)
+                'max': Largest leaf value (None for a subtree without leaves)
+                An (identity, combine) pair defines a custom monoid, where
+                combine(a, b) joins two leaf values or partial results. Pass the
+                same pair object again to reuse its cached results.
+
+        Returns:
+            The aggregate of the leaf values
+
+        Raises:
+            ValueError: If how is an unknown aggregate name
+            TypeError: If how is neither a string nor an (identity, combine) pair
+        """
+        cached = self._aggregates
+        if cached is not None and how in cached:
+            return cached[how]
+
+        identity, lift, combine = _resolve_aggregate(how)
+
+        locks = self._config.locks
+        if locks is None:
+            return self._aggregate(how, identity, lift, combine)
+
+        # Hold every stripe so no write can slip between computing a node's
+        # result and storing it, which would leave a stale cache behind
+        for lock in locks:
+            lock.acquire()
+        try:
+            return self._aggregate(how, identity, lift, combine)
+        finally:
+            for lock in locks:
+                lock.release()
+
+    def _aggregate(self, how, identity, lift, combine):
+        """
+        Compute an aggregate, reusing and filling the caches of the subtree (see aggregate).
+        """
+        # Post-order walk that skips every subtree whose result is cached
+        stack = [(self, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if not expanded:
+                cached = node._aggregates
+                if cached is None or how not in cached:
+                    stack.append((node, True))
+                    stack.extend((value, False) for value in dict.values(node)
+                                 if isinstance(value, Yggdrasil))
+                continue
+
+            result = identity
+            for value in dict.values(node):
+                if isinstance(value, Yggdrasil):
+                    result = combine(result, value._aggregates[how])
                 else:
-                    # Unknown behavior or incompatible types, fall back to overwrite
-                    super().__setitem__(key, values)
-            else:
-                # Key doesn't exist or is a Yggdrasil instance, just set the value
-                super().__setitem__(key, values)
+                    result = combine(result, lift(value))
+            if node._aggregates is None:
+                node._aggregates = {}
+            node._aggregates[how] = result
+
+        return self._aggregates[how]
+
+    def insert(self, path, value):
+        """
+        Set the leaf at the end of a path, creating intermediate nodes as needed.
+
+        tree.insert(('a', 'b', 'c'), 1) is equivalent to tree['a']['b']['c'] = 1,
+        including the leaf behavior on collisions. The path is walked
+        iteratively and is never copied or modified.
+
+        Args:
+            path: A non-empty iterable of keys (tuple, list, NumPy array, generator, ...)
+            value: The leaf value to store at the end of the path
+        """
+        # NumPy arrays and pandas Series yield NumPy scalars, use native values
+        if hasattr(path, 'tolist'):
+            path = path.tolist()
+
+        keys = iter(path)
+        try:
+            key = next(keys)
+        except StopIteration:
+            raise ValueError("Cannot insert an empty path") from None
+
+        node = self
+        for next_key in keys:
+            node = node._child(key)
+            key = next_key
+        node[key] = value
+
+    def _insert_fiber(self, fiber):
+        """
+        Insert a single fiber, i.e. a path whose last element is the leaf value.
+
+        Args:
+            fiber: A non-empty iterable (see add_fiber)
+        """
+        if hasattr(fiber, 'tolist'):
+            fiber = fiber.tolist()
+
+        elements = iter(fiber)
+        try:
+            key = next(elements)
+        except StopIteration:
+            raise ValueError("Cannot insert an empty fiber") from None
+        try:
+            value = next(elements)
+        except StopIteration:
+            # A lone sprout becomes a leaf holding an empty path
+            self[key] = []
             return
 
-        if key not in self:
-            super().__setitem__(key, self.__class__(leaf_behavior=self.leaf_behavior))
+        # Stay one element behind so the last element becomes the leaf value
+        node = self
+        for element in elements:
+            node = node._child(key)
+            key, value = value, element
+        node[key] = value
 
-        value = values.pop(0)
-        if values:
-            self[key].__setitem__(value, values)
-        else:
-            # When setting a leaf node, just set the value
-            # The behavior logic is already handled in the first part of this method
-            self[key] = value
+    def insert_many(self, fibers):
+        """
+        Add many fibers to the tree.
+
+        Args:
+            fibers: An iterable of fibers; each one is a path whose last element
+                    is the leaf value, as accepted by add_fiber
+        """
+        with _gc_paused(), self.accumulating():
+            for fiber in fibers:
+                self._insert_fiber(fiber)
+
+    def add_many(self, paths, values):
+        """
+        Apply many leaf updates at once, e.g. to roll up numeric metrics.
+
+        tree.add_many(paths, values) leaves the tree as setting
+        tree.insert(path, value) for every pair in order would, but updates are
+        grouped by path with NumPy and every leaf is written once. With the
+        'add', 'subtract' and 'multiply' leaf behaviors and numeric values (a
+        numeric array, or a sequence of only int and float values), the
+        updates of each leaf are reduced by a single vectorized scatter. Other
+        values are stored as given.
+
+        The reduction happens in the dtype of values: floating point results
+        may differ from sequential updates in the last bits and int64 sums
+        wrap around instead of growing like Python ints.
+
+        Args:
+            paths: A sequence of non-empty key sequences (tuples, lists, ...) or
+                   a 2-D NumPy array with one path per row
+            values: One leaf value per path (sequence or 1-D NumPy array)
+
+        Raises:
+            ValueError: If paths and values differ in length or a path is empty
+        """
+        from .frames import scatter_leaves
+        scatter_leaves(self, paths, values)
 
     def add_fiber(self, fiber):
         """
@@ -120,48 +1767,141 @@ class Yggdrasil(dict):
         Args:
             fiber: A list-like object or pandas Series representing a path in the tree.
                   The first element is the root node, and subsequent elements form the path.
+                  The fiber itself is never modified.
         """
-        # Convert pandas Series to list if necessary
-        if isinstance(fiber, pd.Series):
-            fiber = fiber.tolist()
+        self._insert_fiber(fiber)
+
+    def save(self, path):
+        """
+        Write the tree to a file in a compact binary format.
 
-        # Make a copy to avoid modifying the original
-        fiber_copy = fiber.copy() if hasattr(fiber, 'copy') else list(fiber)
+        Keys are interned, nodes are stored as flat offset arrays and leaf values
+        in typed columns. Values other than None, bool, int, float, str and bytes
+        are stored with pickle.
+
+        Args:
+            path (str or os.PathLike): The file to write
+        """
+        from .serialization import save_tree
+        save_tree(self, path)
+
+    @classmethod
+    def load(cls, path, mmap=False, allow_pickle=False):
+        """
+        Read a tree written by save.
+
+        Args:
+            path (str or os.PathLike): The file to read
+            mmap (bool): If True, memory-map the file and return a read-only
+                         MappedTree that only decodes the nodes that are accessed
+            allow_pickle (bool): Allow loading values that were stored with pickle.
+                                 Only enable this for trusted files.
 
-        sprout = fiber_copy.pop(0)
-        self[sprout] = fiber_copy
+        Returns:
+            Yggdrasil or MappedTree: The loaded tree
+        """
+        from .serialization import load_tree
+        return load_tree(path, cls=cls, mmap=mmap, allow_pickle=allow_pickle)
 
     @classmethod
-    def from_dataframe(cls, df, leaf_behavior='overwrite'):
+    def from_dataframe(cls, df, leaf_behavior='overwrite', workers=None):
         """
         Create a new Yggdrasil tree from a pandas DataFrame.
 
-        Each row in the DataFrame will be added as a fiber to the tree.
+        Each row in the DataFrame will be added as a fiber to the tree. Rows are
+        grouped by their path so that every node is created once and every leaf
+        receives its values in one batch; the result is identical to adding the
+        rows of df.values one by one with add_fiber. Cells are taken as stored,
+        so missing values in nullable extension dtypes (e.g. Int64) stay pd.NA
+        rather than becoming nan as they may through iterrows().
+
+        With more than one worker, rows are partitioned by their first column
+        and the subtrees are built in a process pool. All rows that share a
+        root key end up in the same shard in their original order, so the
+        result is the same as a serial build for every leaf behavior. A custom
+        leaf_behavior must be picklable (e.g. a module-level function).
 
         Args:
             df (pandas.DataFrame): The DataFrame to convert to a tree
             leaf_behavior (str or callable): How to handle duplicate leaf nodes
                                             (passed to Yggdrasil constructor)
+            workers (int, optional): Number of worker processes for a parallel build
 
         Returns:
             Yggdrasil: A new Yggdrasil tree containing the data from the DataFrame
         """
-        tree = cls(leaf_behavior=leaf_behavior)
+        from .frames import tree_from_dataframe
+        return tree_from_dataframe(cls, df, leaf_behavior=leaf_behavior, workers=workers)
+
+    def _claim(self, node):
+        """
+        Prepare a node that is assigned below this one for storing.
 
-        # Iterate through each row in the DataFrame
-        for _, row in df.iterrows():
-            # Add the row as a fiber to the tree
-            tree.add_fiber(row)
+        Like dict assignment, a detached node (the root of a new tree or a
+        removed subtree) is stored by reference and joins this tree, so later
+        writes through it show up here. A node has one parent, though, so a
+        node that is still attached somewhere, an ancestor of this node, or
+        the root of a tree with its own journal, indexes, snapshots or
+        freezing is copied instead (structure only, leaves are shared).
 
-        return tree
+        Args:
+            node (Yggdrasil): The node being assigned
+
+        Returns:
+            Yggdrasil: node itself or its copy
+        """
+        parent = node._parent
+        if parent is not None and dict.get(parent, node._key, _MISSING) is node:
+            return self._copy_structure(node)
+        ancestor = self
+        while ancestor is not node:
+            parent = ancestor._parent
+            if parent is None or dict.get(parent, ancestor._key, _MISSING) is not ancestor:
+                break
+            ancestor = parent
+        else:
+            return self._copy_structure(node)
+
+        config = node._config
+        if config is not self._config:
+            if (config.frozen or config.journal is not None or config.indexes is not None
+                    or config.snapshot is not None):
+                return self._copy_structure(node)
+            self._adopt(node)
+        return node
+
+    def _adopt(self, node):
+        """
+        Make a node and every node below it use this tree's config.
+
+        Callers adopt a subtree before attaching it, often while holding the
+        stripe lock of the target node, so the subtree is interned without
+        taking locks (stripe locks are not reentrant).
+
+        Args:
+            node (Yggdrasil): The root of a subtree that is about to be attached to this tree
+        """
+        config = self._config
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            current._config = config
+            stack.extend(value for value in dict.values(current) if isinstance(value, Yggdrasil))
+        if config.symbols is not None:
+            self._intern_subtree(node, locked=False)
 
     @classmethod
-    def from_sql(cls, query, connection, leaf_behavior='overwrite'):
+    def from_sql(cls, query, connection, leaf_behavior='overwrite', chunksize=None,
+                 stats=None, workers=None):
         """
         Create a new Yggdrasil tree from a SQL query.
 
-        Executes the query and converts the result to a DataFrame,
-        then creates a tree from the DataFrame.
+        By default the query result is read into a DataFrame, which is then
+        turned into a tree. With a chunksize, rows are instead fetched from the
+        cursor in chunks (cursor.fetchmany) and inserted straight into the tree,
+        so the full result set is never held in memory at once. Streamed rows
+        keep the values returned by the database driver (e.g. NULL stays None
+        instead of becoming NaN).
 
         Args:
             query (str): The SQL query to execute
@@ -169,55 +1909,462 @@ class Yggdrasil(dict):
                        psycopg2.connection, etc.) or a connection string
             leaf_behavior (str or callable): How to handle duplicate leaf nodes
                                             (passed to Yggdrasil constructor)
+            chunksize (int, optional): Number of rows to fetch and insert at a time
+            stats (dict, optional): If given, filled with load statistics:
+                                   'rows', 'chunks', 'seconds', 'rows_per_second'
+                                   and 'peak_rss' (peak resident set size of the
+                                   process in bytes, None if unavailable)
+            workers (int, optional): Number of worker processes for a parallel
+                                    build (see from_dataframe); cannot be combined
+                                    with chunksize
+
+        Returns:
+            Yggdrasil: A new Yggdrasil tree containing the data from the query result
+        """
+        from .frames import tree_from_sql
+        return tree_from_sql(cls, query, connection, leaf_behavior=leaf_behavior,
+                             chunksize=chunksize, stats=stats, workers=workers)
+
+    @classmethod
+    async def afrom_rows(cls, rows, leaf_behavior='overwrite', batch_size=1000):
+        """
+        Create a new Yggdrasil tree from rows produced asynchronously.
+
+        Rows are inserted in batches of batch_size and the coroutine yields to
+        the event loop after every batch, so other tasks are never stalled for
+        longer than one batch takes. Lower batch_size for shorter stalls, raise
+        it for more throughput.
+
+        Args:
+            rows: An async iterable (e.g. an async cursor or generator) or a
+                  regular iterable of fibers, as accepted by add_fiber
+            leaf_behavior (str or callable): How to handle duplicate leaf nodes
+                                            (passed to Yggdrasil constructor)
+            batch_size (int): Number of rows to insert between two yields to the event loop
+
+        Returns:
+            Yggdrasil: A new Yggdrasil tree containing the rows
+
+        Raises:
+            ValueError: If batch_size is not positive
+        """
+        from .aio import tree_from_rows
+        return await tree_from_rows(cls, rows, leaf_behavior=leaf_behavior,
+                                    batch_size=batch_size)
+
+    @classmethod
+    async def afrom_sql(cls, query, connection, leaf_behavior='overwrite', batch_size=1000,
+                        parameters=None):
+        """
+        Create a new Yggdrasil tree from a SQL query on an async database connection.
+
+        Rows are fetched with the cursor's fetchmany in chunks of batch_size
+        and each chunk is inserted before the next one is awaited (see
+        afrom_rows). Works with drivers following the DB-API with coroutine
+        methods, such as aiosqlite, aiomysql or psycopg's AsyncConnection.
+
+        Args:
+            query (str): The SQL query to execute
+            connection: An async database connection object
+            leaf_behavior (str or callable): How to handle duplicate leaf nodes
+                                            (passed to Yggdrasil constructor)
+            batch_size (int): Number of rows to fetch and insert at a time
+            parameters (sequence or dict, optional): Parameters for the query
 
         Returns:
             Yggdrasil: A new Yggdrasil tree containing the data from the query result
+
+        Raises:
+            ValueError: If batch_size is not positive
+        """
+        from .aio import tree_from_sql
+        return await tree_from_sql(cls, query, connection, leaf_behavior=leaf_behavior,
+                                   batch_size=batch_size, parameters=parameters)
+
+    def iter_fibers(self):
+        """
+        Generate every fiber of the tree, i.e. the path to each leaf followed by its value.
+
+        The tree is walked iteratively in insertion order, so this works at any
+        depth. Empty nodes have no leaf and yield nothing.
+
+        Yields:
+            tuple: (key_1, ..., key_n, value) for every leaf, the same form
+            that add_fiber accepts
+        """
+        path = []
+        stack = [iter(dict.items(self))]
+        while stack:
+            for key, value in stack[-1]:
+                if isinstance(value, Yggdrasil):
+                    path.append(key)
+                    stack.append(iter(dict.items(value)))
+                    break
+                yield (*path, key, value)
+            else:
+                stack.pop()
+                if stack:
+                    path.pop()
+
+    def _iter_leaf_runs(self):
+        """
+        Generate the leaves grouped into runs of siblings.
+
+        A run holds consecutive leaves of one node, so flattening code can
+        repeat the shared path once per run instead of once per leaf. Runs come
+        in the same order as iter_fibers.
+
+        Yields:
+            tuple: (path, keys, values) where path is a tuple of the keys above
+            the run and keys and values are lists of the same length
+        """
+        path = []
+        stack = [iter(dict.items(self))]
+        keys, values = [], []
+        while stack:
+            for key, value in stack[-1]:
+                if isinstance(value, Yggdrasil):
+                    if keys:
+                        yield tuple(path), keys, values
+                        keys, values = [], []
+                    path.append(key)
+                    stack.append(iter(dict.items(value)))
+                    break
+                keys.append(key)
+                values.append(value)
+            else:
+                if keys:
+                    yield tuple(path), keys, values
+                    keys, values = [], []
+                stack.pop()
+                if stack:
+                    path.pop()
+
+    def depth(self):
+        """
+        Return the number of keys on the longest path to a leaf.
+
+        Returns:
+            int: The maximum fiber length minus one, 0 for a tree without leaves
+        """
+        deepest = 0
+        stack = [(self, 1)]
+        while stack:
+            node, level = stack.pop()
+            for value in dict.values(node):
+                if isinstance(value, Yggdrasil):
+                    stack.append((value, level + 1))
+                elif level > deepest:
+                    deepest = level
+        return deepest
+
+    def to_dataframe(self, columns=None, fill_value=None):
+        """
+        Flatten the tree into a pandas DataFrame with one row per leaf.
+
+        The key columns are built in a single traversal, one run of sibling
+        leaves at a time. Leaves at different depths are padded with fill_value
+        in the key columns, so the leaf value is always the last column. Rows
+        come in the order of iter_fibers, i.e. grouped by path in order of
+        first appearance; for a DataFrame with distinct paths that is already
+        in this order, from_dataframe followed by to_dataframe returns it unchanged.
+
+        Args:
+            columns (list, optional): Column names, the key columns followed by
+                                      the value column. Defaults to level_0,
+                                      level_1, ... and value. More names than
+                                      the tree depth pad every row to that width.
+            fill_value: The key used to pad leaves that are not at the deepest level
+
+        Returns:
+            pandas.DataFrame: The fibers of the tree
+
+        Raises:
+            ValueError: If columns has fewer names than the tree needs
+        """
+        from .frames import tree_to_dataframe
+        return tree_to_dataframe(self, columns=columns, fill_value=fill_value)
+
+    def to_sql(self, table, connection, columns=None, fill_value=None, batch_size=10000,
+               create=True):
         """
-        # Handle different types of connections
+        Write the fibers of the tree into a database table.
+
+        Rows are padded like in to_dataframe and inserted with
+        cursor.executemany in batches of batch_size, so the whole table is
+        never held in memory at once.
+
+        Args:
+            table (str): The name of the table
+            connection: A database connection object (sqlite3.Connection,
+                       psycopg2.connection, etc.) or a SQLite connection string
+            columns (list, optional): Column names, see to_dataframe
+            fill_value: The key used to pad leaves that are not at the deepest level
+            batch_size (int): Number of rows per executemany call
+            create (bool): Create the table (with untyped columns) if it does
+                           not exist. Pass False for databases that need typed
+                           columns and create the table beforehand.
+
+        Returns:
+            int: The number of rows written
+
+        Raises:
+            ValueError: If batch_size is not positive or columns has fewer
+                        names than the tree needs
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be a positive integer")
+
+        columns = self._column_names(columns)
+        width = len(columns) - 1
+
         if isinstance(connection, str):
-            # Assume it's a SQLite connection string
+            import sqlite3
             conn = sqlite3.connect(connection)
-            df = pd.read_sql_query(query, conn)
-            conn.close()
         else:
-            # Assume it's an existing connection object
-            df = pd.read_sql_query(query, connection)
+            conn = connection
+
+        placeholder = _placeholder(conn)
+        table_name = _quote_identifier(table)
+        column_list = ", ".join(_quote_identifier(column) for column in columns)
+        insert = (f"INSERT INTO {table_name} ({column_list}) "
+                  f"VALUES ({', '.join([placeholder] * len(columns))})")
+
+        written = 0
+        try:
+            cursor = conn.cursor()
+            try:
+                if create:
+                    cursor.execute(f"CREATE TABLE IF NOT EXISTS {table_name} ({column_list})")
+                padding = (fill_value,) * width
+                rows = ((*fiber[:-1], *padding[len(fiber) - 1:], fiber[-1])
+                        for fiber in self.iter_fibers())
+                while True:
+                    batch = list(islice(rows, batch_size))
+                    if not batch:
+                        break
+                    cursor.executemany(insert, batch)
+                    written += len(batch)
+            finally:
+                cursor.close()
+            conn.commit()
+        finally:
+            if conn is not connection:
+                conn.close()
+
+        return written
+
+    def _column_names(self, columns):
+        """
+        Validate or create the column names for flattening the tree.
+
+        Args:
+            columns (list or None): Requested names, key columns followed by the value column
+
+        Returns:
+            list: The column names
+        """
+        depth = self.depth()
+        if columns is None:
+            return [f"level_{i}" for i in range(depth)] + ["value"]
+
+        columns = list(columns)
+        if len(columns) < depth + 1:
+            raise ValueError(f"The tree needs {depth + 1} columns ({depth} key "
+                             f"columns and a value column), got {len(columns)}")
+        return columns
+
+    def iter_lines(self, prefix="", max_depth=None, max_children=None, max_lines=None):
+        """
+        Generate the lines of the directory-tree view of print_tree.
+
+        The tree is walked iteratively, so the lines can be consumed one by one
+        at any depth without building the whole output first.
+
+        Args:
+            prefix (str): Prefix to use for every line (for indentation)
+            max_depth (int, optional): Number of key levels to show; deeper
+                                       subtrees are summarized as "… N more"
+            max_children (int, optional): Number of children to show per node;
+                                          the rest is summarized as "… N more"
+            max_lines (int, optional): Stop after this many lines, followed by a
+                                       final "… output truncated" line
+
+        Yields:
+            str: The lines of the tree view, without line endings
+        """
+        lines = self._iter_lines(prefix, max_depth, max_children)
+        if max_lines is None:
+            yield from lines
+            return
+
+        yield from islice(lines, max_lines)
+        if next(lines, None) is not None:
+            yield f"{prefix}… output truncated"
+
+    def _iter_lines(self, prefix, max_depth, max_children):
+        return _iter_tree_lines(self, prefix, max_depth, max_children, Yggdrasil, dict.items)
+
+    def render(self, stream, prefix="", max_depth=None, max_children=None, max_lines=None,
+               chunk_lines=1000):
+        """
+        Write the directory-tree view of the tree to a text stream.
 
-        # Create a tree from the DataFrame
-        return cls.from_dataframe(df, leaf_behavior=leaf_behavior)
+        Lines are written in chunks instead of one call per line.
 
-    def print_tree(self, prefix="", is_root=True):
+        Args:
+            stream: A text stream with a write method (file, sys.stdout, StringIO, ...)
+            prefix (str): Prefix to use for every line (for indentation)
+            max_depth (int, optional): See iter_lines
+            max_children (int, optional): See iter_lines
+            max_lines (int, optional): See iter_lines
+            chunk_lines (int): Number of lines per write call
+
+        Returns:
+            int: The number of lines written
+        """
+        lines = self.iter_lines(prefix=prefix, max_depth=max_depth,
+                                max_children=max_children, max_lines=max_lines)
+        written = 0
+        while True:
+            chunk = list(islice(lines, chunk_lines))
+            if not chunk:
+                return written
+            chunk.append('')
+            stream.write('\n'.join(chunk))
+            written += len(chunk) - 1
+
+    def print_tree(self, prefix="", is_root=True, max_depth=None, max_children=None,
+                   max_lines=None):
         """
         Print the tree structure like a directory tree with lines.
 
         Args:
             prefix (str): Prefix to use for the current line (for indentation)
             is_root (bool): Whether this is the root of the tree
+            max_depth (int, optional): Number of key levels to show (see iter_lines)
+            max_children (int, optional): Number of children to show per node
+            max_lines (int, optional): Maximum number of lines to print
         """
-        # Get all keys in the current level
-        keys = list(self.keys())
-
-        if is_root and not keys:
-            print("Empty tree")
+        if not is_root and not self:
             return
 
-        # Process each key in the current level
-        for i, key in enumerate(keys):
-            is_last = i == len(keys) - 1
-            connector = "└── " if is_last else "├── "
+        self.render(sys.stdout, prefix=prefix, max_depth=max_depth,
+                    max_children=max_children, max_lines=max_lines)
+
+
+def _iter_tree_lines(root, prefix, max_depth, max_children, node_type, items):
+    """
+    Generate the directory-tree view of a tree (see Yggdrasil.iter_lines).
+
+    Args:
+        root: The node to start from
+        prefix (str): Prefix to use for every line
+        max_depth (int, optional): Number of key levels to show
+        max_children (int, optional): Number of children to show per node
+        node_type (type): The class of the nodes; other values are leaves
+        items (callable): Returns the (key, value) pairs of a node
+    """
+    if not root:
+        yield "Empty tree"
+        return
+
+    def frame(node, prefix, depth):
+        # [prefix, children to show, number of them left, hidden children, depth]
+        shown = len(node) if max_children is None else min(len(node), max_children)
+        return [prefix, islice(items(node), shown), shown, len(node) - shown, depth]
+
+    stack = [frame(root, prefix, 1)]
+    while stack:
+        current = stack[-1]
+        prefix, children, remaining, hidden, depth = current
+        if not remaining:
+            stack.pop()
+            if hidden:
+                yield f"{prefix}└── … {hidden} more"
+            continue
+
+        key, value = next(children)
+        current[2] = remaining - 1
+        is_last = remaining == 1 and not hidden
+        connector = "└── " if is_last else "├── "
+
+        # Print the current key with the appropriate connector
+        yield f"{prefix}{connector}{key}"
+
+        # Determine the prefix for the next level
+        next_prefix = prefix + ("    " if is_last else "│   ")
+
+        # Descend into subtrees, print other values as a leaf node
+        if isinstance(value, node_type):
+            if max_depth is None or depth < max_depth:
+                if value:
+                    stack.append(frame(value, next_prefix, depth + 1))
+            elif value:
+                yield f"{next_prefix}└── … {len(value)} more"
+        elif value is not None:
+            yield f"{next_prefix}└── {value}"
+
+
+def _finalize_states(accumulator, states):
+    """
+    Replace the deferred states of an ended accumulating block by their final values.
+
+    Only the leaves recorded with the states are visited, so ending a block
+    costs O(leaves accumulated into), whatever the size of the tree.
+
+    Args:
+        accumulator (LeafAccumulator): The leaf behavior that stored the states
+        states (dict): The states of the block (see _AccumulatorMerge)
+    """
+    for state, node, key in states.values():
+        if node is None:
+            continue
+        with node._lock():
+            # The leaf may have been replaced or removed since
+            if dict.get(node, key, _MISSING) is not state:
+                continue
+            final = accumulator.finalize(state)
+            if final is not state:
+                node._replace(key, final, state)
+                if node._aggregates is not None:
+                    node._invalidate()
+
+
+@contextmanager
+def _gc_paused():
+    """
+    Pause the cyclic garbage collector while building many nodes at once.
+
+    Every new node is a container object, so bulk loads would otherwise trigger
+    repeated collections that rescan the whole (still growing) tree.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _quote_identifier(name):
+    """
+    Quote a table or column name for use in an SQL statement.
+    """
+    return '"' + str(name).replace('"', '""') + '"'
 
-            # Print the current key with the appropriate connector
-            print(f"{prefix}{connector}{key}")
 
-            # Get the value for this key
-            value = self[key]
+def _placeholder(connection):
+    """
+    Return the parameter placeholder of the DB-API driver behind a connection.
 
-            # Determine the prefix for the next level
-            next_prefix = prefix + ("    " if is_last else "│   ")
+    Args:
+        connection: A DB-API connection object
 
-            # If the value is another Yggdrasil instance, recursively print it
-            if isinstance(value, Yggdrasil):
-                value.print_tree(prefix=next_prefix, is_root=False)
-            # Otherwise, print the value as a leaf node
-            elif value is not None:
-                print(f"{next_prefix}└── {value}")
+    Returns:
+        str: '%s' for drivers with the format or pyformat paramstyle, otherwise '?'
+    """
+    module = sys.modules.get(type(connection).__module__.split('.')[0])
+    paramstyle = getattr(module, 'paramstyle', 'qmark')
+    return '%s' if paramstyle in ('format', 'pyformat') else '?'
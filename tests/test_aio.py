@@ -0,0 +1,145 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+from cswtools import Yggdrasil
+
+# Longest time the event loop may be blocked while a tree is built
+MAX_STALL = 0.05
+
+
+class FakeAsyncCursor:
+    """A sqlite3 cursor with coroutine methods, like aiosqlite's cursor"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.closed = False
+
+    async def execute(self, query, parameters=()):
+        self._cursor.execute(query, parameters)
+
+    async def fetchmany(self, size):
+        await asyncio.sleep(0)
+        return self._cursor.fetchmany(size)
+
+    async def close(self):
+        self.closed = True
+        self._cursor.close()
+
+
+class FakeAsyncConnection:
+    """A sqlite3 connection whose cursor() is a coroutine"""
+
+    def __init__(self, connection):
+        self._connection = connection
+        self.cursors = []
+
+    async def cursor(self):
+        cursor = FakeAsyncCursor(self._connection.cursor())
+        self.cursors.append(cursor)
+        return cursor
+
+
+def sample_connection(rows=4):
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE sales (region TEXT, store TEXT, amount INTEGER)")
+    conn.executemany("INSERT INTO sales VALUES (?, ?, ?)",
+                     [(f"region{i % 2}", f"store{i % 3}", i) for i in range(rows)])
+    conn.commit()
+    return conn
+
+
+async def generate_rows(count):
+    for i in range(count):
+        yield (f"region{i % 10}", f"store{i % 100}", i % 7, 1)
+
+
+async def max_stall_while(coroutine):
+    """Run coroutine next to a ticker task and return its result and the longest loop stall"""
+    stalls = []
+    done = False
+
+    async def ticker():
+        last = time.perf_counter()
+        while not done:
+            await asyncio.sleep(0)
+            now = time.perf_counter()
+            stalls.append(now - last)
+            last = now
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    try:
+        result = await coroutine
+    finally:
+        done = True
+        await task
+    return result, max(stalls)
+
+
+class TestAsyncFromRows:
+    """Tests for afrom_rows"""
+
+    def test_async_iterable(self):
+        """Test that rows from an async generator build the same tree as insert_many"""
+        tree = asyncio.run(Yggdrasil.afrom_rows(generate_rows(1000), leaf_behavior='add',
+                                                batch_size=64))
+        expected = Yggdrasil(leaf_behavior='add')
+        expected.insert_many([(f"region{i % 10}", f"store{i % 100}", i % 7, 1)
+                              for i in range(1000)])
+        assert tree == expected
+        assert tree.leaf_behavior == 'add'
+
+    def test_regular_iterable(self):
+        """Test that a plain iterable of rows is accepted as well"""
+        rows = [('a', 'b', 1), ('a', 'c', 2), ('lone',)]
+        tree = asyncio.run(Yggdrasil.afrom_rows(rows, batch_size=2))
+        assert tree == {'a': {'b': 1, 'c': 2}, 'lone': []}
+
+    def test_invalid_batch_size(self):
+        """Test that a non-positive batch_size is rejected"""
+        with pytest.raises(ValueError):
+            asyncio.run(Yggdrasil.afrom_rows([], batch_size=0))
+
+    def test_event_loop_latency(self):
+        """Test that building a large tree never stalls the event loop beyond the bound"""
+        tree, stall = asyncio.run(max_stall_while(
+            Yggdrasil.afrom_rows(generate_rows(100_000), leaf_behavior='add', batch_size=500)))
+        assert tree.aggregate('sum') == 100_000
+        assert stall < MAX_STALL
+
+
+class TestAsyncFromSQL:
+    """Tests for afrom_sql"""
+
+    def test_matches_from_sql(self):
+        """Test that the async build equals the blocking one"""
+        conn = sample_connection(rows=50)
+        aconn = FakeAsyncConnection(conn)
+        query = "SELECT * FROM sales"
+
+        tree = asyncio.run(Yggdrasil.afrom_sql(query, aconn, leaf_behavior='add', batch_size=8))
+
+        assert tree == Yggdrasil.from_sql(query, conn, leaf_behavior='add')
+        assert aconn.cursors[0].closed
+        conn.close()
+
+    def test_parameters(self):
+        """Test that query parameters are passed to the cursor"""
+        conn = sample_connection()
+        query = "SELECT store, amount FROM sales WHERE region = ?"
+        tree = asyncio.run(Yggdrasil.afrom_sql(query, FakeAsyncConnection(conn),
+                                               parameters=('region0',)))
+        assert tree == {'store0': 0, 'store2': 2}
+        conn.close()
+
+    def test_event_loop_latency(self):
+        """Test that a large query result is loaded without long loop stalls"""
+        conn = sample_connection(rows=50_000)
+        tree, stall = asyncio.run(max_stall_while(Yggdrasil.afrom_sql(
+            "SELECT * FROM sales", FakeAsyncConnection(conn), leaf_behavior='add',
+            batch_size=500)))
+        assert tree.aggregate('count') == 6
+        assert stall < MAX_STALL
+        conn.close()
@@ -0,0 +1,169 @@
+import io
+import sqlite3
+
+import pytest
+from cswtools import Yggdrasil
+from cswtools.disk import DiskTree
+
+
+FIBERS = [
+    ['fruit', 'apple', 'red', 1],
+    ['fruit', 'apple', 'green', 2],
+    ['fruit', 'pear', 3],
+    ['veg', 'leek', 4],
+    ['fruit', 'apple', 'red', 5],
+]
+
+
+def render(tree, **options):
+    output = io.StringIO()
+    tree.render(output, **options)
+    return output.getvalue()
+
+
+class TestDiskTree:
+    """Tests for the mapping behavior of DiskTree"""
+
+    def test_auto_creation_and_paths(self, tmp_path):
+        """Test that missing keys create nodes and lists are paths, as in Yggdrasil"""
+        with DiskTree(tmp_path / 'tree.db') as tree:
+            tree['a']['b']['c'] = 1
+            tree['x'] = ['y', 'z', 2]
+            tree['empty']
+
+            assert tree == {'a': {'b': {'c': 1}}, 'x': {'y': {'z': 2}}, 'empty': {}}
+            assert isinstance(tree['a'], DiskTree)
+            assert tree.get_path(('a', 'b', 'c')) == 1
+            assert tree.get_path(('a', 'missing')) is None
+            assert tree.get_path(('a', 'b', 'c', 'd')) is None
+            assert tree.contains_path(('x', 'y'))
+            assert not tree.contains_path(('a', 'nope'))
+            assert 'nope' not in tree['a']
+
+            with pytest.raises(TypeError):
+                tree.insert(('a', 'b', 'c', 'd'), 1)
+
+    def test_leaf_behavior(self, tmp_path):
+        """Test that duplicate leaves are merged with the leaf behavior"""
+        with DiskTree(tmp_path / 'tree.db', leaf_behavior='add') as tree:
+            tree.insert_many(FIBERS)
+            assert tree['fruit']['apple']['red'] == 6
+
+            tree.leaf_behavior = 'append'
+            tree['veg']['name'] = 'lee'
+            tree['veg']['name'] = 'k'
+            assert tree['veg']['name'] == 'leek'
+
+    def test_matches_yggdrasil(self, tmp_path):
+        """Test that add_fiber and print_tree give the same result as Yggdrasil"""
+        expected = Yggdrasil(leaf_behavior='add')
+        expected.insert_many(FIBERS)
+        expected.add_fiber(['sprout'])
+
+        with DiskTree(tmp_path / 'tree.db', leaf_behavior='add') as tree:
+            for fiber in FIBERS:
+                tree.add_fiber(fiber)
+            tree.add_fiber(['sprout'])
+
+            assert tree == expected
+            assert tree.to_tree() == expected
+            assert render(tree) == render(expected)
+            assert render(tree, max_depth=1, max_children=1) == render(
+                expected, max_depth=1, max_children=1)
+
+    def test_replace_and_delete(self, tmp_path):
+        """Test that replacing and deleting subtrees removes their nodes"""
+        path = tmp_path / 'tree.db'
+        with DiskTree(path) as tree:
+            tree.insert_many(FIBERS)
+            other = Yggdrasil()
+            other['a']['b'] = 1
+            tree['fruit'] = other
+            tree['veg'] = 'none'
+            del tree['fruit']['a']
+
+            assert tree == {'fruit': {}, 'veg': 'none'}
+
+        with sqlite3.connect(path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM nodes").fetchone()[0] == 2
+
+
+    def test_lookups_do_not_create_nodes(self, tmp_path):
+        """Test that get, pop and setdefault leave missing keys alone"""
+        path = tmp_path / 'tree.db'
+        with DiskTree(path) as tree:
+            tree.insert_many(FIBERS)
+            assert tree.get('missing') is None
+            assert tree.get('missing', 0) == 0
+            assert tree.get('veg') == {'leek': 4}
+            assert tree.pop('nope', 'dflt') == 'dflt'
+            with pytest.raises(KeyError):
+                tree.pop('nope')
+            assert 'missing' not in tree and 'nope' not in tree
+
+            assert tree.setdefault('count', 0) == 0
+            assert tree.setdefault('count', 5) == 0
+            assert tree.setdefault('path', ['a', 1]) == ['a', 1]
+            assert isinstance(tree.setdefault('veg'), DiskTree)
+
+            assert tree['veg'].pop('leek') == 4
+            fruit = tree.pop('fruit')
+            assert isinstance(fruit, Yggdrasil)
+            assert fruit == {'apple': {'red': 5, 'green': 2}, 'pear': 3}
+            assert tree == {'veg': {}, 'count': 0, 'path': ['a', 1]}
+
+        with sqlite3.connect(path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM nodes").fetchone()[0] == 2
+
+
+class TestDiskStorage:
+    """Tests for the cache and write-back of DiskTree"""
+
+    def test_eviction(self, tmp_path):
+        """Test that a tree larger than the cache reads and writes correctly"""
+        expected = Yggdrasil(leaf_behavior='add')
+        with DiskTree(tmp_path / 'tree.db', leaf_behavior='add',
+                      cache_nodes=3, batch_size=2) as tree:
+            for i in range(200):
+                fiber = [f"a{i % 7}", f"b{i % 11}", f"c{i % 5}", i]
+                tree.add_fiber(fiber)
+                expected.add_fiber(fiber)
+
+            assert len(tree._store.cache) <= 3
+            assert tree == expected
+            assert render(tree) == render(expected)
+
+    def test_reopen(self, tmp_path):
+        """Test that a closed tree keeps its nodes and leaf behavior"""
+        path = tmp_path / 'tree.db'
+        with DiskTree(path, leaf_behavior='add', cache_nodes=2) as tree:
+            tree.insert_many(FIBERS)
+
+        with DiskTree(path) as tree:
+            assert tree.leaf_behavior == 'add'
+            tree['veg']['leek'] = 1
+            assert tree['veg']['leek'] == 5
+            assert tree['fruit']['apple'] == {'red': 6, 'green': 2}
+
+    def test_from_sql(self, tmp_path):
+        """Test that from_sql streams query rows into the tree"""
+        conn = sqlite3.connect(':memory:')
+        conn.execute("CREATE TABLE sales (kind, name, amount)")
+        conn.executemany("INSERT INTO sales VALUES (?, ?, ?)",
+                         [(f"k{i % 3}", f"n{i % 10}", 1) for i in range(100)])
+
+        tree = DiskTree.from_sql("SELECT * FROM sales", conn, tmp_path / 'tree.db',
+                                 leaf_behavior='add', chunksize=7, cache_nodes=2)
+        try:
+            expected = Yggdrasil.from_sql("SELECT * FROM sales", conn, leaf_behavior='add')
+            assert tree == expected
+        finally:
+            tree.close()
+            conn.close()
+
+    def test_invalid_options(self, tmp_path):
+        """Test that invalid settings raise errors"""
+        with pytest.raises(ValueError):
+            DiskTree(tmp_path / 'a.db', cache_nodes=0)
+        with pytest.raises(ValueError):
+            DiskTree(tmp_path / 'b.db', leaf_behavior='nope')
@@ -0,0 +1,186 @@
+import pickle
+
+import pytest
+from cswtools import Yggdrasil
+from cswtools.journal import Checkpoint
+
+
+def journaled_tree(leaf_behavior='add'):
+    tree = Yggdrasil(leaf_behavior=leaf_behavior)
+    tree.insert(('config', 'db', 'host'), 'localhost')
+    tree.insert(('stats', 'requests'), 10)
+    tree.start_journal()
+    return tree
+
+
+class TestJournal:
+    """Tests for recording changes"""
+
+    def test_records_writes(self):
+        """Test that every kind of write becomes one versioned entry"""
+        tree = journaled_tree()
+        assert tree.version == 0
+
+        tree['stats']['requests'] = 5
+        tree['config']['cache']['ttl'] = 60
+        del tree['config']['db']
+        tree['stats'].clear()
+
+        assert tree.changes() == [
+            (('stats', 'requests'), 'set', 15, 1),
+            (('config', 'cache'), 'node', None, 2),
+            (('config', 'cache', 'ttl'), 'set', 60, 3),
+            (('config', 'db'), 'delete', None, 4),
+            (('stats',), 'clear', None, 5),
+        ]
+        assert tree.version == 5
+        assert [entry[3] for entry in tree.changes(since=3)] == [4, 5]
+
+    def test_subtrees_are_copied(self):
+        """Test that an assigned subtree is recorded as it was at the time"""
+        tree = journaled_tree()
+        subtree = Yggdrasil()
+        subtree['a'] = 1
+        tree['imported'] = subtree
+        # The subtree joined the tree, so later writes are entries of their own
+        subtree['b'] = 2
+
+        assert tree.changes() == [
+            (('imported',), 'set', {'a': 1}, 1),
+            (('imported', 'b'), 'set', 2, 2),
+        ]
+
+    def test_detached_nodes_are_not_recorded(self):
+        """Test that writes to a removed subtree do not reach the journal"""
+        tree = journaled_tree()
+        removed = tree.pop('config')
+        removed['db']['port'] = 5432
+        assert [entry[1] for entry in tree.changes()] == ['delete']
+
+    def test_copied_and_assigned_nodes_are_recorded(self):
+        """Test that writes after copying or assigning nodes reach the journal"""
+        import copy
+
+        source = journaled_tree()
+        replica = Yggdrasil.from_checkpoint(source.compact_journal())
+        copy.copy(source)
+        other = Yggdrasil()
+        other['alias'] = source['config']
+
+        source['config']['db']['host'] = 'db1'
+        source['config']['db']['port'] = 5432
+        replica.apply_delta(source.changes(replica.version))
+        assert replica == source
+
+    def test_unplaced_writes_need_resync(self):
+        """Test that a write that cannot be traced to the root stops replay instead of being lost"""
+        source = journaled_tree()
+        replica = Yggdrasil.from_checkpoint(source.compact_journal())
+        source['stats']['requests'] = 1
+        # A node of the tree whose parent links do not lead to the root
+        stray = source._new_node()
+        stray['x'] = 1
+        source['stats']['errors'] = 1
+
+        assert source.changes()[1][:2] == ((), 'resync')
+        with pytest.raises(ValueError, match='checkpoint'):
+            replica.apply_delta(source.changes(replica.version))
+        # Only the entries before the resync marker were applied
+        assert replica.version == 1
+
+        replica = Yggdrasil.from_checkpoint(source.compact_journal())
+        assert replica == source
+
+    def test_requires_journal(self):
+        """Test that journal methods explain how to enable the journal"""
+        tree = Yggdrasil()
+        assert tree.version is None
+        with pytest.raises(ValueError, match='start_journal'):
+            tree.changes()
+        tree.start_journal()
+        tree['a'] = 1
+        tree.stop_journal()
+        assert tree.version is None
+
+
+class TestDeltaSync:
+    """Tests for replicas kept in sync with apply_delta"""
+
+    def test_replica_follows_source(self):
+        """Test that replaying the entries reproduces the source without re-merging leaves"""
+        source = journaled_tree()
+        replica = Yggdrasil.from_checkpoint(source.compact_journal())
+        assert replica == source and replica.version == 0
+
+        source['stats']['requests'] = 5
+        source.add_many([('stats', 'errors'), ('stats', 'errors')], [1, 2])
+        source.merge({'config': {'db': {'port': 5432}}})
+        source['config'].pop('db')
+
+        # Entries cross process boundaries as pickles
+        replica.apply_delta(pickle.loads(pickle.dumps(source.changes(replica.version))))
+        assert replica == source
+        assert replica.version == source.version
+        assert replica['stats']['requests'] == 15
+
+    def test_redelivery_and_gaps(self):
+        """Test that applied entries are skipped and missing ones are detected"""
+        source = journaled_tree()
+        replica = Yggdrasil.from_checkpoint(source.compact_journal())
+        source['stats']['requests'] = 1
+        source['stats']['requests'] = 1
+        source['stats']['errors'] = 1
+        entries = source.changes()
+
+        replica.apply_delta(entries[:2])
+        replica.apply_delta(entries)
+        assert replica == source
+
+        source['stats']['errors'] = 1
+        source['stats']['errors'] = 1
+        with pytest.raises(ValueError, match='Missing changes'):
+            replica.apply_delta(source.changes()[-1:])
+
+    def test_replica_indexes_and_aggregates(self):
+        """Test that replayed writes keep the replica's indexes and aggregates current"""
+        source = journaled_tree()
+        replica = Yggdrasil.from_checkpoint(source.compact_journal())
+        replica.create_index('value')
+        assert replica.aggregate('count') == 2
+
+        source['stats']['errors'] = 3
+        replica.apply_delta(source.changes(replica.version))
+        assert replica.aggregate('count') == 3
+        assert replica.find_value(3) == [('stats', 'errors')]
+
+
+class TestCompaction:
+    """Tests for checkpoints and journal compaction"""
+
+    def test_compaction_drops_entries(self):
+        """Test that compacted versions are only available through the checkpoint"""
+        tree = journaled_tree()
+        tree['stats']['requests'] = 1
+        checkpoint = tree.compact_journal()
+
+        assert isinstance(checkpoint, Checkpoint)
+        assert checkpoint.version == tree.version == 1
+        assert tree.changes(since=1) == []
+        with pytest.raises(ValueError, match='checkpoint'):
+            tree.changes(since=0)
+        # Nothing changed, the same checkpoint is reused
+        assert tree.compact_journal() is checkpoint
+
+    def test_new_replica_from_checkpoint_and_log(self):
+        """Test that a checkpoint plus the later entries reproduce the tree"""
+        tree = journaled_tree()
+        tree['stats']['requests'] = 1
+        checkpoint = tree.compact_journal()
+        tree['config']['db']['port'] = 5432
+        del tree['stats']
+
+        replica = Yggdrasil.from_checkpoint(checkpoint)
+        replica.apply_delta(tree.changes(checkpoint.version))
+        assert replica == tree
+        assert replica.leaf_behavior == 'add'
+        assert replica.version == tree.version == 3
@@ -0,0 +1,124 @@
+import sys
+
+import pytest
+from cswtools import Yggdrasil
+from cswtools.query import PathPattern, compile_pattern
+
+
+def sample_tree():
+    tree = Yggdrasil()
+    tree.insert(('eu', '2026-01', 'latency'), 12)
+    tree.insert(('eu', '2026-02', 'latency'), 15)
+    tree.insert(('eu', '2025-12', 'latency'), 11)
+    tree.insert(('us', '2026-01', 'latency'), 30)
+    tree.insert(('us', '2026-01', 'errors'), 4)
+    tree.insert(('us', 'hosts', 'web1', 'errors'), 1)
+    tree.insert(('errors',), 7)
+    tree.insert((2026, 3), 'int keys')
+    return tree
+
+
+def paths(matches):
+    return [path for path, _ in matches]
+
+
+class TestSelect:
+    """Tests for tree.select"""
+
+    def test_exact_path(self):
+        """Test a pattern of exact keys"""
+        assert list(sample_tree().select('eu/2026-01/latency')) == [
+            (('eu', '2026-01', 'latency'), 12)]
+        assert list(sample_tree().select('eu/2030-01/latency')) == []
+
+    def test_star_and_glob(self):
+        """Test single-level wildcards and globs"""
+        tree = sample_tree()
+        assert list(tree.select('*/2026-*/latency')) == [
+            (('eu', '2026-01', 'latency'), 12),
+            (('eu', '2026-02', 'latency'), 15),
+            (('us', '2026-01', 'latency'), 30),
+        ]
+        assert paths(tree.select('e?/202[5]-*/latency')) == [('eu', '2025-12', 'latency')]
+
+    def test_double_star(self):
+        """Test that ** matches any number of levels, including none"""
+        tree = sample_tree()
+        assert paths(tree.select('**/errors')) == [
+            ('us', '2026-01', 'errors'),
+            ('us', 'hosts', 'web1', 'errors'),
+            ('errors',),
+        ]
+        assert paths(tree.select('us/**/web1')) == [('us', 'hosts', 'web1')]
+        assert paths(tree.select('**/**/errors')) == paths(tree.select('**/errors'))
+
+    def test_nodes_and_leaves(self):
+        """Test that matches can be nodes as well as leaf values"""
+        matches = dict(sample_tree().select('us/*'))
+        assert isinstance(matches[('us', '2026-01')], Yggdrasil)
+        assert matches[('us', 'hosts')]['web1']['errors'] == 1
+
+    def test_sets_predicates_and_non_string_keys(self):
+        """Test key sets, predicates and non-string keys in sequence patterns"""
+        tree = sample_tree()
+        assert paths(tree.select(['eu', {'2025-12', '2026-02'}, 'latency'])) == [
+            ('eu', '2026-02', 'latency'), ('eu', '2025-12', 'latency')]
+        big = list(tree.select(['*', '*', lambda key: key == 'latency']))
+        assert [value for _, value in big] == [12, 15, 11, 30]
+        assert list(tree.select([2026, 3])) == [((2026, 3), 'int keys')]
+        # Globs only apply to string keys
+        assert list(tree.select('20*')) == []
+
+    def test_pattern_below_leaf(self):
+        """Test that a pattern continuing below a leaf does not match"""
+        assert list(sample_tree().select('errors/*')) == []
+        assert list(sample_tree().select('eu/2026-01/latency/*')) == []
+
+    def test_relative_to_node(self):
+        """Test that paths are relative to the node select is called on"""
+        tree = sample_tree()
+        assert paths(tree['us'].select('**/errors')) == [
+            ('2026-01', 'errors'), ('hosts', 'web1', 'errors')]
+
+    def test_never_creates_nodes(self):
+        """Test that selecting does not add nodes, even on a frozen tree"""
+        tree = sample_tree()
+        tree.freeze()
+        list(tree.select('missing/*/deeper'))
+        list(tree.select('**/missing'))
+        list(tree.select(['eu', 'nope', 'latency']))
+        assert tree == sample_tree()
+
+    def test_lazy_and_pruned(self):
+        """Test that matches are generated lazily and dead branches are skipped"""
+        tree = sample_tree()
+        seen = []
+
+        def record(key):
+            seen.append(key)
+            return True
+
+        matches = tree.select(['us', record, 'errors'])
+        assert next(matches) == (('us', '2026-01', 'errors'), 4)
+        # Only the children of 'us' reached so far have been tested
+        assert seen == ['2026-01']
+        list(matches)
+        assert seen == ['2026-01', 'hosts']
+
+    def test_deep_tree(self):
+        """Test that ** works beyond the recursion limit"""
+        tree = Yggdrasil()
+        path = tuple(range(sys.getrecursionlimit() + 100))
+        tree.insert(path + ('target',), 1)
+        assert list(tree.select('**/target')) == [(path + ('target',), 1)]
+
+    def test_compiled_patterns(self):
+        """Test that compiled patterns are reused and invalid patterns rejected"""
+        pattern = compile_pattern(['*', 'latency'])
+        assert isinstance(pattern, PathPattern)
+        assert compile_pattern(pattern) is pattern
+        assert compile_pattern('a/*') is compile_pattern('a/*')
+        assert paths(sample_tree()['eu'].select(pattern)) == [
+            ('2026-01', 'latency'), ('2026-02', 'latency'), ('2025-12', 'latency')]
+        with pytest.raises(TypeError):
+            list(sample_tree().select(42))
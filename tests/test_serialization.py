@@ -0,0 +1,127 @@
+import pickle
+
+import pytest
+from cswtools import Yggdrasil, MappedTree
+
+
+def sample_tree():
+    tree = Yggdrasil(leaf_behavior='add')
+    tree.add_fiber(['config', 'database', 'username', 'admin'])
+    tree.add_fiber(['config', 'database', 'port', 5432])
+    tree.add_fiber(['config', 'server', 'ratio', 0.25])
+    tree.add_fiber(['flags', 'debug', False])
+    tree.add_fiber(['flags', 'token', b'\x00\x01'])
+    tree.add_fiber(['flags', 'missing', None])
+    tree.add_fiber([1, 'int key', 1])
+    tree.add_fiber([1.0 + 0.5, 'float key', -7])
+    tree['empty']
+    return tree
+
+
+class TestSaveLoad:
+    """Tests for saving and loading trees"""
+
+    def test_roundtrip(self, tmp_path):
+        """Test that a saved tree loads back unchanged"""
+        path = tmp_path / 'tree.ygg'
+        tree = sample_tree()
+        tree.save(path)
+
+        loaded = Yggdrasil.load(path)
+
+        assert loaded == tree
+        assert loaded.leaf_behavior == 'add'
+        assert isinstance(loaded['config']['database'], Yggdrasil)
+        assert loaded['config']['database']._config is loaded._config
+        assert list(loaded) == list(tree)
+        assert type(loaded['flags']['debug']) is bool
+
+    def test_key_types_stay_apart(self, tmp_path):
+        """Test that interned keys keep their type"""
+        path = tmp_path / 'tree.ygg'
+        tree = Yggdrasil()
+        tree['a'][1] = 'int'
+        tree['b'][1.0] = 'float'
+        tree['c'][True] = 'bool'
+        tree.save(path)
+
+        loaded = Yggdrasil.load(path)
+
+        assert [type(key) for node in ('a', 'b', 'c') for key in loaded[node]] == [int, float, bool]
+
+    def test_empty_tree(self, tmp_path):
+        """Test saving and loading an empty tree"""
+        path = tmp_path / 'tree.ygg'
+        Yggdrasil().save(path)
+
+        assert Yggdrasil.load(path) == {}
+
+    def test_pickled_values(self, tmp_path):
+        """Test that pickled values require allow_pickle"""
+        path = tmp_path / 'tree.ygg'
+        tree = Yggdrasil()
+        tree['big'] = 2 ** 80
+        tree[('tuple', 'key')] = {'plain': 'dict'}
+        tree.save(path)
+
+        with pytest.raises(ValueError):
+            Yggdrasil.load(path)
+
+        loaded = Yggdrasil.load(path, allow_pickle=True)
+        assert loaded == tree
+
+    def test_invalid_file(self, tmp_path):
+        """Test that other files are rejected"""
+        path = tmp_path / 'tree.ygg'
+        path.write_bytes(pickle.dumps(sample_tree()))
+
+        with pytest.raises(ValueError):
+            Yggdrasil.load(path)
+
+
+class TestMappedTree:
+    """Tests for memory-mapped loading"""
+
+    def test_lookups(self, tmp_path):
+        """Test read access through the memory-mapped view"""
+        path = tmp_path / 'tree.ygg'
+        tree = sample_tree()
+        tree.save(path)
+
+        mapped = Yggdrasil.load(path, mmap=True)
+
+        assert isinstance(mapped, MappedTree)
+        assert mapped.leaf_behavior == 'add'
+        assert mapped['config']['database']['port'] == 5432
+        assert mapped.get_path(('config', 'server', 'ratio')) == 0.25
+        assert mapped.get_path(('config', 'nothing')) is None
+        assert mapped.contains_path(('flags', 'missing'))
+        assert 'nothing' not in mapped['config']
+        with pytest.raises(KeyError):
+            mapped['nothing']
+        assert len(mapped['flags']) == 3
+        assert mapped == tree
+
+    def test_lazy_decoding(self, tmp_path):
+        """Test that only accessed nodes are decoded"""
+        path = tmp_path / 'tree.ygg'
+        sample_tree().save(path)
+
+        mapped = Yggdrasil.load(path, mmap=True)
+        mapped.get_path(('config', 'database', 'port'))
+
+        # Root, config and database - but not server, flags, ...
+        assert len(mapped._reader._children) == 3
+
+    def test_to_tree(self, tmp_path):
+        """Test materializing a subtree"""
+        path = tmp_path / 'tree.ygg'
+        tree = sample_tree()
+        tree.save(path)
+
+        mapped = Yggdrasil.load(path, mmap=True)
+        subtree = mapped['config'].to_tree()
+
+        assert isinstance(subtree, Yggdrasil)
+        assert subtree == tree['config']
+        assert subtree.leaf_behavior == 'add'
@@ -0,0 +1,127 @@
+import gc
+import threading
+
+import pytest
+from cswtools import Yggdrasil
+from cswtools.snapshot import TreeSnapshot
+
+
+def sample_tree():
+    tree = Yggdrasil(leaf_behavior='add')
+    tree.insert(('config', 'db', 'host'), 'localhost')
+    tree.insert(('config', 'db', 'port'), 5432)
+    tree.insert(('stats', 'requests'), 10)
+    return tree
+
+
+EXPECTED = {'config': {'db': {'host': 'localhost', 'port': 5432}}, 'stats': {'requests': 10}}
+
+
+class TestSnapshot:
+    """Tests for copy-on-write snapshots"""
+
+    def test_read_only_view(self):
+        """Test that a snapshot reads like the tree and cannot create nodes"""
+        tree = sample_tree()
+        snapshot = tree.snapshot()
+
+        assert isinstance(snapshot, TreeSnapshot)
+        assert snapshot == EXPECTED
+        assert isinstance(snapshot['config']['db'], TreeSnapshot)
+        assert snapshot.get_path(('config', 'db', 'port')) == 5432
+        assert snapshot.get_path(('config', 'db', 'port', 'x')) is None
+        assert snapshot.contains_path(('stats', 'requests'))
+        assert snapshot.leaf_behavior == 'add'
+        with pytest.raises(KeyError):
+            snapshot['missing']
+        assert 'missing' not in tree
+
+    def test_never_sees_later_writes(self):
+        """Test that every kind of write after the snapshot stays invisible"""
+        tree = sample_tree()
+        snapshot = tree.snapshot()
+
+        tree['stats']['requests'] = 5
+        tree['stats']['errors'] = 1
+        tree.insert(('config', 'cache', 'ttl'), 60)
+        tree['config']['db'].pop('host')
+        del tree['config']['db']['port']
+        tree['config']['db']['user'] = 'admin'
+        tree['new']['node']
+        other = Yggdrasil()
+        other['stats']['requests'] = 1
+        tree.merge(other)
+        tree.add_many([('stats', 'requests')], [1])
+        tree.prune_empty()
+        tree['stats'].clear()
+        tree.popitem()
+
+        assert snapshot == EXPECTED
+        assert snapshot.to_tree() == EXPECTED
+        assert tree != EXPECTED
+
+    def test_many_snapshots(self):
+        """Test that each snapshot keeps the state of its own moment"""
+        tree = sample_tree()
+        first = tree.snapshot()
+        tree['stats']['requests'] = 1
+        second = tree.snapshot()
+        third = tree.snapshot()
+        tree['stats']['requests'] = 1
+        tree['config']['db']['port'] = 1
+
+        assert first['stats']['requests'] == 10
+        assert second['stats']['requests'] == third['stats']['requests'] == 11
+        assert first['config']['db']['port'] == second['config']['db']['port'] == 5432
+        assert tree['stats']['requests'] == 12
+
+    def test_subtree_snapshot(self):
+        """Test that a snapshot of a subtree covers only that subtree"""
+        tree = sample_tree()
+        snapshot = tree['config'].snapshot()
+        tree['config']['db']['host'] = 'db.internal'
+        assert snapshot == {'db': {'host': 'localhost', 'port': 5432}}
+
+    def test_writes_copy_each_node_once(self):
+        """Test that only the first write to a node after a snapshot copies it"""
+        tree = sample_tree()
+        snapshot = tree.snapshot()
+        for _ in range(3):
+            tree['stats']['requests'] = 1
+        tree.insert(('config', 'db', 'port'), 1)
+
+        preserved = snapshot._state.preserved
+        assert {id(tree['stats']), id(tree['config']['db'])} == set(preserved)
+
+    def test_dropped_snapshots_stop_copying(self):
+        """Test that writes stop keeping copies once no snapshot is alive"""
+        tree = sample_tree()
+        snapshot = tree.snapshot()
+        del snapshot
+        gc.collect()
+        tree['stats']['requests'] = 1
+        assert tree._config.snapshot is None
+
+    def test_consistent_reads_during_writes(self):
+        """Test that readers on other threads see one consistent state"""
+        tree = Yggdrasil(leaf_behavior='add', thread_safe=True)
+        for i in range(50):
+            tree.insert(('counters', i), 0)
+        snapshot = tree.snapshot()
+        stop = threading.Event()
+
+        def write():
+            while not stop.is_set():
+                for i in range(50):
+                    tree.insert(('counters', i), 1)
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        try:
+            for _ in range(200):
+                assert sum(snapshot['counters'].values()) == 0
+                assert len(snapshot['counters']) == 50
+        finally:
+            stop.set()
+            writer.join()
+        assert sum(tree['counters'].values()) > 0
@@ -2,9 +2,16 @@ import pytest
 import pandas as pd
 import sqlite3
 import io
+import pickle
+import subprocess
 import sys
+import threading
+import time
+from pathlib import Path
 from contextlib import redirect_stdout
-from cswtools import Yggdrasil
+from cswtools import LeafAccumulator, Yggdrasil
+
+REPO_ROOT = Path(__file__).parent.parent
 
 class TestYggdrasilBasic:
     """Tests for basic Yggdrasil functionality"""
@@ -76,6 +83,302 @@ class TestYggdrasilBasic:
         assert 'key1' not in tree
         assert len(tree) == 1
 
+class TestNodeLayout:
+    """Tests for the compact node representation"""
+
+    def test_nodes_share_config(self):
+        """Test that child nodes reference the tree config instead of their own attributes"""
+        tree = Yggdrasil(leaf_behavior='add')
+        child = tree['a']['b']
+
+        assert isinstance(child, Yggdrasil)
+        assert not hasattr(child, '__dict__')
+        assert child.leaf_behavior == 'add'
+
+        # Changing the behavior anywhere applies to the whole tree
+        child.leaf_behavior = 'multiply'
+        assert tree.leaf_behavior == 'multiply'
+
+    def test_pickle_roundtrip(self):
+        """Test that trees survive pickling with their leaf behavior"""
+        import pickle
+
+        tree = Yggdrasil(leaf_behavior='add')
+        tree.add_fiber(['a', 'b', 'c', 1])
+
+        restored = pickle.loads(pickle.dumps(tree))
+
+        assert restored == tree
+        assert isinstance(restored['a']['b'], Yggdrasil)
+        restored['a']['b']['c'] = 2
+        assert restored['a']['b']['c'] == 3
+
+    def test_deepcopy(self):
+        """Test that deep copies are independent trees"""
+        import copy
+
+        tree = Yggdrasil(leaf_behavior='add')
+        tree['a']['b'] = 1
+
+        clone = copy.deepcopy(tree)
+        clone['a']['b'] = 5
+
+        assert clone['a']['b'] == 6
+        assert tree['a']['b'] == 1
+        assert clone._config is not tree._config
+
+    def test_shallow_copy_keeps_links(self):
+        """Test that copy.copy leaves the nodes of the original tree linked to it"""
+        import copy
+
+        tree = Yggdrasil(leaf_behavior='add')
+        tree['a']['b'] = 1
+        assert tree.aggregate() == 1
+
+        clone = copy.copy(tree)
+        tree['a']['b'] = 10
+        clone['a']['c'] = 2
+
+        assert tree.aggregate() == 11
+        assert tree['a'].path() == ('a',)
+        assert clone == {'a': {'b': 1, 'c': 2}}
+        assert clone['a'] is not tree['a']
+
+    def test_shallow_copy_has_own_config(self):
+        """Test that settings changed on a shallow copy do not apply to the original"""
+        import copy
+
+        tree = Yggdrasil(leaf_behavior='add', thread_safe=True)
+        tree['a']['b'] = 1
+        tree.start_counters()
+
+        clone = copy.copy(tree)
+        assert clone._config is not tree._config
+        assert clone['a']._config is clone._config
+        assert clone.leaf_behavior == 'add' and clone.thread_safe
+        assert clone.counters is None
+
+        clone.freeze()
+        clone['a'].leaf_behavior = 'overwrite'
+        tree['a']['b'] = 2
+        assert not tree.frozen
+        assert tree['a']['b'] == 3
+
+    def test_assigned_nodes_are_copied(self):
+        """Test that assigning an attached node stores a copy and leaves the source in place"""
+        first = Yggdrasil(leaf_behavior='add')
+        first['a']['b'] = 1
+        assert first.aggregate() == 1
+
+        second = Yggdrasil()
+        second['x'] = first['a']
+        second.update(y=first['a'])
+        second.setdefault('z', first['a'])
+        first['a']['b'] = 10
+
+        assert first.aggregate() == 11
+        assert first['a'].path() == ('a',)
+        assert second == {'x': {'b': 1}, 'y': {'b': 1}, 'z': {'b': 1}}
+        assert second['x'].path() == ('x',)
+        assert second['x']._config is second._config
+
+        # Within one tree, too: the source stays where it was
+        first['copy'] = first['a']
+        first['copy']['b'] = 5
+        assert first['a']['b'] == 11
+        assert first['copy'].path() == ('copy',)
+
+    def test_subclass_init_runs_for_child_nodes(self):
+        """Test that attributes set by a subclass __init__ exist on every node"""
+        import copy
+
+        class Tagged(Yggdrasil):
+            def __init__(self, leaf_behavior='overwrite', tag='default', **options):
+                super().__init__(leaf_behavior=leaf_behavior, **options)
+                self.tag = tag
+
+        tree = Tagged(leaf_behavior='add', tag='root')
+        tree['a']['b'] = 1
+        tree['a']['b'] = 2
+        assert tree.tag == 'root'
+        assert isinstance(tree['a'], Tagged) and tree['a'].tag == 'default'
+        assert tree['a']._config is tree._config
+        assert tree == {'a': {'b': 3}}
+
+        clone = copy.copy(tree)
+        assert clone.tag == 'root' and clone['a'].tag == 'default'
+        clone = copy.deepcopy(tree)
+        assert clone.tag == 'root' and clone['a'].tag == 'default'
+        assert clone['a']._parent is clone
+
+    def test_detached_nodes_are_stored_by_reference(self):
+        """Test that a new or removed node is stored as is and joins the tree"""
+        tree = Yggdrasil(leaf_behavior='add')
+        tree['a']['b'] = 1
+        assert tree.aggregate() == 1
+
+        sub = Yggdrasil()
+        tree['x'] = sub
+        sub['y'] = 2
+        assert tree['x'] is sub
+        assert tree == {'a': {'b': 1}, 'x': {'y': 2}}
+        assert sub._config is tree._config and sub.path() == ('x',)
+        assert tree.aggregate() == 3
+
+        removed = tree.pop('a')
+        tree['moved'] = removed
+        assert tree['moved'] is removed and removed.path() == ('moved',)
+        tree.update(again=tree.pop('moved'))
+        assert tree == {'x': {'y': 2}, 'again': {'b': 1}}
+
+        # Storing a node below itself would make a cycle, so it is copied
+        tree['x']['self'] = tree['x']
+        assert tree['x']['self'] == {'y': 2}
+        assert tree['x']['self'] is not tree['x']
+
+        # A tree with its own journal stays independent
+        journaled = Yggdrasil()
+        journaled.start_journal()
+        tree['j'] = journaled
+        assert tree['j'] is not journaled
+
+class TestInternKeys:
+    """Tests for the tree-wide key symbol table"""
+
+    @staticmethod
+    def _fresh(text):
+        # An equal string that is a different object
+        return ''.join(list(text))
+
+    def test_new_keys_share_one_object(self):
+        """Test that equal string keys in different nodes are one object"""
+        tree = Yggdrasil(leaf_behavior='add', intern_keys=True)
+        assert tree.intern_keys
+        tree.insert([self._fresh('eu'), self._fresh('status')], 1)
+        tree[self._fresh('us')][self._fresh('status')] = 2
+        tree.add_fiber([self._fresh('apac'), self._fresh('status'), 3])
+
+        keys = [next(iter(tree[region])) for region in ('eu', 'us', 'apac')]
+        assert keys[0] is keys[1] is keys[2]
+        assert tree == {'eu': {'status': 1}, 'us': {'status': 2}, 'apac': {'status': 3}}
+
+    def test_only_string_keys_are_interned(self):
+        """Test that equal keys of other types keep their own type"""
+        tree = Yggdrasil(intern_keys=True)
+        tree['a'][1] = 'int'
+        tree['b'][1.0] = 'float'
+        tree['c'][True] = 'bool'
+        assert [type(next(iter(tree[k]))) for k in 'abc'] == [int, float, bool]
+
+    def test_enabling_interns_existing_keys(self):
+        """Test that switching interning on rewrites the current keys in order"""
+        tree = Yggdrasil()
+        for region in ('eu', 'us'):
+            for key in ('b', 'a', 'c'):
+                tree[region][self._fresh('k' + key)] = 1
+        child = tree['us']
+        tree['us'].intern_keys = True
+
+        assert list(tree['eu']) == list(tree['us']) == ['kb', 'ka', 'kc']
+        assert all(a is b for a, b in zip(tree['eu'], tree['us']))
+        assert tree['us'] is child and child.path() == ('us',)
+
+    def test_survives_pickle_merge_and_indexes(self):
+        """Test that restored, merged and indexed trees keep interning"""
+        tree = Yggdrasil(leaf_behavior='add', intern_keys=True)
+        tree.create_index('key')
+        tree['a']['status'] = 1
+        other = Yggdrasil()
+        other['b'][self._fresh('status')] = 2
+        tree.merge(other)
+        assert next(iter(tree['a'])) is next(iter(tree['b']))
+        assert {node.path() for node in tree.find_key('status')} == {('a',), ('b',)}
+
+        restored = pickle.loads(pickle.dumps(tree))
+        assert restored.intern_keys
+        assert next(iter(restored['a'])) is next(iter(restored['b']))
+        assert restored == tree
+
+    def test_consuming_merge_on_thread_safe_tree(self):
+        """Test that adopting subtrees into a thread-safe interning tree does not deadlock"""
+        tree = Yggdrasil(thread_safe=True, intern_keys=True)
+        tree['shared'] = 0
+        other = Yggdrasil()
+        for i in range(200):
+            other[f"sub{i}"][self._fresh('shared')] = i
+
+        merger = threading.Thread(target=tree.merge, args=(other,), kwargs={'consume': True},
+                                  daemon=True)
+        merger.start()
+        merger.join(timeout=10)
+        assert not merger.is_alive()
+        assert len(tree) == 201
+        assert next(iter(tree['sub199'])) is next(iter(tree))
+
+
+class TestCounters:
+    """Tests for the instrumentation counters"""
+
+    def test_off_by_default(self):
+        """Test that trees do not count unless asked to"""
+        tree = Yggdrasil()
+        tree['a']['b'] = 1
+        assert tree.counters is None
+
+    def test_node_creation(self):
+        """Test that node creations are counted and split by how they happened"""
+        tree = Yggdrasil()
+        tree.start_counters()
+        tree['a']['b']['c'] = 1          # two nodes through item access
+        tree.insert(('a', 'x', 'y'), 2)  # one node through a path write
+        tree.get_path(('missing', 'path'))
+
+        counters = tree.counters
+        assert counters['nodes_created'] == 3
+        assert counters['auto_created'] == 2
+
+    def test_merges_and_fallbacks(self):
+        """Test that merges and fallbacks to overwrite are counted per behavior"""
+        tree = Yggdrasil(leaf_behavior='add')
+        tree.start_counters()
+        tree['n'] = 1
+        tree['n'] = 2
+        tree['n'] = 'text'
+        tree['d'] = 1
+        tree.leaf_behavior = 'divide'
+        tree['d'] = 0
+        tree['d'] = 4
+
+        def pick_first(existing, new):
+            return existing[0]
+
+        tree.leaf_behavior = pick_first
+        tree['n'] = 'other'
+        tree['d'] = 'other'
+
+        counters = tree.counters
+        assert counters['leaf_merges'] == {'add': 2, 'divide': 2, 'pick_first': 2}
+        assert counters['fallbacks'] == {'add': 1, 'divide': 1, 'pick_first': 1}
+        assert tree['n'] == 't' and tree['d'] == 'other'
+
+    def test_batched_writes_and_reset(self):
+        """Test that batched merges are counted and start_counters resets"""
+        tree = Yggdrasil(leaf_behavior='append')
+        tree.start_counters()
+        tree.merge({'a': 'x'})
+        tree.merge({'a': 'y', 'b': 1})
+        tree['b'] = 'z'
+        assert tree.counters['leaf_merges'] == {'append': 2}
+        assert tree.counters['fallbacks'] == {'append': 1}
+
+        tree.start_counters()
+        assert tree.counters['leaf_merges'] == {'append': 0}
+        tree.stop_counters()
+        assert tree.counters is None
+        tree['a'] = 'z'
+        assert tree['a'] == 'xyz'
+
+
 class TestLeafBehaviors:
     """Tests for different leaf behaviors"""
 
@@ -165,6 +468,673 @@ class TestLeafBehaviors:
         # Should fall back to overwrite
         assert tree['key'] == 'value2'
 
+    def test_invalid_behavior(self):
+        """Test that unknown leaf behaviors are rejected at construction time"""
+        with pytest.raises(ValueError):
+            Yggdrasil(leaf_behavior='concatenate')
+
+        with pytest.raises(TypeError):
+            Yggdrasil(leaf_behavior=42)
+
+    def test_change_behavior(self):
+        """Test that assigning leaf_behavior switches the merge strategy"""
+        tree = Yggdrasil(leaf_behavior='add')
+        tree['num'] = 5
+        tree['num'] = 10
+
+        tree.leaf_behavior = 'multiply'
+        tree['num'] = 2
+        assert tree['num'] == 30
+
+        with pytest.raises(ValueError):
+            tree.leaf_behavior = 'unknown'
+
+    def test_none_existing_value(self):
+        """Test that a None leaf is overwritten by every built-in behavior"""
+        for behavior in ('append', 'add', 'subtract', 'multiply', 'divide'):
+            tree = Yggdrasil(leaf_behavior=behavior)
+            tree['key'] = None
+            tree['key'] = 3
+            assert tree['key'] == 3, behavior
+
+class Collect(LeafAccumulator):
+    """Collects every value stored at a leaf in a list"""
+
+    def init(self, value):
+        return list(value) if isinstance(value, list) else [value]
+
+    def accumulate(self, state, value):
+        state.append(value)
+        return state
+
+
+class Mean(LeafAccumulator):
+    """Averages the values stored at a leaf, finalized at the end of a block"""
+
+    deferred = True
+
+    def init(self, value):
+        return [value, 1]
+
+    def accumulate(self, state, value):
+        state[0] += value
+        state[1] += 1
+        return state
+
+    def finalize(self, state):
+        return state[0] / state[1]
+
+
+class Strict(LeafAccumulator):
+    """Adds numbers and refuses anything else"""
+
+    def accumulate(self, state, value):
+        if not isinstance(value, int):
+            raise TypeError(f"Cannot add {value!r}")
+        return state + value
+
+
+class TestAccumulators:
+    """Tests for LeafAccumulator leaf behaviors and accumulating blocks"""
+
+    def test_append_in_place(self):
+        """Test that 'append' accumulates in place and joins strings and tuples at the end"""
+        tree = Yggdrasil(leaf_behavior='append')
+        tree['log'] = (0,)
+        with tree.accumulating():
+            for i in range(1, 6):
+                tree['log'] = (i,)
+            tree['text'] = 'a'
+            tree['text'] = 'b'
+        assert tree['log'] == (0, 1, 2, 3, 4, 5)
+        assert tree['text'] == 'ab'
+
+        tree['log'] = (6,)
+        assert tree['log'] == (0, 1, 2, 3, 4, 5, 6)
+
+        caller = [1]
+        tree.merge({'list': caller})
+        with tree.accumulating():
+            tree.merge({'list': [2]})
+            stored = tree['list']
+            tree.merge({'list': [3]})
+            assert tree['list'] is stored
+        assert tree['list'] == [1, 2, 3]
+        assert caller == [1]
+
+    def test_append_semantics(self):
+        """Test that 'append' still adds other types and falls back to overwrite"""
+        tree = Yggdrasil(leaf_behavior='append')
+        with tree.accumulating():
+            tree['n'] = 1
+            tree['n'] = 2
+            tree['mixed'] = (1,)
+            tree['mixed'] = 'x'
+            tree['mixed'] = 'y'
+            tree['other'] = 'x'
+            tree['other'] = 1
+        assert tree == {'n': 3, 'mixed': 'xy', 'other': 1}
+
+    def test_custom_accumulator(self):
+        """Test that an accumulator gives the same result inside and outside a block"""
+        fibers = [('a', 'x', i) for i in range(5)] + [('b', 1)]
+        expected = {'a': {'x': [0, 1, 2, 3, 4]}, 'b': 1}
+
+        plain = Yggdrasil(leaf_behavior=Collect())
+        for fiber in fibers:
+            plain.add_fiber(fiber)
+        bulk = Yggdrasil(leaf_behavior=Collect())
+        bulk.insert_many(fibers)
+        batched = Yggdrasil(leaf_behavior=Collect())
+        batched.add_many([('a', 'x')] * 5, list(range(5)))
+
+        assert plain == bulk == expected
+        assert batched == {'a': {'x': [0, 1, 2, 3, 4]}}
+
+    def test_deferred_finalization(self):
+        """Test that deferred accumulators store states until the outermost block ends"""
+        tree = Yggdrasil(leaf_behavior=Mean())
+        with tree.accumulating():
+            tree['stats']['t'] = 1
+            with tree['stats'].accumulating():
+                tree['stats']['t'] = 2
+            assert tree['stats']['t'] == [3, 2]
+            tree['stats']['t'] = 6
+        assert tree['stats']['t'] == 3.0
+
+        tree['stats']['t'] = 5
+        assert tree['stats']['t'] == 4.0
+
+        tree.insert_many([('other', 2), ('other', 4)])
+        assert tree['other'] == 3.0
+
+    def test_block_end_cost(self):
+        """Test that ending a block only visits the leaves accumulated into"""
+        tree = Yggdrasil(leaf_behavior='append')
+        tree.insert_many((f"k{i // 100}", f"v{i % 100}", 'x') for i in range(100_000))
+
+        started = time.perf_counter()
+        for _ in range(20):
+            tree.insert_many([(f"k{i}", 'v1', 'y') for i in range(10)])
+        per_call = (time.perf_counter() - started) / 20
+
+        # Walking the whole tree takes tens of milliseconds per call
+        assert per_call < 0.005
+        assert tree['k1']['v1'] == 'x' + 'y' * 20
+        assert tree['k2']['v2'] == 'x'
+
+    def test_concurrent_readers(self):
+        """Test that readers of a thread-safe tree never see raw states while others insert"""
+        tree = Yggdrasil(leaf_behavior='append', thread_safe=True)
+        keys = [f"k{i}" for i in range(20)]
+        for key in keys:
+            tree[key] = ''
+        writers_done = threading.Event()
+        seen = set()
+
+        def write():
+            for _ in range(5):
+                tree.insert_many([(key, 'x') for _ in range(200) for key in keys])
+
+        def read():
+            while not writers_done.is_set():
+                seen.update(type(tree[key]).__name__ for key in keys)
+
+        reader = threading.Thread(target=read)
+        writers = [threading.Thread(target=write) for _ in range(2)]
+        reader.start()
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            writer.join()
+        writers_done.set()
+        reader.join()
+
+        assert seen == {'str'}
+        assert all(tree[key] == 'x' * 2000 for key in keys)
+
+    def test_errors_propagate(self):
+        """Test that accumulator errors are raised instead of overwriting the leaf"""
+        tree = Yggdrasil(leaf_behavior=Strict())
+        tree['n'] = 1
+        tree['n'] = 2
+        with pytest.raises(TypeError):
+            tree['n'] = 'text'
+        assert tree['n'] == 3
+
+        tree.start_counters()
+        tree['n'] = 1
+        assert tree.counters['leaf_merges'] == {'Strict': 1}
+        with pytest.raises(TypeError):
+            tree.insert_many([('n', 'text')])
+
+    def test_no_reuse_with_snapshots(self):
+        """Test that states are not changed in place while a snapshot is alive"""
+        tree = Yggdrasil(leaf_behavior=Collect())
+        with tree.accumulating():
+            tree['log'] = 1
+            tree['log'] = 2
+            snapshot = tree.snapshot()
+            tree['log'] = 3
+        assert snapshot['log'] == [1, 2]
+        assert tree['log'] == [1, 2, 3]
+
+    def test_pickle(self):
+        """Test that trees with an accumulator pickle"""
+        tree = Yggdrasil(leaf_behavior=Collect())
+        tree['a'] = 1
+        tree['a'] = 2
+        copy = pickle.loads(pickle.dumps(tree))
+        copy['a'] = 3
+        assert isinstance(copy.leaf_behavior, Collect)
+        assert copy['a'] == [1, 2, 3]
+
+
+class TestReadOnlyAccess:
+    """Tests for lookups that do not grow the tree"""
+
+    def test_get_path(self):
+        """Test get_path for existing and missing paths"""
+        tree = Yggdrasil()
+        tree.add_fiber(['a', 'b', 'c', 1])
+
+        assert tree.get_path(('a', 'b', 'c')) == 1
+        assert tree.get_path(['a', 'b']) == {'c': 1}
+        assert tree.get_path(('a', 'x', 'y')) is None
+        assert tree.get_path(('a', 'b', 'c', 'd'), default='missing') == 'missing'
+
+        # Nothing was created by the probes
+        assert tree == {'a': {'b': {'c': 1}}}
+
+    def test_contains_path(self):
+        """Test contains_path, including None leaves"""
+        tree = Yggdrasil()
+        tree['a']['b'] = None
+
+        assert tree.contains_path(('a', 'b'))
+        assert tree.contains_path(('a',))
+        assert not tree.contains_path(('a', 'c'))
+        assert not tree.contains_path(('a', 'b', 'c'))
+        assert 'c' not in tree['a']
+
+    def test_freeze(self):
+        """Test that a frozen tree rejects modifications and does not auto-create nodes"""
+        tree = Yggdrasil()
+        tree['a']['b'] = 1
+        tree.freeze()
+
+        assert tree.frozen
+        assert tree['a']['b'] == 1
+        with pytest.raises(KeyError):
+            tree['a']['missing']
+        with pytest.raises(TypeError):
+            tree['a']['b'] = 2
+        with pytest.raises(TypeError):
+            del tree['a']
+        with pytest.raises(TypeError):
+            tree.update({'x': 1})
+        with pytest.raises(TypeError):
+            tree.insert(('x', 'y'), 1)
+        assert tree == {'a': {'b': 1}}
+
+        tree.unfreeze()
+        tree['a']['b'] = 2
+        assert tree['a']['b'] == 2
+
+    def test_prune_empty(self):
+        """Test that prune_empty removes nodes left behind by reads"""
+        tree = Yggdrasil()
+        tree['a']['b'] = 1
+        tree['a']['x']['y']['z']
+        tree['empty']
+
+        assert tree.prune_empty() == 4
+        assert tree == {'a': {'b': 1}}
+        assert tree.prune_empty() == 0
+
+class TestMerge:
+    """Tests for merging trees"""
+
+    def test_merge_applies_leaf_behavior(self):
+        """Test that leaf collisions use the receiver's leaf behavior"""
+        tree = Yggdrasil(leaf_behavior='add')
+        tree.add_fiber(['EU', 'Berlin', 5])
+        tree.add_fiber(['EU', 'Paris', 2])
+
+        other = Yggdrasil()
+        other.add_fiber(['EU', 'Berlin', 4])
+        other.add_fiber(['US', 'NYC', 3])
+
+        tree.merge(other)
+
+        assert tree == {'EU': {'Berlin': 9, 'Paris': 2}, 'US': {'NYC': 3}}
+        # Grafted subtrees are copies that belong to the receiving tree
+        assert tree['US'] is not other['US']
+        assert tree['US']._config is tree._config
+        assert other == {'EU': {'Berlin': 4}, 'US': {'NYC': 3}}
+
+    def test_merge_consume(self):
+        """Test that consume moves subtrees by reference"""
+        tree = Yggdrasil(leaf_behavior='add')
+        other = Yggdrasil()
+        other['US']['NYC'] = 3
+        subtree = other['US']
+
+        tree.merge(other, consume=True)
+
+        assert tree['US'] is subtree
+        assert subtree._config is tree._config
+
+    def test_merge_structure_conflicts(self):
+        """Test that values from other replace existing ones when leaf meets subtree"""
+        tree = Yggdrasil(leaf_behavior='add')
+        tree['a'] = 1
+        tree['b']['c'] = 2
+
+        other = Yggdrasil()
+        other['a']['x'] = 3
+        other['b'] = 4
+
+        tree.merge(other)
+
+        assert tree == {'a': {'x': 3}, 'b': 4}
+
+    def test_ior_operator(self):
+        """Test tree |= other with several partial trees"""
+        total = Yggdrasil(leaf_behavior='add')
+        for hour in range(3):
+            partial = Yggdrasil()
+            partial['requests']['eu'] = hour + 1
+            total |= partial
+
+        assert total['requests']['eu'] == 6
+
+        total |= {'requests': 'reset'}
+        assert total['requests'] == 'reset'
+
+class TestAggregates:
+    """Tests for cached subtree aggregates"""
+
+    def _counter_tree(self, leaf_behavior='add'):
+        tree = Yggdrasil(leaf_behavior=leaf_behavior)
+        tree.insert(('north', 's1', 'apple'), 2)
+        tree.insert(('north', 's1', 'pear'), 3)
+        tree.insert(('north', 's2', 'apple'), 5)
+        tree.insert(('south', 's3', 'apple'), 7)
+        return tree
+
+    def _walk(self, node):
+        """Recompute the leaf values of a subtree without any cache"""
+        return [fiber[-1] for fiber in node.iter_fibers()]
+
+    def _assert_consistent(self, tree):
+        """Check every cached aggregate of every node against a fresh walk"""
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            values = self._walk(node)
+            assert node.aggregate('sum') == sum(values)
+            assert node.aggregate('count') == len(values)
+            assert node.aggregate('min') == (min(values) if values else None)
+            assert node.aggregate('max') == (max(values) if values else None)
+            stack.extend(value for value in node.values() if isinstance(value, Yggdrasil))
+
+    def test_builtin_aggregates(self):
+        """Test sum, count, min and max at the root and at inner nodes"""
+        tree = self._counter_tree()
+        assert tree.aggregate() == 17
+        assert tree.aggregate('count') == 4
+        assert tree['north'].aggregate('sum') == 10
+        assert tree['north'].aggregate('min') == 2
+        assert tree['north'].aggregate('max') == 5
+        assert Yggdrasil().aggregate('max') is None
+
+    def test_results_are_cached(self):
+        """Test that unchanged subtrees are not walked again"""
+        tree = self._counter_tree()
+        tree.aggregate()
+        # Change a leaf behind the cache's back: the cached total is returned
+        dict.__setitem__(tree['south']['s3'], 'apple', 100)
+        assert tree.aggregate() == 17
+
+    @pytest.mark.parametrize('leaf_behavior', [
+        'overwrite', 'append', 'add', 'subtract', 'multiply', 'divide', lambda old, new: old * 10 + new,
+    ])
+    def test_updates_under_every_behavior(self, leaf_behavior):
+        """Test that aggregates follow leaf collisions of every behavior"""
+        tree = self._counter_tree(leaf_behavior)
+        self._assert_consistent(tree)
+        tree['north']['s1']['apple'] = 4
+        tree.insert(('south', 's3', 'apple'), 2)
+        tree.add_fiber(['north', 's2', 'apple', 5])
+        tree['south'] = ['s4', 'plum', 1]
+        self._assert_consistent(tree)
+
+    def test_delete(self):
+        """Test that del, pop, popitem and clear invalidate the ancestors"""
+        tree = self._counter_tree()
+        self._assert_consistent(tree)
+        del tree['north']['s1']['pear']
+        self._assert_consistent(tree)
+        del tree['north']['s2']
+        self._assert_consistent(tree)
+        tree['south']['s3'].pop('apple')
+        self._assert_consistent(tree)
+        tree['north'].popitem()
+        self._assert_consistent(tree)
+        tree['south'].clear()
+        self._assert_consistent(tree)
+        assert tree.aggregate('count') == 0
+
+    def test_bulk_operations(self):
+        """Test merge, update, setdefault, prune_empty and bulk loads"""
+        tree = self._counter_tree()
+        self._assert_consistent(tree)
+        tree.merge(self._counter_tree())
+        self._assert_consistent(tree)
+        tree.merge(self._counter_tree(), consume=True)
+        self._assert_consistent(tree)
+        tree['north'].update({'s5': 1})
+        tree['south'].setdefault('s6', 2)
+        self._assert_consistent(tree)
+        tree['empty']['node']
+        tree.prune_empty()
+        self._assert_consistent(tree)
+        df = pd.DataFrame({'a': ['north', 'west'], 'b': ['s1', 's9'], 'c': ['apple', 'fig'],
+                           'v': [1, 2]})
+        tree.merge(Yggdrasil.from_dataframe(df))
+        self._assert_consistent(tree)
+
+    def test_custom_monoid(self):
+        """Test an (identity, combine) pair as aggregate"""
+        tree = Yggdrasil()
+        tree.insert(('a', 'x'), {'red'})
+        tree.insert(('a', 'y'), {'blue'})
+        tree.insert(('b', 'z'), {'red', 'green'})
+        union = (frozenset(), lambda first, second: first | second)
+        assert tree.aggregate(union) == {'red', 'blue', 'green'}
+        assert tree['a'].aggregate(union) == {'red', 'blue'}
+        tree['a']['y'] = {'black'}
+        assert tree.aggregate(union) == {'red', 'black', 'green'}
+
+    def test_invalid_aggregate(self):
+        """Test that unknown names and malformed monoids are rejected"""
+        tree = self._counter_tree()
+        with pytest.raises(ValueError):
+            tree.aggregate('median')
+        with pytest.raises(TypeError):
+            tree.aggregate(42)
+        with pytest.raises(TypeError):
+            tree.aggregate((0,))
+
+    def test_copies_and_deep_trees(self):
+        """Test aggregates on copied trees and trees deeper than the recursion limit"""
+        tree = self._counter_tree()
+        tree.aggregate()
+        copy = pickle.loads(pickle.dumps(tree))
+        copy['north']['s1']['apple'] = 1
+        self._assert_consistent(copy)
+        assert tree.aggregate() == 17
+
+        deep = Yggdrasil()
+        deep.insert(tuple(range(sys.getrecursionlimit() + 100)), 1)
+        assert deep.aggregate('count') == 1
+
+class TestIndexes:
+    """Tests for the secondary value and key indexes"""
+
+    def _indexed_tree(self, leaf_behavior='overwrite'):
+        tree = Yggdrasil(leaf_behavior=leaf_behavior)
+        tree.insert(('app', 'db', 'status'), 'error')
+        tree.insert(('app', 'web', 'status'), 'ok')
+        tree.insert(('jobs', 'nightly', 'error'), 'disk full')
+        tree.insert(('jobs', 'hourly', 'status'), 'error')
+        tree.create_index('value')
+        tree.create_index('key')
+        return tree
+
+    def _assert_consistent(self, tree):
+        """Compare both indexes with a full scan for every value and key of the tree"""
+        fibers = list(tree.iter_fibers())
+        for value in {fiber[-1] for fiber in fibers}:
+            expected = sorted(fiber[:-1] for fiber in fibers if fiber[-1] == value)
+            assert sorted(tree.find_value(value)) == expected
+
+        keys = {}
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            for key, value in node.items():
+                keys.setdefault(key, []).append(node.path())
+                if isinstance(value, Yggdrasil):
+                    stack.append(value)
+        for key, paths in keys.items():
+            assert sorted(node.path() for node in tree.find_key(key)) == sorted(paths)
+        # Index entries for removed values and keys must be gone as well
+        assert len(tree._config.indexes.keys) == len(keys)
+        assert len(tree._config.indexes.values) == len({fiber[-1] for fiber in fibers})
+
+    def test_find_value(self):
+        """Test finding the paths of a leaf value"""
+        tree = self._indexed_tree()
+        assert sorted(tree.find_value('error')) == [('app', 'db', 'status'),
+                                                    ('jobs', 'hourly', 'status')]
+        assert tree.find_value('missing') == []
+
+    def test_find_key(self):
+        """Test finding the nodes that contain a key at any depth"""
+        tree = self._indexed_tree()
+        assert [node.path() for node in tree.find_key('error')] == [('jobs', 'nightly')]
+        assert sorted(node.path() for node in tree.find_key('status')) == [
+            ('app', 'db'), ('app', 'web'), ('jobs', 'hourly')]
+        assert tree.find_key('missing') == []
+
+    def test_scan_without_index(self):
+        """Test that lookups without an index give the same answers"""
+        tree = self._indexed_tree()
+        indexed_values = sorted(tree.find_value('error'))
+        indexed_keys = sorted(node.path() for node in tree.find_key('status'))
+        tree.drop_index('value')
+        tree.drop_index('key')
+        assert tree.indexes == ()
+        assert tree._config.indexes is None
+        assert sorted(tree.find_value('error')) == indexed_values
+        assert sorted(node.path() for node in tree.find_key('status')) == indexed_keys
+
+    def test_subtree_queries(self):
+        """Test that queries on a subtree node search the whole tree"""
+        tree = self._indexed_tree()
+        assert len(tree['app'].find_value('error')) == 2
+        assert tree['app']['db'].path() == ('app', 'db')
+
+    @pytest.mark.parametrize('leaf_behavior', ['overwrite', 'append', 'add'])
+    def test_updates(self, leaf_behavior):
+        """Test that assignments, leaf merges and replaced subtrees update the indexes"""
+        tree = self._indexed_tree(leaf_behavior)
+        tree['app']['db']['status'] = 'ok'
+        tree.insert(('counters', 'hits'), 1)
+        tree.insert(('counters', 'hits'), 1)
+        tree['app']['web'] = 'retired'
+        subtree = Yggdrasil()
+        subtree.insert(('inner', 'status'), 'error')
+        tree['jobs']['nightly']['error'] = subtree
+        tree['fresh']['node']
+        self._assert_consistent(tree)
+
+    def test_deletions(self):
+        """Test that del, pop, popitem, clear and prune_empty update the indexes"""
+        tree = self._indexed_tree()
+        del tree['app']['db']
+        self._assert_consistent(tree)
+        tree['jobs'].pop('nightly')
+        assert tree['jobs'].pop('nightly', None) is None
+        self._assert_consistent(tree)
+        tree['jobs'].popitem()
+        self._assert_consistent(tree)
+        tree['app'].clear()
+        tree.prune_empty()
+        self._assert_consistent(tree)
+        assert tree.find_value('error') == []
+
+    def test_bulk_operations(self):
+        """Test update, setdefault, merge and bulk loads with indexes"""
+        tree = self._indexed_tree()
+        tree['app'].update({'cache': 'error', 'db': 'gone'})
+        tree['jobs'].setdefault('weekly', 'ok')
+        self._assert_consistent(tree)
+        other = self._indexed_tree()
+        other.insert(('new', 'branch'), 'error')
+        tree.merge(other)
+        tree.merge(self._indexed_tree(), consume=True)
+        self._assert_consistent(tree)
+        df = pd.DataFrame({'a': ['app', 'batch'], 'b': ['db', 'run'], 'v': ['error', 'ok']})
+        from cswtools.frames import bulk_load
+        bulk_load(tree, [df['a'].to_numpy(), df['b'].to_numpy()], df['v'].tolist())
+        self._assert_consistent(tree)
+
+    def test_unhashable_values(self):
+        """Test that unhashable leaf values are skipped by the index but found by a scan"""
+        tree = Yggdrasil()
+        tree.create_index('value')
+        tree.insert(('tags',), {'a', 'b'})
+        tree.insert(('name',), 'a')
+        assert tree.find_value({'a', 'b'}) == [('tags',)]
+        assert tree.find_value('a') == [('name',)]
+
+    def test_invalid_kind(self):
+        """Test that unknown index kinds are rejected"""
+        with pytest.raises(ValueError):
+            Yggdrasil().create_index('leaf')
+
+class TestThreadSafe:
+    """Tests for the thread-safe writer mode"""
+
+    def _run_threads(self, target, count=8):
+        """Run target(index) in several threads with frequent thread switches"""
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            threads = [threading.Thread(target=target, args=(index,)) for index in range(count)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+
+    def test_flag(self):
+        """Test the thread_safe flag, its setter and that copies keep it"""
+        assert not Yggdrasil().thread_safe
+        tree = Yggdrasil(thread_safe=True)
+        assert tree.thread_safe
+        assert tree['a']['b'].thread_safe
+        assert pickle.loads(pickle.dumps(tree)).thread_safe
+        tree.thread_safe = False
+        assert not tree['a'].thread_safe
+
+    def test_no_lost_updates(self):
+        """Test that concurrent 'add' updates to the same leaves are all counted"""
+        tree = Yggdrasil(leaf_behavior='add', thread_safe=True)
+
+        def writer(index):
+            for i in range(5000):
+                tree.insert(('shared', i % 3, i % 5), 1)
+                tree['own'][index][i % 7] = 1
+
+        self._run_threads(writer)
+        assert tree['shared'].aggregate('sum') == 8 * 5000
+        assert tree['own'].aggregate('sum') == 8 * 5000
+        assert all(node.aggregate('sum') == 5000 for node in tree['own'].values())
+
+    def test_concurrent_node_creation(self):
+        """Test that threads creating the same nodes never replace each other's subtree"""
+        tree = Yggdrasil(thread_safe=True)
+
+        def writer(index):
+            for i in range(500):
+                tree[i]['child'][index] = index
+                tree.insert((i, 'path', index), index)
+
+        self._run_threads(writer)
+        for i in range(500):
+            assert len(tree[i]['child']) == 8
+            assert len(tree[i]['path']) == 8
+
+    def test_aggregate_during_writes(self):
+        """Test that aggregates read while writing end up consistent"""
+        tree = Yggdrasil(leaf_behavior='add', thread_safe=True)
+
+        def worker(index):
+            for i in range(2000):
+                if index == 0:
+                    tree.aggregate('sum')
+                else:
+                    tree.insert((index, i % 10), 1)
+
+        self._run_threads(worker, count=4)
+        assert tree.aggregate('sum') == 3 * 2000
+        assert tree.aggregate('count') == 3 * 10
+
 class TestAddFiber:
     """Tests for the add_fiber method"""
 
@@ -217,6 +1187,157 @@ class TestAddFiber:
         # Original fiber should be unchanged
         assert fiber == original
 
+class TestInsert:
+    """Tests for path insertion with insert and insert_many"""
+
+    def test_insert_sequences(self):
+        """Test insert with different kinds of paths"""
+        import numpy as np
+
+        tree = Yggdrasil(leaf_behavior='add')
+        tree.insert(('a', 'b', 'c'), 1)
+        tree.insert(['a', 'b', 'c'], 2)
+        tree.insert((key for key in ('a', 'b', 'c')), 3)
+        tree.insert(np.array([1, 2]), 4)
+
+        assert tree['a']['b']['c'] == 6
+        assert tree[1][2] == 4
+        assert type(next(iter(tree[1]))) is int
+
+    def test_insert_does_not_modify_path(self):
+        """Test that neither insert nor list assignment consume the caller's list"""
+        tree = Yggdrasil()
+        path = ['a', 'b', 'c']
+        tree.insert(path, 1)
+        assert path == ['a', 'b', 'c']
+
+        values = ['x', 'y', 2]
+        tree['root'] = values
+        assert values == ['x', 'y', 2]
+        assert tree['root']['x']['y'] == 2
+
+    def test_insert_deep_path(self):
+        """Test that paths deeper than the recursion limit can be inserted"""
+        depth = sys.getrecursionlimit() + 100
+        tree = Yggdrasil()
+        tree.insert(range(depth), 'leaf')
+
+        node = tree
+        for key in range(depth - 1):
+            node = dict.__getitem__(node, key)
+        assert node[depth - 1] == 'leaf'
+
+    def test_insert_errors(self):
+        """Test insert with an empty path and through an existing leaf"""
+        tree = Yggdrasil()
+        with pytest.raises(ValueError):
+            tree.insert((), 1)
+
+        tree['a'] = 1
+        with pytest.raises(TypeError):
+            tree.insert(('a', 'b'), 2)
+
+    def test_insert_many(self):
+        """Test insert_many with fibers of different types and lengths"""
+        import numpy as np
+
+        tree = Yggdrasil(leaf_behavior='add')
+        tree.insert_many([
+            ('a', 'b', 1),
+            ['a', 'b', 2],
+            np.array([7, 8, 9]),
+            iter(['x', 'y', 'z', 5]),
+        ])
+
+        assert tree['a']['b'] == 3
+        assert tree[7][8] == 9
+        assert tree['x']['y']['z'] == 5
+
+class TestAddMany:
+    """Tests for batched leaf updates with add_many"""
+
+    @staticmethod
+    def _sequential(behavior, paths, values, tree=None):
+        tree = tree if tree is not None else Yggdrasil(leaf_behavior=behavior)
+        for path, value in zip(paths, values):
+            tree.insert(path, value)
+        return tree
+
+    def test_matches_sequential_updates(self):
+        """Test that every leaf behavior gives the same tree as inserting one by one"""
+        paths = [('a', 'x'), ('b',), ('a', 'x'), ('a', 'y'), ('a', 'x'), ('b',)]
+        values = [3, 5, 2, 7, 4, 10]
+        for behavior in ('overwrite', 'append', 'add', 'subtract', 'multiply', 'divide', max):
+            tree = Yggdrasil(leaf_behavior=behavior)
+            tree.add_many(paths, values)
+            assert tree == self._sequential(behavior, paths, values), behavior
+
+    def test_keeps_value_types(self):
+        """Test that mixed, tuple and bool values are stored as inserting one by one would"""
+        cases = [
+            ([('a',), ('b',)], ['x', 1]),
+            ([('a',), ('b',), ('c',), ('a',)], [1, 2.5, True, 2]),
+            ([('a',), ('a',), ('b',)], [(1,), (2,), (3,)]),
+            ([('a',), ('a',), ('b',)], [True, False, True]),
+        ]
+        for behavior in ('overwrite', 'add', 'append'):
+            for paths, values in cases:
+                tree = Yggdrasil(leaf_behavior=behavior)
+                tree.add_many(paths, values)
+                expected = self._sequential(behavior, paths, values)
+                assert tree == expected, (behavior, values)
+                for key, value in expected.items():
+                    assert type(tree[key]) is type(value), (behavior, values, key)
+
+    def test_merges_into_existing_leaves(self):
+        """Test that updates are applied on top of the current leaf values"""
+        tree = Yggdrasil(leaf_behavior='subtract')
+        tree['a']['x'] = 100
+        tree['a']['s'] = 'text'
+        tree.add_many([('a', 'x'), ('a', 'x'), ('a', 's'), ('a', 's')], [1, 2, 3, 4])
+        assert tree['a']['x'] == 97
+        assert tree['a']['s'] == -1  # A non-numeric leaf is overwritten first
+
+    def test_numpy_inputs(self):
+        """Test 2-D path arrays and typed value arrays"""
+        np = pytest.importorskip('numpy')
+        paths = np.array([['a', 'x'], ['b', 'y'], ['a', 'x']], dtype=object)
+        values = np.array([1.5, 2.0, 0.25])
+        tree = Yggdrasil(leaf_behavior='add')
+        tree.add_many(paths, values)
+        assert tree == {'a': {'x': 1.75}, 'b': {'y': 2.0}}
+        assert type(tree['a']['x']) is float
+
+        ints = Yggdrasil(leaf_behavior='multiply')
+        ints.add_many(np.array([[1, 2], [1, 2], [1, 3]]), np.array([3, 4, 5]))
+        assert ints == {1: {2: 12, 3: 5}}
+        assert type(ints[1][2]) is int
+
+    def test_keeps_aggregates_and_indexes_current(self):
+        """Test that cached aggregates and indexes see the batched writes"""
+        tree = Yggdrasil(leaf_behavior='add')
+        tree['a']['x'] = 1
+        tree.create_index('value')
+        assert tree.aggregate('sum') == 1
+        tree.add_many([('a', 'x'), ('b', 'y')], [4, 2])
+        assert tree.aggregate('sum') == 7
+        assert tree.find_value(5) == [('a', 'x')]
+        assert tree.find_value(1) == []
+
+    def test_errors(self):
+        """Test length mismatches, empty paths and frozen trees"""
+        tree = Yggdrasil(leaf_behavior='add')
+        with pytest.raises(ValueError):
+            tree.add_many([('a',)], [1, 2])
+        with pytest.raises(ValueError):
+            tree.add_many([()], [1])
+        tree.add_many([], [])
+        assert tree == {}
+        tree.freeze()
+        with pytest.raises(TypeError):
+            tree.add_many([('a',)], [1])
+
+
 class TestFromDataFrame:
     """Tests for the from_dataframe class method"""
 
@@ -259,6 +1380,134 @@ class TestFromDataFrame:
         # The values should be added
         assert tree['A']['X'] == 15
 
+    def test_from_dataframe_matches_row_by_row(self):
+        """Test that the bulk loader builds the same tree as adding rows one by one"""
+        data = {
+            'region': ['EU', 'EU', 'US', 'EU', 'US', 'EU', 'EU'],
+            'store': ['Berlin', 'Paris', 'NYC', 'Berlin', 'NYC', 'Berlin', 'Paris'],
+            'sku': ['a', 'b', 'c', 'a', 'c', 'a', 'd'],
+            'value': [5, 2.5, 3, 4, 0, 'x', 6]
+        }
+        df = pd.DataFrame(data)
+
+        def join_with_comma(a, b):
+            return f"{a},{b}"
+
+        behaviors = ['overwrite', 'append', 'add', 'subtract', 'multiply',
+                     'divide', join_with_comma]
+        for behavior in behaviors:
+            expected = Yggdrasil(leaf_behavior=behavior)
+            for _, row in df.iterrows():
+                expected.add_fiber(row)
+
+            tree = Yggdrasil.from_dataframe(df, leaf_behavior=behavior)
+
+            assert tree == expected, behavior
+            # Key order (and therefore print_tree output) must match as well
+            assert list(tree['EU']) == list(expected['EU'])
+            assert list(tree['EU']['Berlin']) == list(expected['EU']['Berlin'])
+
+    def test_from_dataframe_numeric_frame(self):
+        """Test that numeric frames keep the dtype that row iteration would produce"""
+        df = pd.DataFrame({'key': [1, 2, 1], 'value': [0.5, 1.5, 2.0]})
+
+        tree = Yggdrasil.from_dataframe(df, leaf_behavior='add')
+
+        # Rows of an all-numeric frame are upcast to float, just like iterrows()
+        assert tree == {1.0: 2.5, 2.0: 1.5}
+
+    def test_from_dataframe_missing_keys(self):
+        """Test that missing values in path columns behave like row-by-row insertion"""
+        df = pd.DataFrame({
+            'col1': ['A', None, 'A', None],
+            'col2': [1.0, 2.0, float('nan'), 2.0],
+            'col3': [1, 2, 3, 4]
+        })
+
+        expected = Yggdrasil(leaf_behavior='add')
+        for _, row in df.iterrows():
+            expected.add_fiber(row)
+
+        tree = Yggdrasil.from_dataframe(df, leaf_behavior='add')
+
+        assert len(tree) == len(expected)
+        assert tree['A'][1.0] == expected['A'][1.0]
+
+    def test_from_dataframe_single_column(self):
+        """Test that frames with a single column keep the add_fiber semantics"""
+        df = pd.DataFrame({'col1': ['A', 'B']})
+
+        tree = Yggdrasil.from_dataframe(df)
+
+        assert tree == {'A': [], 'B': []}
+
+    def test_from_dataframe_nullable_dtypes(self):
+        """Test that missing values in nullable dtypes stay pd.NA, as in df.values"""
+        df = pd.DataFrame({
+            'col1': ['A', 'B', 'C'],
+            'col2': pd.array([1, None, 3], dtype='Int64'),
+        })
+
+        expected = Yggdrasil()
+        for row in df.values.tolist():
+            expected.add_fiber(row)
+
+        tree = Yggdrasil.from_dataframe(df)
+
+        assert tree['B'] is pd.NA
+        assert tree['A'] == 1 and tree['C'] == 3
+        assert list(tree) == list(expected)
+        assert tree['B'] is expected['B']
+
+def join_with_comma(a, b):
+    # Module-level so it can be sent to worker processes
+    return f"{a},{b}"
+
+class TestParallelBuild:
+    """Tests for building trees with worker processes"""
+
+    def test_parallel_matches_serial(self):
+        """Test that a sharded build produces the same tree as a serial one"""
+        data = {
+            'region': ['EU', 'US', 'EU', 'APAC', 'US', 'EU', 'LATAM'],
+            'store': ['Berlin', 'NYC', 'Paris', 'Tokyo', 'NYC', 'Berlin', 'Lima'],
+            'value': [5, 3, 2, 8, 4, 1, 6]
+        }
+        df = pd.DataFrame(data)
+
+        for behavior in ('overwrite', 'add', 'subtract', join_with_comma):
+            expected = Yggdrasil.from_dataframe(df, leaf_behavior=behavior)
+            tree = Yggdrasil.from_dataframe(df, leaf_behavior=behavior, workers=3)
+
+            assert tree == expected
+            assert list(tree) == list(expected)
+            assert tree['EU']._config is tree._config
+
+    def test_parallel_missing_root_keys(self):
+        """Test that missing root keys fall back to a serial build"""
+        df = pd.DataFrame({'col1': ['A', None, 'B'], 'col2': [1, 2, 3]})
+
+        tree = Yggdrasil.from_dataframe(df, workers=2)
+
+        assert tree['A'] == 1
+        assert tree['B'] == 3
+        assert len(tree) == 3
+
+    def test_parallel_from_sql(self):
+        """Test that from_sql passes workers on and rejects them with chunksize"""
+        conn = sqlite3.connect(':memory:')
+        conn.execute('CREATE TABLE test (col1 TEXT, col2 TEXT, col3 INTEGER)')
+        conn.executemany('INSERT INTO test VALUES (?, ?, ?)', [
+            ('A', 'X', 1), ('B', 'Y', 2), ('A', 'X', 3)
+        ])
+
+        tree = Yggdrasil.from_sql("SELECT * FROM test", conn, leaf_behavior='add', workers=2)
+        assert tree == {'A': {'X': 4}, 'B': {'Y': 2}}
+
+        with pytest.raises(ValueError):
+            Yggdrasil.from_sql("SELECT * FROM test", conn, chunksize=10, workers=2)
+        conn.close()
+
 class TestFromSQL:
     """Tests for the from_sql class method"""
 
@@ -301,6 +1550,195 @@ class TestFromSQL:
         # For now, we'll skip this test with a message
         pytest.skip("Test requires a file-based SQLite database")
 
+class TestFromSQLStreaming:
+    """Tests for chunked from_sql ingestion"""
+
+    @staticmethod
+    def _create_table(conn):
+        conn.execute('CREATE TABLE sales (region TEXT, store TEXT, amount INTEGER)')
+        conn.executemany('INSERT INTO sales VALUES (?, ?, ?)', [
+            ('EU', 'Berlin', 5),
+            ('EU', 'Paris', 2),
+            ('US', 'NYC', 3),
+            ('EU', 'Berlin', 4),
+            ('US', 'NYC', 7)
+        ])
+        conn.commit()
+
+    def test_chunked_matches_dataframe_mode(self):
+        """Test that every chunk size produces the same tree as the DataFrame path"""
+        conn = sqlite3.connect(':memory:')
+        self._create_table(conn)
+        query = "SELECT * FROM sales"
+
+        expected = Yggdrasil.from_sql(query, conn, leaf_behavior='add')
+        for chunksize in (1, 2, 3, 100):
+            tree = Yggdrasil.from_sql(query, conn, leaf_behavior='add', chunksize=chunksize)
+            assert tree == expected
+            assert tree['EU']['Berlin'] == 9
+
+        conn.close()
+
+    def test_chunked_connection_string(self, tmp_path):
+        """Test chunked loading through a SQLite connection string"""
+        path = str(tmp_path / 'sales.db')
+        conn = sqlite3.connect(path)
+        self._create_table(conn)
+        conn.close()
+
+        tree = Yggdrasil.from_sql("SELECT * FROM sales", path, chunksize=2)
+
+        assert tree['US']['NYC'] == 7
+        assert tree['EU']['Paris'] == 2
+
+    def test_stats(self):
+        """Test that load statistics are reported"""
+        conn = sqlite3.connect(':memory:')
+        self._create_table(conn)
+
+        stats = {}
+        Yggdrasil.from_sql("SELECT * FROM sales", conn, chunksize=2, stats=stats)
+
+        assert stats['rows'] == 5
+        assert stats['chunks'] == 3
+        assert stats['seconds'] >= 0
+        assert stats['rows_per_second'] > 0
+        assert 'peak_rss' in stats
+
+        conn.close()
+
+    def test_invalid_chunksize(self):
+        """Test that a non-positive chunksize is rejected"""
+        conn = sqlite3.connect(':memory:')
+        with pytest.raises(ValueError):
+            Yggdrasil.from_sql("SELECT 1", conn, chunksize=0)
+        conn.close()
+
+class TestExport:
+    """Tests for iter_fibers, to_dataframe and to_sql"""
+
+    def _ragged_tree(self):
+        tree = Yggdrasil()
+        tree.insert(('a', 'b'), 1)
+        tree.insert(('a', 'c', 'd'), 2)
+        tree.insert(('e',), 3)
+        return tree
+
+    def test_iter_fibers(self):
+        """Test that fibers come in insertion order and ignore empty nodes"""
+        tree = self._ragged_tree()
+        tree['empty']['node']
+        assert list(tree.iter_fibers()) == [('a', 'b', 1), ('a', 'c', 'd', 2), ('e', 3)]
+        assert list(Yggdrasil().iter_fibers()) == []
+
+    def test_iter_fibers_deep(self):
+        """Test that iter_fibers works beyond the recursion limit"""
+        tree = Yggdrasil()
+        path = tuple(range(sys.getrecursionlimit() + 100))
+        tree.insert(path, 'leaf')
+        assert list(tree.iter_fibers()) == [path + ('leaf',)]
+
+    def test_fibers_round_trip(self):
+        """Test that add_fiber rebuilds a tree from its fibers"""
+        tree = self._ragged_tree()
+        copy = Yggdrasil()
+        for fiber in tree.iter_fibers():
+            copy.add_fiber(fiber)
+        assert copy == tree
+
+    def test_depth(self):
+        """Test the number of keys on the longest path"""
+        assert self._ragged_tree().depth() == 3
+        assert Yggdrasil().depth() == 0
+
+    def test_dataframe_round_trip(self):
+        """Test that from_dataframe followed by to_dataframe returns the rows"""
+        df = pd.DataFrame({
+            'region': ['north', 'north', 'south'],
+            'store': ['s1', 's2', 's2'],
+            'amount': [1.5, 2.5, 3.5],
+        })
+        result = Yggdrasil.from_dataframe(df).to_dataframe(columns=list(df.columns))
+        pd.testing.assert_frame_equal(result, df)
+
+    def test_dataframe_ragged(self):
+        """Test that shorter fibers are padded in the key columns"""
+        df = self._ragged_tree().to_dataframe(fill_value='-')
+        assert list(df.columns) == ['level_0', 'level_1', 'level_2', 'value']
+        assert df.values.tolist() == [
+            ['a', 'b', '-', 1],
+            ['a', 'c', 'd', 2],
+            ['e', '-', '-', 3],
+        ]
+
+    def test_dataframe_columns(self):
+        """Test that extra columns widen the output and too few are rejected"""
+        df = self._ragged_tree().to_dataframe(columns=['k1', 'k2', 'k3', 'k4', 'v'])
+        assert list(df.columns) == ['k1', 'k2', 'k3', 'k4', 'v']
+        assert df.iloc[0, :2].tolist() == ['a', 'b']
+        assert df.iloc[0, 2:4].isna().all()
+        assert df['v'].tolist() == [1, 2, 3]
+        with pytest.raises(ValueError):
+            self._ragged_tree().to_dataframe(columns=['k', 'v'])
+
+    def test_to_sql(self):
+        """Test that rows are written in batches into a new table"""
+        conn = sqlite3.connect(':memory:')
+        written = self._ragged_tree().to_sql('fibers', conn, batch_size=2)
+        assert written == 3
+        assert conn.execute("SELECT * FROM fibers").fetchall() == [
+            ('a', 'b', None, 1),
+            ('a', 'c', 'd', 2),
+            ('e', None, None, 3),
+        ]
+        conn.close()
+
+    def test_sql_round_trip(self, tmp_path):
+        """Test that from_sql reads back what to_sql wrote"""
+        path = str(tmp_path / 'tree.db')
+        tree = Yggdrasil(leaf_behavior='add')
+        tree.insert(('x', 'y'), 1)
+        tree.insert(('x', 'z'), 2)
+        tree.to_sql('fibers', path, columns=['k1', 'k2', 'amount'])
+        assert Yggdrasil.from_sql("SELECT * FROM fibers", path) == tree
+
+    def test_to_sql_invalid_batch_size(self):
+        """Test that a non-positive batch_size is rejected"""
+        with pytest.raises(ValueError):
+            Yggdrasil().to_sql('fibers', ':memory:', batch_size=0)
+
+class TestLazyImports:
+    """Tests that the core tree does not import the heavy optional dependencies"""
+
+    def _modules_after(self, code):
+        """Run code in a fresh interpreter and return the imported module names"""
+        script = code + "\nimport sys\nprint(' '.join(sys.modules))"
+        result = subprocess.run([sys.executable, '-c', script], capture_output=True,
+                                text=True, check=True, cwd=REPO_ROOT)
+        return set(result.stdout.split())
+
+    def test_import_is_lightweight(self):
+        """Test that importing the package loads neither pandas, numpy nor sqlite3"""
+        modules = self._modules_after(
+            "import cswtools\n"
+            "tree = cswtools.Yggdrasil(leaf_behavior='add')\n"
+            "tree.add_fiber(['a', 'b', 1])\n"
+            "tree.print_tree()"
+        )
+        assert 'cswtools.yggdrasil' in modules
+        assert 'pandas' not in modules
+        assert 'numpy' not in modules
+        assert 'sqlite3' not in modules
+
+    def test_adapters_load_on_demand(self):
+        """Test that from_dataframe pulls in the DataFrame adapter when called"""
+        modules = self._modules_after(
+            "import pandas as pd\n"
+            "from cswtools import Yggdrasil\n"
+            "Yggdrasil.from_dataframe(pd.DataFrame({'a': [1], 'b': [2]}))"
+        )
+        assert 'cswtools.frames' in modules
+
 class TestPrintTree:
     """Tests for the print_tree method"""
 
@@ -354,3 +1792,54 @@ class TestPrintTree:
         assert "    └── birds" in output
         assert "        └── parrot" in output
         assert "            └── Squawk" in output
+
+    def test_print_tree_limits(self):
+        """Test print_tree with depth, fan-out and line limits"""
+        tree = Yggdrasil()
+        for i in range(5):
+            tree.add_fiber(['root', f'child{i}', 'leaf', i])
+
+        captured_output = io.StringIO()
+        with redirect_stdout(captured_output):
+            tree.print_tree(max_children=2)
+        output = captured_output.getvalue()
+        assert "    ├── child0" in output
+        assert "    ├── child1" in output
+        assert "child2" not in output
+        assert "    └── … 3 more" in output
+
+        captured_output = io.StringIO()
+        with redirect_stdout(captured_output):
+            tree.print_tree(max_depth=2)
+        output = captured_output.getvalue()
+        assert "    └── child4" in output
+        assert "        └── … 1 more" in output
+        assert "leaf" not in output
+
+    def test_iter_lines(self):
+        """Test that iter_lines yields the same lines print_tree prints"""
+        tree = Yggdrasil()
+        tree.add_fiber(['animals', 'mammals', 'cats', 'Meow'])
+        tree.add_fiber(['animals', 'birds', 'parrot', 'Squawk'])
+
+        captured_output = io.StringIO()
+        with redirect_stdout(captured_output):
+            tree.print_tree()
+
+        assert list(tree.iter_lines()) == captured_output.getvalue().splitlines()
+        assert list(tree.iter_lines(max_lines=2)) == [
+            "└── animals", "    ├── mammals", "… output truncated"]
+
+    def test_render(self):
+        """Test rendering a deep tree to a stream in chunks"""
+        depth = sys.getrecursionlimit() + 100
+        tree = Yggdrasil()
+        tree.insert(range(depth), 'leaf')
+
+        stream = io.StringIO()
+        written = tree.render(stream, chunk_lines=7)
+
+        assert written == depth + 1
+        lines = stream.getvalue().splitlines()
+        assert len(lines) == depth + 1
+        assert lines[-1].endswith("└── leaf")